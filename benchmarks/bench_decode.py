@@ -0,0 +1,117 @@
+"""Benchmark: wall time of decoding 1, 4 and 16 reels at once, naive vs DecodeScheduler.
+
+Usage:
+    python benchmarks/bench_decode.py [video.mp4] [--reels 1 4 16]
+
+Without a video, a synthetic 15 s 720x1280 reel is written with OpenCV.
+"Naive" decodes every reel in its own thread with OpenCV's default
+thread count (what concurrent analyses did before); the scheduler runs
+them in worker processes capped to the core count, one OpenCV thread each.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.features.vision_analysis.decode_scheduler import DecodeScheduler  # noqa: E402
+
+
+def synthetic_video(path: str, seconds: int = 15, fps: int = 30) -> str:
+    """Write a textured vertical test video."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (720, 1280))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (1280, 720, 3), dtype=np.uint8)
+    for i in range(seconds * fps):
+        frame = np.roll(base, i * 4, axis=1)
+        cv2.putText(frame, f"{i}", (200, 640), cv2.FONT_HERSHEY_SIMPLEX, 6, (255, 255, 255), 12)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def decode_all(video_path: str) -> int:
+    """Decode every frame of a video and return the frame count."""
+    cap = cv2.VideoCapture(video_path)
+    frames = 0
+    try:
+        while cap.grab():
+            cap.retrieve()
+            frames += 1
+    finally:
+        cap.release()
+    return frames
+
+
+def run_naive(video_path: str, reels: int) -> int:
+    """Decode reels concurrently in threads with default OpenCV threading."""
+    with ThreadPoolExecutor(max_workers=reels) as executor:
+        return sum(executor.map(decode_all, [video_path] * reels))
+
+
+async def run_scheduled(scheduler: DecodeScheduler, video_path: str, reels: int) -> int:
+    """Decode reels through the scheduler."""
+    counts = await asyncio.gather(*[
+        scheduler.run(decode_all, video_path, count_frames=int) for _ in range(reels)
+    ])
+    return sum(counts)
+
+
+async def benchmark(video_path: str, reel_counts):
+    """Print wall time and decoded fps for each concurrency level."""
+    scheduler = DecodeScheduler()
+    # Start workers before timing
+    await run_scheduled(scheduler, video_path, 1)
+
+    print(f"{os.cpu_count()} CPUs, {scheduler.max_workers} decode workers, OpenCV default threads: {cv2.getNumThreads()}")
+    print(f"{'reels':>6}{'naive s':>10}{'naive fps':>11}{'sched s':>10}{'sched fps':>11}")
+
+    try:
+        for reels in reel_counts:
+            started = time.perf_counter()
+            frames = run_naive(video_path, reels)
+            naive_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            await run_scheduled(scheduler, video_path, reels)
+            scheduled_seconds = time.perf_counter() - started
+
+            print(
+                f"{reels:>6}{naive_seconds:>10.2f}{frames / naive_seconds:>11.0f}"
+                f"{scheduled_seconds:>10.2f}{frames / scheduled_seconds:>11.0f}"
+            )
+        print(f"scheduler metrics: {scheduler.get_metrics()}")
+    finally:
+        scheduler.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video", nargs="?", help="Video file (synthetic reel if omitted)")
+    parser.add_argument("--reels", type=int, nargs="+", default=[1, 4, 16], help="Concurrent reels")
+    args = parser.parse_args()
+
+    temp_path = None
+    video_path = args.video
+    if not video_path:
+        temp_path = os.path.join(tempfile.gettempdir(), "bench_decode_reel.mp4")
+        video_path = synthetic_video(temp_path)
+
+    try:
+        asyncio.run(benchmark(video_path, args.reels))
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+if __name__ == "__main__":
+    main()
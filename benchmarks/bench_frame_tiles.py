@@ -0,0 +1,115 @@
+"""Benchmark: payload bytes and billed tiles per reel frame, before/after FramePolicy.
+
+Usage:
+    python benchmarks/bench_frame_tiles.py [video.mp4] [--frames 5]
+
+Without a video, synthetic 1080x1920 frames are used (full-frame and
+letterboxed 16:9 content).
+"""
+
+import argparse
+import base64
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.features.vision_analysis.frame_policy import FramePolicy, billed_tiles, billed_tokens  # noqa: E402
+
+
+def synthetic_frames(count: int):
+    """Generate vertical test frames with some texture."""
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        y, x = np.mgrid[0:1920, 0:1080]
+        frame = np.stack([
+            (x * 255 // 1080 + i * 20) % 256,
+            (y * 255 // 1920) % 256,
+            ((x + y) // 8 % 2) * 120 + 60,
+        ], axis=2).astype(np.uint8)
+        frame = cv2.add(frame, rng.integers(0, 40, frame.shape, dtype=np.uint8))
+        cv2.putText(frame, f"REEL {i}", (100, 960), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 8)
+
+        # Every second frame: 16:9 content letterboxed into 9:16
+        if i % 2:
+            content = cv2.resize(frame, (1080, 608))
+            frame = np.zeros_like(frame)
+            frame[656:656 + 608] = content
+
+        frames.append(frame)
+    return frames
+
+
+def video_frames(path: str, count: int):
+    """Read evenly spaced frames from a video."""
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for pos in np.linspace(0, max(total - 1, 0), count).astype(int):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(pos))
+        ret, frame = cap.read()
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def measure(frames, encode):
+    """Total base64 payload, tiles and tokens for frames."""
+    payload = tiles = tokens = 0
+    started = time.perf_counter()
+    for frame in frames:
+        data, (height, width) = encode(frame)
+        payload += len(base64.b64encode(data))
+        tiles += billed_tiles(width, height)
+        tokens += billed_tokens(width, height)
+    return payload, tiles, tokens, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video", nargs="?", help="Video file (synthetic frames if omitted)")
+    parser.add_argument("--frames", type=int, default=5, help="Frames per reel")
+    args = parser.parse_args()
+
+    frames = video_frames(args.video, args.frames) if args.video else synthetic_frames(args.frames)
+    if not frames:
+        print("No frames decoded")
+        return
+
+    def before(frame):
+        # Previous behaviour: key frames written at full size, default JPEG quality
+        ok, buffer = cv2.imencode(".jpg", frame)
+        return buffer.tobytes(), frame.shape[:2]
+
+    policies = {
+        "1x2 tiles": FramePolicy(),
+        "1x2 tiles + 9:16 crop": FramePolicy(center_crop_aspect=9 / 16),
+        "low detail (1x1)": FramePolicy.for_detail("low"),
+    }
+
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(f"{'variant':<24}{'payload KB':>12}{'tiles':>8}{'tokens':>9}{'encode ms':>11}")
+
+    rows = [("before (full size)",) + measure(frames, before)]
+    for name, policy in policies.items():
+        def after(frame, policy=policy):
+            frame = policy.apply(frame)
+            return policy.encode(frame), frame.shape[:2]
+        row = measure(frames, after)
+        if name.startswith("low"):
+            # Low detail is billed flat regardless of tiles
+            row = (row[0], 0, len(frames) * billed_tokens(512, 512, "low"), row[3])
+        rows.append((name,) + row)
+
+    for name, payload, tiles, tokens, seconds in rows:
+        print(f"{name:<24}{payload / 1024:>12.1f}{tiles:>8}{tokens:>9}{seconds * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Benchmark: stored size and encode/decode time of reports, json.dumps vs serialization module.
+
+Usage:
+    python benchmarks/bench_serialization.py [--reels 10 100 1000] [--repeat 20]
+
+Each reel of a report is stored as one value (what update_report writes
+to report_reels); the report aggregates are small next to them. "legacy"
+is the previous json.dumps of hand-built dicts; the other columns use
+src.storage.serialization with the codec it picked (orjson if installed)
+and each available compression. Time is per report, in milliseconds.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.domain.models import ReelData  # noqa: E402
+from src.storage import serialization  # noqa: E402
+from src.storage.serialization import decode, encode, from_dict, to_dict  # noqa: E402
+
+WORDS = "reels viral trend hook story edit transition sound recipe fitness travel beauty tips".split()
+
+
+def make_reels(count: int):
+    """Build reels with realistic captions, transcripts and hashtags."""
+    rng = random.Random(0)
+    now = datetime.now()
+    return [
+        ReelData(
+            id=str(3000000000000000000 + i),
+            title=" ".join(rng.choices(WORDS, k=rng.randint(10, 40))),
+            author=f"Author {i % 50}",
+            author_username=f"author_{i % 50}",
+            url=f"https://www.instagram.com/reel/C{i:09d}xyz/",
+            video_url=f"https://scontent.cdninstagram.com/v/t50/{i}_n.mp4?efg=abc&oh=00_{i:x}",
+            views=rng.randint(1000, 5000000),
+            likes=rng.randint(10, 200000),
+            comments=rng.randint(0, 5000),
+            shares=rng.randint(0, 10000),
+            engagement_rate=rng.random() * 15,
+            date=now - timedelta(hours=rng.randint(1, 720)),
+            transcript=" ".join(rng.choices(WORDS, k=rng.randint(0, 120))) or None,
+            hashtags=rng.sample(WORDS, 5),
+            thumbnail_url=f"https://scontent.cdninstagram.com/v/t51/{i}_n.jpg?stp=dst-jpg",
+            duration=rng.randint(5, 90),
+            author_avatar_url=f"https://scontent.cdninstagram.com/v/t51/avatar_{i % 50}.jpg"
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_encode(reels):
+    """Previous storage: json.dumps of a hand-built dict per reel."""
+    return [
+        json.dumps({
+            "id": reel.id, "title": reel.title, "author": reel.author,
+            "author_username": reel.author_username, "url": reel.url, "video_url": reel.video_url,
+            "views": reel.views, "likes": reel.likes, "comments": reel.comments, "shares": reel.shares,
+            "engagement_rate": reel.engagement_rate, "date": reel.date.isoformat(),
+            "transcript": reel.transcript, "hashtags": reel.hashtags, "thumbnail_url": reel.thumbnail_url,
+            "duration": reel.duration, "author_avatar_url": reel.author_avatar_url
+        })
+        for reel in reels
+    ]
+
+
+def legacy_decode(values):
+    """Previous loading: json.loads and a hand-written ReelData constructor."""
+    reels = []
+    for value in values:
+        data = json.loads(value)
+        data["date"] = datetime.fromisoformat(data["date"])
+        reels.append(ReelData(**data))
+    return reels
+
+
+def module_encode(reels, compression):
+    """Storage through the serialization module."""
+    return [encode(to_dict(reel), compression) for reel in reels]
+
+
+def module_decode(values):
+    """Loading through the serialization module."""
+    return [from_dict(ReelData, decode(value)) for value in values]
+
+
+def timed(func, repeat):
+    """Best time of repeat runs in milliseconds and the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reels", type=int, nargs="+", default=[10, 100, 1000], help="Reels per report")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    compressions = ["none", "zlib"] + (["zstd"] if serialization.zstandard is not None else [])
+    codec = "orjson" if serialization.orjson is not None else "json"
+    print(f"codec: {codec}, compressions: {', '.join(compressions)}")
+    print(f"{'reels':>6}{'variant':>14}{'bytes':>11}{'ratio':>7}{'encode ms':>11}{'decode ms':>11}")
+
+    for count in args.reels:
+        reels = make_reels(count)
+
+        encode_ms, values = timed(lambda: legacy_encode(reels), args.repeat)
+        decode_ms, _ = timed(lambda: legacy_decode(values), args.repeat)
+        legacy_size = sum(len(value.encode("utf-8")) for value in values)
+        print(f"{count:>6}{'legacy json':>14}{legacy_size:>11}{1:>7.2f}{encode_ms:>11.2f}{decode_ms:>11.2f}")
+
+        for compression in compressions:
+            encode_ms, values = timed(lambda: module_encode(reels, compression), args.repeat)
+            decode_ms, decoded = timed(lambda: module_decode(values), args.repeat)
+            assert decoded == reels
+            size = sum(len(value.encode("utf-8")) for value in values)
+            print(
+                f"{count:>6}{codec + ' ' + compression:>14}{size:>11}{size / legacy_size:>7.2f}"
+                f"{encode_ms:>11.2f}{decode_ms:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark: concurrent report traffic on SQLite, default engine vs tuned profile.
+
+Usage:
+    python benchmarks/bench_sqlite.py [--workers 1 8 32] [--iterations 50] [--reels 10]
+
+Each worker repeats the bot's write path for a report: get_or_create_user,
+create_report and update_report with a result of --reels reels. The default
+profile is the engine as it was created before (rollback journal, full sync);
+the tuned profile adds WAL, synchronous=NORMAL, mmap, cache size,
+busy_timeout and a connection pool. Databases are created in a temporary
+directory (use --dir to benchmark on the production disk).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# SQL echo would dominate timings
+os.environ.setdefault("DEBUG", "false")
+
+from src.domain.models import AnalysisResult, QueryPayload, ReelData, ReportStatus  # noqa: E402
+from src.storage.sqlite import Database  # noqa: E402
+
+
+def make_result(reels: int) -> AnalysisResult:
+    """Build an analysis result with synthetic reels."""
+    query = QueryPayload(topic="benchmark", period=7, geo="WORLD", user_id=0)
+    return AnalysisResult(
+        query=query,
+        reels=[
+            ReelData(
+                id=f"reel_{i}",
+                title=f"Reel {i} " + "caption " * 20,
+                author="Author",
+                author_username="author",
+                url=f"https://www.instagram.com/reel/{i}/",
+                video_url=f"https://cdn.example.com/{i}.mp4",
+                views=1000 * i,
+                likes=100 * i,
+                comments=10 * i,
+                shares=i,
+                engagement_rate=5.5,
+                date=datetime.now(),
+                hashtags=["one", "two", "three"],
+                thumbnail_url=f"https://cdn.example.com/{i}.jpg"
+            )
+            for i in range(reels)
+        ],
+        total_views=1000,
+        average_er=5.5,
+        popular_hashtags=[],
+        insights=["insight"],
+        recommendations=["recommendation"],
+        usage_cost_usd=0.1
+    )
+
+
+async def worker(db: Database, iterations: int, result: AnalysisResult, errors: list) -> int:
+    """Run the report write path repeatedly."""
+    done = 0
+    for _ in range(iterations):
+        try:
+            user = await db.get_or_create_user(telegram_id=random.randint(1, 500))
+            report = await db.create_report(user_id=user.id, query_payload=result.query, price_rub=100.0)
+            await db.update_report(report_id=report.id, analysis_result=result, status=ReportStatus.COMPLETED)
+            done += 1
+        except Exception as e:
+            errors.append(e)
+    return done
+
+
+async def run(directory: str, tuned: bool, workers: int, iterations: int, reels: int):
+    """Run one benchmark configuration; returns (reports/s, errors)."""
+    path = os.path.join(directory, f"bench_{'tuned' if tuned else 'default'}_{workers}.db")
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+    db = Database(f"sqlite+aiosqlite:///{path}", tuned=tuned)
+    db.engine.echo = False
+    await db.init_db()
+
+    result = make_result(reels)
+    errors = []
+    started = time.perf_counter()
+    counts = await asyncio.gather(*[worker(db, iterations, result, errors) for _ in range(workers)])
+    elapsed = time.perf_counter() - started
+
+    await db.close()
+    return sum(counts) / elapsed, len(errors)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32], help="Concurrent workers")
+    parser.add_argument("--iterations", type=int, default=50, help="Reports per worker")
+    parser.add_argument("--reels", type=int, default=10, help="Reels per report")
+    parser.add_argument("--dir", default=None, help="Directory for benchmark databases")
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="bench_sqlite_")
+    print(f"Databases in {directory}, {args.iterations} reports per worker, {args.reels} reels each")
+    print(f"{'workers':>8}{'default rps':>13}{'errors':>8}{'tuned rps':>11}{'errors':>8}{'speedup':>9}")
+
+    for workers in args.workers:
+        default_rps, default_errors = await run(directory, False, workers, args.iterations, args.reels)
+        tuned_rps, tuned_errors = await run(directory, True, workers, args.iterations, args.reels)
+        print(
+            f"{workers:>8}{default_rps:>13.1f}{default_errors:>8}"
+            f"{tuned_rps:>11.1f}{tuned_errors:>8}{tuned_rps / default_rps:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
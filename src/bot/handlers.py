@@ -1,14 +1,17 @@
 """Updated Telegram bot handlers for new interface."""
 
+import asyncio
 import logging
 import re
 from datetime import datetime
+from typing import Dict, Optional
 from aiogram import Router, F
 from aiogram.filters import Command, StateFilter
 from aiogram.types import Message, CallbackQuery, FSInputFile
 from aiogram.fsm.context import FSMContext
 
 from src.bot.states import AnalysisStatesV2, UserData
+from src.bot.handlers_export import send_report_pdf
 from src.bot.keyboards import (
     get_main_menu_keyboard, get_period_keyboard,
     get_sample_size_keyboard, get_confirmation_keyboard,
@@ -19,20 +22,27 @@ from src.bot.keyboards import (
 )
 from src.services.apify_direct import apify_direct_service
 from src.services.pdf import pdf_service
+from src.services.pdf_workers import PDFQueueFullError
 from src.services.rate_limiter import rate_limiter
 from src.services.monthly_limiter import monthly_limiter
+from src.services.load_monitor import load_monitor
 from src.storage.sqlite import db
-from src.domain.models import QueryPayload, ReportStatus
+from src.domain.models import QueryPayload, ReportStatus, PDFStatus, get_analysis_tier
 from src.domain.constants import USD_TO_RUB, PRICE_MULTIPLIER
 from src.utils.logger import get_logger
 from src.utils.formatters import format_currency, format_number
 from src.utils.message_formatter import format_full_analytics_message
+from src.utils.progress import StreamingMessageUpdater
+from src.utils.config import config
 from src.features.vision_analysis import get_scenario_generator
 from src.features.user_context import get_context_manager
 
 logger = get_logger(__name__)
 router = Router()
 
+# Background Vision analyses and PDF renders (kept referenced until done)
+_pdf_tasks = set()
+
 # Welcome message
 WELCOME_MESSAGE = """👋 Добро пожаловать!
 
@@ -330,7 +340,13 @@ async def show_confirmation(message: Message, state: FSMContext, user_data: User
         period_multiplier = {3: 0.8, 7: 1, 14: 1.3}.get(user_data.period_days, 1)
         price_rub = base_price * size_multiplier * period_multiplier
     
+    # Analysis depth (chosen by user or default for current load)
+    tier = load_monitor.resolve_tier(user_data.analysis_depth)
+    price_rub = price_rub * tier.price_multiplier
+    
+    # The analysis runs with the tier the user was charged for, even if load changes
     user_data.price_rub = price_rub
+    user_data.tier_depth = tier.depth.value
     await state.update_data(user_data=user_data.to_dict())
     
     # Build confirmation message
@@ -339,6 +355,7 @@ async def show_confirmation(message: Message, state: FSMContext, user_data: User
 
 🔗 Тип: Анализ Reel по ссылке
 📎 URL: {user_data.input_value[:50]}...
+⚙️ Режим: {tier.title}
 💰 Стоимость: {format_currency(price_rub)}
 
 Будет проанализирован указанный Reel с подробными метриками.
@@ -351,20 +368,45 @@ async def show_confirmation(message: Message, state: FSMContext, user_data: User
 {type_emoji.get(user_data.analysis_type, "📊")} Тип: {user_data.analysis_type}
 🔍 Запрос: {user_data.input_value}
 📅 Период: {user_data.period_days} дней
-📊 Выборка: {user_data.sample_size} Reels
+📊 Выборка: {min(user_data.sample_size, tier.max_sample_size)} Reels
+⚙️ Режим: {tier.title}
 💰 Стоимость: {format_currency(price_rub)}
 
-Будет проанализировано до {user_data.sample_size} самых популярных Reels.
+Будет проанализировано до {min(user_data.sample_size, tier.max_sample_size)} самых популярных Reels.
 
 📊 Остаток запросов: {monthly_usage['remaining']}/{monthly_usage['limit']} в месяц"""
     
     await message.edit_text(
         confirmation_text,
-        reply_markup=get_confirmation_keyboard(price_rub)
+        reply_markup=get_confirmation_keyboard(price_rub, selected_depth=tier.depth.value)
     )
     await state.set_state(AnalysisStatesV2.confirming_analysis)
 
 
+# Analysis depth selection callback
+@router.callback_query(StateFilter(AnalysisStatesV2.confirming_analysis), F.data.startswith("depth:"))
+async def handle_depth_selection(callback: CallbackQuery, state: FSMContext):
+    """Handle analysis depth selection on the confirmation screen."""
+    depth = callback.data.split(":")[1]
+    
+    data = await state.get_data()
+    user_data = UserData.from_dict(data.get("user_data", {}))
+    
+    # Nothing to redraw if this depth is already shown
+    if user_data.tier_depth == depth:
+        user_data.analysis_depth = depth
+        await state.update_data(user_data=user_data.to_dict())
+        await callback.answer()
+        return
+    
+    user_data.analysis_depth = depth
+    await state.update_data(user_data=user_data.to_dict())
+    
+    # Show confirmation again with the new price
+    await show_confirmation(callback.message, state, user_data)
+    await callback.answer()
+
+
 # Confirm analysis callback
 @router.callback_query(StateFilter(AnalysisStatesV2.confirming_analysis), F.data == "confirm_analysis")
 async def handle_confirm_analysis(callback: CallbackQuery, state: FSMContext):
@@ -424,89 +466,93 @@ async def handle_confirm_analysis(callback: CallbackQuery, state: FSMContext):
         # Initialize progress tracker
         progress_tracker = ProgressTracker(update_progress_message)
         
-        # Run analysis based on type
-        if user_data.analysis_type == "@аккаунт":
-            result = await apify_direct_service.analyze_account(
-                user_data.input_value,
-                user_data.period_days,
-                user_data.sample_size,
-                progress_callback=update_progress_message
-            )
-        elif user_data.analysis_type == "#хэштег":
-            result = await apify_direct_service.analyze_hashtag(
-                user_data.input_value,
-                user_data.period_days,
-                user_data.sample_size,
-                progress_callback=update_progress_message
-            )
-        elif user_data.analysis_type == "📍локация":
-            result = await apify_direct_service.analyze_location(
-                user_data.input_value,
-                user_data.period_days,
-                user_data.sample_size,
-                progress_callback=update_progress_message
-            )
-        elif user_data.analysis_type == "🔗ссылка":
-            result = await apify_direct_service.analyze_reel_url(
-                user_data.input_value,
-                progress_callback=update_progress_message
-            )
+        # Depth confirmed with the price (resolved by load only for states saved before it)
+        if user_data.tier_depth:
+            tier = get_analysis_tier(user_data.tier_depth)
         else:
-            raise ValueError(f"Unknown analysis type: {user_data.analysis_type}")
+            tier = load_monitor.resolve_tier(user_data.analysis_depth)
+        logger.info(f"Analysis tier: {tier.depth.value} ({load_monitor.in_flight} in flight)")
+        
+        async with load_monitor.track():
+            # Run analysis based on type
+            if user_data.analysis_type == "@аккаунт":
+                result = await apify_direct_service.analyze_account(
+                    user_data.input_value,
+                    user_data.period_days,
+                    user_data.sample_size,
+                    progress_callback=update_progress_message,
+                    tier=tier
+                )
+            elif user_data.analysis_type == "#хэштег":
+                result = await apify_direct_service.analyze_hashtag(
+                    user_data.input_value,
+                    user_data.period_days,
+                    user_data.sample_size,
+                    progress_callback=update_progress_message,
+                    tier=tier
+                )
+            elif user_data.analysis_type == "📍локация":
+                result = await apify_direct_service.analyze_location(
+                    user_data.input_value,
+                    user_data.period_days,
+                    user_data.sample_size,
+                    progress_callback=update_progress_message,
+                    tier=tier
+                )
+            elif user_data.analysis_type == "🔗ссылка":
+                result = await apify_direct_service.analyze_reel_url(
+                    user_data.input_value,
+                    progress_callback=update_progress_message
+                )
+            else:
+                raise ValueError(f"Unknown analysis type: {user_data.analysis_type}")
+        
+            # Update progress for data processing
+            await progress_tracker.update("process_data", 0.5)
+        
+            # Check if we have data
+            if not result.reels:
+                await callback.message.edit_text(
+                    "❌ Не удалось найти Reels для анализа.\n\n"
+                    f"💡 Причина: {result.insights[0] if result.insights else 'Нет данных'}\n\n"
+                    "Попробуйте:\n"
+                    "• Другой запрос\n"
+                    "• Увеличить период\n"
+                    "• Проверить правильность ввода",
+                    reply_markup=get_new_analysis_keyboard()
+                )
+                await state.clear()
+                return
         
-        # Update progress for data processing
-        await progress_tracker.update("process_data", 0.5)
+            await progress_tracker.update("process_data", 1.0)
         
-        # Check if we have data
-        if not result.reels:
-            await callback.message.edit_text(
-                "❌ Не удалось найти Reels для анализа.\n\n"
-                f"💡 Причина: {result.insights[0] if result.insights else 'Нет данных'}\n\n"
-                "Попробуйте:\n"
-                "• Другой запрос\n"
-                "• Увеличить период\n"
-                "• Проверить правильность ввода",
-                reply_markup=get_new_analysis_keyboard()
+            # Create query payload for compatibility
+            query_payload = QueryPayload(
+                topic=user_data.input_value,
+                period=user_data.period_days or 0,
+                geo="WORLD",
+                user_id=callback.from_user.id
+            )
+            result.query = query_payload
+        
+            # Save to database
+            user = await db.get_or_create_user(telegram_id=callback.from_user.id)
+            report = await db.create_report(
+                user_id=user.id,
+                query_payload=query_payload,
+                price_rub=user_data.price_rub,
+                analysis_depth=tier.depth.value
             )
-            await state.clear()
-            return
-        
-        await progress_tracker.update("process_data", 1.0)
-        
-        # Create query payload for compatibility
-        query_payload = QueryPayload(
-            topic=user_data.input_value,
-            period=user_data.period_days or 0,
-            geo="WORLD",
-            user_id=callback.from_user.id
-        )
-        result.query = query_payload
-        
-        # Save to database
-        user = await db.get_or_create_user(telegram_id=callback.from_user.id)
-        report = await db.create_report(
-            user_id=user.id,
-            query_payload=query_payload,
-            price_rub=user_data.price_rub
-        )
         
-        # Generate PDF
-        await progress_tracker.update("generate_pdf", 0.0)
-        pdf_path = await pdf_service.generate_report(
-            analysis_result=result,
-            user_id=callback.from_user.id
-        )
-        await progress_tracker.update("generate_pdf", 1.0)
-        
-        # Update report
-        await progress_tracker.update("save_db", 0.0)
-        await db.update_report(
-            report_id=report.id,
-            analysis_result=result,
-            pdf_path=pdf_path,
-            status=ReportStatus.COMPLETED
-        )
-        await progress_tracker.update("save_db", 1.0)
+            # Save results; the PDF is rendered after the analytics message is sent
+            await progress_tracker.update("save_db", 0.0)
+            await db.update_report(
+                report_id=report.id,
+                analysis_result=result,
+                status=ReportStatus.COMPLETED,
+                pdf_status=PDFStatus.PENDING if tier.generate_pdf else PDFStatus.SKIPPED
+            )
+            await progress_tracker.update("save_db", 1.0)
         
         # Send analytics as text message first
         await callback.message.delete()
@@ -522,19 +568,25 @@ async def handle_confirm_analysis(callback: CallbackQuery, state: FSMContext):
         await callback.message.answer(
             text=analytics_message,
             parse_mode="HTML",
-            reply_markup=get_analytics_keyboard(has_pdf=True)
+            reply_markup=get_analytics_keyboard(has_pdf=tier.generate_pdf)
         )
         
-        # Then send PDF as a file
-        with open(pdf_path, "rb") as pdf_file:
-            await callback.message.answer_document(
-                document=FSInputFile(pdf_path, filename=f"reels_analysis_{report.id}.pdf"),
-                caption=(
-                    f"📑 Полный PDF отчет с кликабельными ссылками\n"
-                    f"💰 Стоимость: {format_currency(user_data.price_rub)}\n"
-                    f"📊 Осталось запросов: {monthly_remaining - 1}/{monthly_limiter.get_monthly_usage(callback.from_user.id)['limit']}"
-                )
+        # Then analyze reels with AI Vision and render PDF in background;
+        # the PDF is sent as a follow-up (skipped in fast mode)
+        caption = None
+        if tier.generate_pdf:
+            caption = (
+                f"📑 Полный PDF отчет с кликабельными ссылками\n"
+                f"💰 Стоимость: {format_currency(user_data.price_rub)}\n"
+                f"📊 Осталось запросов: {monthly_remaining - 1}/{monthly_limiter.get_monthly_usage(callback.from_user.id)['limit']}"
             )
+        run_vision = user_data.analysis_type != "🔗ссылка"
+        if run_vision or caption:
+            task = asyncio.create_task(complete_report(
+                callback.message, report.id, result, tier, callback.from_user.id, caption, run_vision
+            ))
+            _pdf_tasks.add(task)
+            task.add_done_callback(_pdf_tasks.discard)
         
         # Clear state
         await state.clear()
@@ -564,6 +616,112 @@ async def handle_confirm_analysis(callback: CallbackQuery, state: FSMContext):
         await state.clear()
 
 
+async def complete_report(
+    message: Message,
+    report_id: int,
+    result,
+    tier,
+    user_id: int,
+    caption: Optional[str],
+    run_vision: bool
+) -> None:
+    """Analyze report reels with AI Vision, store the analyses and deliver the PDF."""
+    if run_vision:
+        try:
+            async with load_monitor.track():
+                if await analyze_report_reels(result, tier):
+                    await db.update_report(report_id=report_id, analysis_result=result)
+        except Exception as e:
+            logger.error(f"Error analyzing reels of report {report_id}: {e}")
+    
+    if caption:
+        await deliver_report_pdf(message, report_id, result, user_id, caption)
+
+
+async def analyze_report_reels(result, tier) -> bool:
+    """
+    Analyze reels with AI Vision so per-reel scenarios and the PDF use stored data.
+    
+    Covers of every reel are analyzed first, then full videos of the top reels.
+    
+    Returns:
+        Whether any analysis was added to result.vision_analyses
+    """
+    run_thumbnails = config.vision.thumbnails_enabled or tier.thumbnail_only
+    run_top = config.vision.top_n > 0 and not tier.thumbnail_only
+    
+    if run_thumbnails:
+        result.vision_analyses.update(await analyze_reel_thumbnails(result.reels))
+    if run_top:
+        result.vision_analyses.update(await analyze_top_reels(result.reels, tier))
+    
+    for analysis in result.vision_analyses.values():
+        duplicate_insight = format_duplicate_insight(analysis)
+        if duplicate_insight:
+            result.insights.append(duplicate_insight)
+    
+    return bool(result.vision_analyses)
+
+
+async def deliver_report_pdf(message: Message, report_id: int, result, user_id: int, caption: str) -> None:
+    """Render report PDF off the critical path and send it when ready."""
+    try:
+        pdf_path = await pdf_service.render_report_pdf(report_id, result, user_id)
+        # None: rendered on demand by the download button in the meantime
+        if pdf_path:
+            await send_report_pdf(message, pdf_path, report_id, caption)
+    except PDFQueueFullError as e:
+        # Under overload the PDF stays available on demand via the download button
+        logger.warning(f"PDF for report {report_id} postponed: {e}")
+    except Exception as e:
+        logger.error(f"Error delivering PDF for report {report_id}: {e}")
+
+
+async def analyze_top_reels(reels, tier=None) -> dict:
+    """Run Vision analysis on the most viewed reels of a report."""
+    from src.features.vision_analysis.analyzer import VisionAnalyzer
+    
+    top_reels = sorted(reels, key=lambda r: r.views, reverse=True)[:config.vision.top_n]
+    
+    try:
+        vision_analyzer = VisionAnalyzer(api_key=config.api.openai_api_key)
+        return await vision_analyzer.analyze_reels(
+            top_reels,
+            max_concurrency=config.vision.max_concurrency,
+            max_cost_usd=config.vision.max_cost_usd,
+            tier=tier
+        )
+    except Exception as e:
+        logger.error(f"Error analyzing top reels: {e}")
+        return {}
+
+
+def format_duplicate_insight(analysis: Optional[dict]) -> Optional[str]:
+    """Format "re-upload of X" insight for a Vision analysis result."""
+    duplicate = (analysis or {}).get("duplicate_of")
+    if not duplicate:
+        return None
+    
+    original = duplicate.get("reel_url") or duplicate.get("reel_id")
+    author = f" от @{duplicate['author_username']}" if duplicate.get("author_username") else ""
+    return f"♻️ Reel {analysis.get('reel_id')} — повторная загрузка {original}{author}"
+
+
+async def analyze_reel_thumbnails(reels) -> dict:
+    """Run Vision analysis on cover images of all reels of a report."""
+    from src.features.vision_analysis.analyzer import VisionAnalyzer
+    
+    try:
+        vision_analyzer = VisionAnalyzer(api_key=config.api.openai_api_key)
+        return await vision_analyzer.analyze_thumbnails(
+            reels,
+            max_concurrency=config.vision.thumbnail_concurrency
+        )
+    except Exception as e:
+        logger.error(f"Error analyzing reel thumbnails: {e}")
+        return {}
+
+
 # Cancel analysis callback
 @router.callback_query(F.data == "cancel_analysis")
 async def handle_cancel_analysis(callback: CallbackQuery, state: FSMContext):
@@ -731,10 +889,12 @@ async def start_reel_vision_analysis(message: Message, state: FSMContext, user_d
         await status_message.edit_text("2️⃣ Анализирую визуальный контент с AI Vision...")
         
         from src.features.vision_analysis.analyzer import VisionAnalyzer
+        from src.features.vision_analysis.audio_features import AudioFeatures
         from src.utils.config import config
         
+        tier = load_monitor.resolve_tier(user_data.analysis_depth)
         vision_analyzer = VisionAnalyzer(api_key=config.api.openai_api_key)
-        vision_result = await vision_analyzer.analyze_reel_by_url(reel.video_url)
+        vision_result = await vision_analyzer.analyze_reel(reel, reel.video_url, tier=tier)
         
         if not vision_result or vision_result.get("error"):
             await status_message.edit_text(
@@ -748,6 +908,11 @@ async def start_reel_vision_analysis(message: Message, state: FSMContext, user_d
         # Step 3: Generate scenario
         await status_message.edit_text("3️⃣ Генерирую персонализированный сценарий...")
         
+        # Audio features were already computed while the video was downloaded
+        audio_features = None
+        if vision_result.get("audio_features"):
+            audio_features = AudioFeatures(**vision_result["audio_features"])
+        
         scenario_generator = get_scenario_generator()
         
         # Generate scenario based on mode
@@ -756,14 +921,18 @@ async def start_reel_vision_analysis(message: Message, state: FSMContext, user_d
             # For now, use basic scenario
             scenario_result = await scenario_generator.generate_complete_scenario(
                 reel_data=reel, 
-                video_url=reel.video_url
+                video_url=reel.video_url,
+                tier=tier,
+                audio_features=audio_features
             )
             scenario = scenario_result.original_scenario
         else:
             # Basic scenario without context
             scenario_result = await scenario_generator.generate_complete_scenario(
                 reel_data=reel, 
-                video_url=reel.video_url
+                video_url=reel.video_url,
+                tier=tier,
+                audio_features=audio_features
             )
             scenario = scenario_result.original_scenario
         
@@ -864,7 +1033,6 @@ async def start_reel_vision_analysis(message: Message, state: FSMContext, user_d
                 f.write(report_text)
             
             # Send text file
-            from aiogram.types import FSInputFile
             await message.answer_document(
                 FSInputFile(report_path),
                 caption="📊 Полный отчет анализа с всеми сценариями"
@@ -912,6 +1080,11 @@ def generate_vision_analysis_message(reel, vision_result, scenario, generation_m
         f"📊 <b>ER:</b> {reel.engagement_rate:.2f}%\n"
     ]
     
+    # Re-upload of an already analyzed reel
+    duplicate_insight = format_duplicate_insight(vision_result)
+    if duplicate_insight:
+        message_parts.append(f"{duplicate_insight}\n")
+    
     # Visual analysis
     if vision_result.get("visual_analysis"):
         visual_text = vision_result["visual_analysis"][:500] + "..." if len(vision_result["visual_analysis"]) > 500 else vision_result["visual_analysis"]
@@ -962,6 +1135,13 @@ def generate_vision_analysis_message(reel, vision_result, scenario, generation_m
 # НОВЫЕ ОБРАБОТЧИКИ ДЛЯ ПОЛНОГО 4-ПРОМТОВОГО WORKFLOW
 # ===========================================
 
+# Заголовки этапов при потоковой генерации сценариев
+SCENARIO_STAGE_TITLES = {
+    "original": "🎯 СЦЕНАРИЙ ОРИГИНАЛА",
+    "variant": "🔄 ВАРИАТИВНЫЙ СЦЕНАРИЙ",
+    "context": "💼 ПЕРСОНАЛИЗИРОВАННЫЙ СЦЕНАРИЙ"
+}
+
 @router.callback_query(F.data.startswith("scenario:"))
 async def handle_scenario_generation(callback: CallbackQuery, state: FSMContext):
     """Обработка запроса на генерацию сценария для конкретного Reel."""
@@ -1069,29 +1249,19 @@ async def handle_scenario_format_selection(callback: CallbackQuery, state: FSMCo
         
         # Получить данные Reel из последнего отчета пользователя
         user = await db.get_or_create_user(callback.from_user.id)
-        last_report = await db.get_last_user_report(user.id)
+        found = await db.get_last_report_reel(user.id, reel_id)
         
-        if not last_report or not hasattr(last_report, 'analysis_result'):
+        if not found:
             await status_message.edit_text(
-                "❌ Не найдены данные для анализа\n"
+                "❌ Reel не найден в результатах анализа\n"
                 "Сначала выполните анализ Reels",
                 reply_markup=get_new_analysis_keyboard()
             )
             return
         
-        # Найти нужный Reel в результатах
-        target_reel = None
-        for reel in last_report.analysis_result.reels:
-            if reel.id == reel_id:
-                target_reel = reel
-                break
-        
-        if not target_reel:
-            await status_message.edit_text(
-                "❌ Reel не найден в результатах анализа",
-                reply_markup=get_new_analysis_keyboard()
-            )
-            return
+        # Визуальный анализ, сохраненный в отчете при анализе топ Reels, и режим отчета
+        target_reel, stored_vision, analysis_depth = found
+        tier = get_analysis_tier(analysis_depth) if analysis_depth else load_monitor.resolve_tier()
         
         # Генерация сценариев
         scenario_generator = get_scenario_generator()
@@ -1102,14 +1272,42 @@ async def handle_scenario_format_selection(callback: CallbackQuery, state: FSMCo
             )
             return
         
+        # Потоковый вывод сценариев в статусное сообщение
+        streamer = None
+        if config.streaming.enabled:
+            streamer = StreamingMessageUpdater(
+                status_message.edit_text,
+                min_interval=config.streaming.edit_interval_seconds
+            )
+        
+        # Сценарии генерируются по очереди: готовые остаются в сообщении, текущий дописывается ниже
+        stage_texts: Dict[str, str] = {}
+
+        async def stream_callback(stage: str, text: str):
+            stage_texts[stage] = text
+            budget = (streamer.max_length - 200) // len(stage_texts)
+            blocks = [
+                f"{SCENARIO_STAGE_TITLES.get(name, name)}\n\n{stage_text[-budget:]}"
+                for name, stage_text in stage_texts.items()
+            ]
+            await streamer.update("🔄 Генерируем сценарий...\n\n" + "\n\n".join(blocks))
+
         # Запустить полную генерацию сценариев
         scenario_result = await scenario_generator.generate_complete_scenario(
             reel_data=target_reel,
             video_url=target_reel.video_url,
+            vision_analysis=stored_vision.get("visual_analysis"),
+            tier=tier,
             user_id=user.id if context_id else None,
-            context_id=context_id
+            context_id=context_id,
+            stream_callback=stream_callback if streamer else None,
+            pipelined=config.scenario.pipelined
         )
-        
+
+        if streamer:
+            # Зафиксировать последний накопленный текст
+            await streamer.finalize()
+
         if scenario_result.error_message:
             await status_message.edit_text(
                 f"❌ Ошибка при генерации сценариев:\n{scenario_result.error_message}",
@@ -1,13 +1,19 @@
 """Handlers for export functionality."""
 
+import html
 import logging
 import os
 from pathlib import Path
+from typing import Optional
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, FSInputFile
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, FSInputFile, Message
 from aiogram.fsm.context import FSMContext
 
+from src.domain.models import PDFStatus
 from src.features.export.json_export import JsonExporter
+from src.services.pdf import pdf_service
+from src.services.pdf_workers import PDFQueueFullError
 from src.storage.sqlite import db
 from src.utils.logger import get_logger
 from src.utils.message_formatter import format_reel_scenario_message
@@ -46,19 +52,30 @@ async def handle_export(callback: CallbackQuery, state: FSMContext):
             await callback.answer("❌ Поддерживается только JSON формат", show_alert=True)
             return
         
+        caption = (
+            f"✅ Данные экспортированы в формате {format_type.upper()}\n\n"
+            f"📊 Всего записей: {len(analysis_result.reels)}"
+        )
+        
+        # Exported before: resend without generating and uploading again
+        if await send_cached_report_file(callback.message, last_report.id, format_type, caption):
+            return
+        
         # Export data (not async)
         export_path = exporter.export(analysis_result, raw_data)
         
         # Send file to user
-        with open(export_path, "rb") as export_file:
-            await callback.message.answer_document(
-                document=FSInputFile(export_path, filename=export_path.name),
-                caption=f"✅ Данные экспортированы в формате {format_type.upper()}\n\n"
-                        f"📊 Всего записей: {len(analysis_result.reels)}"
+        try:
+            await upload_report_file(
+                callback.message,
+                last_report.id,
+                format_type,
+                FSInputFile(export_path, filename=export_path.name),
+                caption
             )
-        
-        # Clean up file after sending
-        os.remove(export_path)
+        finally:
+            # Clean up file after sending
+            os.remove(export_path)
         
     except Exception as e:
         logger.error(f"Error during export: {e}")
@@ -68,32 +85,114 @@ async def handle_export(callback: CallbackQuery, state: FSMContext):
         )
 
 
+async def send_file_id(message: Message, file_id: str, caption: str) -> Optional[Message]:
+    """Send a document by Telegram file_id; None if Telegram rejects the ID."""
+    try:
+        return await message.answer_document(document=file_id, caption=caption)
+    except TelegramBadRequest as e:
+        logger.warning(f"Telegram file_id rejected, uploading again: {e}")
+        return None
+
+
+async def send_cached_report_file(message: Message, report_id: int, format: str, caption: str) -> bool:
+    """Resend a report file uploaded before; False if it has to be uploaded."""
+    file_id = await db.get_telegram_file_id(report_id, format)
+    if not file_id:
+        return False
+    
+    if await send_file_id(message, file_id, caption):
+        return True
+    
+    await db.delete_telegram_file_id(report_id, format)
+    return False
+
+
+async def upload_report_file(
+    message: Message,
+    report_id: int,
+    format: str,
+    document: FSInputFile,
+    caption: str
+) -> Message:
+    """Upload a report file and remember its Telegram file_id."""
+    sent = await message.answer_document(document=document, caption=caption)
+    if sent.document:
+        await db.save_telegram_file_id(report_id, format, sent.document.file_id)
+    return sent
+
+
+async def send_report_pdf(message: Message, pdf_path: str, report_id: int, caption: str) -> None:
+    """Send report PDF, uploading it only if Telegram has no valid copy yet."""
+    if await send_cached_report_file(message, report_id, "pdf", caption):
+        return
+    
+    # Identical PDF uploaded for another report (content-hash cache)
+    shared_file_id = await pdf_service.get_telegram_file_id(pdf_path)
+    if shared_file_id:
+        sent = await send_file_id(message, shared_file_id, caption)
+        if sent:
+            await db.save_telegram_file_id(report_id, "pdf", shared_file_id)
+            return
+        await pdf_service.remember_telegram_file_id(pdf_path, None)
+    
+    sent = await upload_report_file(
+        message,
+        report_id,
+        "pdf",
+        FSInputFile(pdf_path, filename=f"reels_analysis_{report_id}.pdf"),
+        caption
+    )
+    if sent.document:
+        await pdf_service.remember_telegram_file_id(pdf_path, sent.document.file_id)
+
+
 @router.callback_query(F.data == "download_pdf")
 async def handle_download_pdf(callback: CallbackQuery, state: FSMContext):
-    """Handle PDF download button."""
+    """Handle PDF download button (renders the PDF on demand if it isn't ready)."""
     try:
         # Get user's last report
         user = await db.get_or_create_user(telegram_id=callback.from_user.id)
         last_report = await db.get_last_user_report(user.id)
         
-        if not last_report or not last_report.pdf_path:
+        if not last_report:
             await callback.answer("❌ PDF отчет не найден", show_alert=True)
             return
         
-        # Check if file exists
-        pdf_path = Path(last_report.pdf_path)
-        if not pdf_path.exists():
-            await callback.answer("❌ Файл отчета не найден", show_alert=True)
+        caption = "📑 Полный PDF отчет с кликабельными ссылками"
+        
+        # Uploaded before: Telegram keeps the file even after local cleanup
+        if await send_cached_report_file(callback.message, last_report.id, "pdf", caption):
+            await callback.answer()
+            return
+        
+        # Already rendered
+        if last_report.pdf_path and Path(last_report.pdf_path).exists():
+            await callback.answer("📑 Отправляю PDF отчет...")
+            await send_report_pdf(callback.message, last_report.pdf_path, last_report.id, caption)
+            return
+        
+        if last_report.pdf_status == PDFStatus.RENDERING:
+            await callback.answer("⏳ PDF отчет еще готовится, пришлю его следующим сообщением")
             return
         
-        await callback.answer("📑 Отправляю PDF отчет...")
+        analysis_result = getattr(last_report, "analysis_result", None)
+        if last_report.pdf_status == PDFStatus.SKIPPED or not analysis_result:
+            await callback.answer("❌ PDF отчет не найден", show_alert=True)
+            return
         
-        # Send PDF
-        with open(pdf_path, "rb") as pdf_file:
-            await callback.message.answer_document(
-                document=FSInputFile(pdf_path, filename=f"reels_analysis_{last_report.id}.pdf"),
-                caption="📑 Полный PDF отчет с кликабельными ссылками"
+        # Not rendered yet (or file was cleaned up): render now
+        await callback.answer("⏳ Готовлю PDF отчет...")
+        try:
+            pdf_path = await pdf_service.render_report_pdf(
+                last_report.id, analysis_result, callback.from_user.id
             )
+        except PDFQueueFullError:
+            await callback.message.answer("⏳ Сервис перегружен, попробуйте скачать PDF через пару минут")
+            return
+        
+        # None: a concurrent render claimed it and will deliver the file
+        if pdf_path:
+            await send_report_pdf(callback.message, pdf_path, last_report.id, caption)
     
     except Exception as e:
         logger.error(f"Error sending PDF: {e}")
@@ -113,26 +212,16 @@ async def handle_scenario_view(callback: CallbackQuery, state: FSMContext):
         # Parse reel ID from callback data
         reel_id = callback.data.split(":")[1]
         
-        # Get user's last report
+        # Look the reel up in user's last report
         user = await db.get_or_create_user(telegram_id=callback.from_user.id)
-        last_report = await db.get_last_user_report(user.id)
-        
-        if not last_report:
-            await callback.answer("❌ Отчет не найден", show_alert=True)
-            return
+        found = await db.get_last_report_reel(user.id, reel_id)
         
-        # Find the reel in the report
-        analysis_result = last_report.analysis_result
-        reel = None
-        for r in analysis_result.reels:
-            if str(r.id) == reel_id or r.url.endswith(reel_id):
-                reel = r
-                break
-        
-        if not reel:
+        if not found:
             await callback.answer("❌ Reel не найден", show_alert=True)
             return
         
+        reel, stored_vision, _ = found
+        
         # Generate scenario (placeholder for now)
         scenario_text = f"""
 🎬 <b>Вирусный сценарий на основе анализа</b>
@@ -157,6 +246,10 @@ async def handle_scenario_view(callback: CallbackQuery, state: FSMContext):
 ✅ Тренды: использованы актуальные звуки и эффекты
 """
         
+        # Use Vision analysis stored with the report, if the reel was analyzed
+        if stored_vision.get("patterns"):
+            scenario_text += f"\n<b>Паттерны успеха (AI Vision):</b>\n{html.escape(stored_vision['patterns'][:1500])}\n"
+        
         # Send scenario message
         await callback.message.answer(
             format_reel_scenario_message(scenario_text, reel.url),
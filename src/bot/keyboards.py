@@ -1,10 +1,14 @@
 """Keyboards for the updated bot interface."""
 
+from typing import Optional
+
 from aiogram.types import (
     ReplyKeyboardMarkup, KeyboardButton,
     InlineKeyboardMarkup, InlineKeyboardButton
 )
 
+from src.domain.models import ANALYSIS_TIERS
+
 
 # Main menu keyboard
 def get_main_menu_keyboard():
@@ -57,10 +61,19 @@ def get_sample_size_keyboard() -> InlineKeyboardMarkup:
 
 
 # Confirmation keyboard
-def get_confirmation_keyboard(price_rub: float) -> InlineKeyboardMarkup:
-    """Get analysis confirmation keyboard with price."""
+def get_confirmation_keyboard(price_rub: float, selected_depth: Optional[str] = None) -> InlineKeyboardMarkup:
+    """Get analysis confirmation keyboard with price and analysis depth."""
+    depth_buttons = [
+        InlineKeyboardButton(
+            text=f"• {tier.title} •" if tier.depth.value == selected_depth else tier.title,
+            callback_data=f"depth:{tier.depth.value}"
+        )
+        for tier in ANALYSIS_TIERS.values()
+    ]
+    
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
+            depth_buttons,
             [
                 InlineKeyboardButton(
                     text=f"✅ Подтвердить ({price_rub:.0f} ₽)",
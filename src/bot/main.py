@@ -12,6 +12,9 @@ from src.storage.sqlite import db
 from src.storage.cleaner import cleaner
 from src.utils.logger import setup_logging, get_logger
 from src.utils.config import config
+from src.utils.process_pool import shutdown_process_pool
+from src.features.vision_analysis.decode_scheduler import decode_scheduler
+from src.services.pdf_workers import pdf_render_pool
 
 # Import services for initialization
 from src.features.user_context import initialize_context_manager
@@ -32,12 +35,15 @@ async def on_startup(bot: Bot):
     
     # Initialize services
     try:
-        # Initialize context manager with database session
-        context_manager = initialize_context_manager(db.async_session())
+        # Initialize context manager with the session factory (a session per operation)
+        context_manager = initialize_context_manager(db.async_session)
         logger.info("Context manager initialized")
         
         # Initialize scenario generator
-        scenario_generator = initialize_scenario_generator(config.api.openai_api_key)
+        scenario_generator = initialize_scenario_generator(
+            config.api.openai_api_key,
+            prompt_budget_tokens=config.scenario.prompt_budget_tokens
+        )
         logger.info("Scenario generator initialized")
         
     except Exception as e:
@@ -64,9 +70,14 @@ async def on_shutdown(bot: Bot):
     # Stop cleaner
     cleaner.stop()
     
+    # Stop CPU worker processes
+    shutdown_process_pool()
+    decode_scheduler.shutdown()
+    pdf_render_pool.shutdown()
+    
     # No MCP service to close anymore
     
-    # Close database
+    # Close database (flushes buffered request logs and counters)
     await db.close()
     
     logger.info("Bot stopped")
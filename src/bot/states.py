@@ -78,6 +78,8 @@ class UserData:
         self.period_days = None    # 3, 7, or 14
         self.sample_size = None    # 50, 100, or 200
         self.price_rub = None      # Calculated price
+        self.analysis_depth = None  # "fast", "standard", "deep" (None = by load)
+        self.tier_depth = None      # Depth the confirmed price was calculated for
         
         # Vision Analysis fields
         self.generation_mode = None    # "no_context", "context_1", "context_2", etc.
@@ -91,6 +93,8 @@ class UserData:
         self.period_days = None
         self.sample_size = None
         self.price_rub = None
+        self.analysis_depth = None
+        self.tier_depth = None
         self.generation_mode = None
         self.selected_context_id = None
         self.video_url = None
@@ -116,6 +120,8 @@ class UserData:
             "period_days": self.period_days,
             "sample_size": self.sample_size,
             "price_rub": self.price_rub,
+            "analysis_depth": self.analysis_depth,
+            "tier_depth": self.tier_depth,
             "generation_mode": self.generation_mode,
             "selected_context_id": self.selected_context_id,
             "video_url": self.video_url
@@ -130,6 +136,8 @@ class UserData:
         user_data.period_days = data.get("period_days")
         user_data.sample_size = data.get("sample_size")
         user_data.price_rub = data.get("price_rub")
+        user_data.analysis_depth = data.get("analysis_depth")
+        user_data.tier_depth = data.get("tier_depth")
         user_data.generation_mode = data.get("generation_mode")
         user_data.selected_context_id = data.get("selected_context_id")
         user_data.video_url = data.get("video_url")
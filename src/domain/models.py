@@ -23,6 +23,101 @@ class ReportStatus(Enum):
     FAILED = "failed"
 
 
+class PDFStatus(Enum):
+    """PDF report render state (rendered after the analytics message is sent)."""
+    PENDING = "pending"
+    RENDERING = "rendering"
+    READY = "ready"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+class AnalysisDepth(Enum):
+    """Analysis depth tier."""
+    FAST = "fast"
+    STANDARD = "standard"
+    DEEP = "deep"
+    
+    @property
+    def rank(self) -> int:
+        """Position from the cheapest (0) to the most thorough tier."""
+        return list(AnalysisDepth).index(self)
+
+
+@dataclass(frozen=True)
+class AnalysisTier:
+    """Settings applied to the whole pipeline for one analysis depth."""
+    depth: AnalysisDepth
+    title: str
+    num_frames: int  # key frames sent to Vision (0 = thumbnail only)
+    image_detail: str  # OpenAI image detail: low / high
+    vision_model: str
+    scenario_model: str
+    extract_patterns: bool
+    generate_variants: bool
+    generate_pdf: bool
+    max_sample_size: int
+    price_multiplier: float
+    scrape_timeout_seconds: int = 0  # Apify run time cap, partial results are used (0 = no cap)
+    
+    @property
+    def thumbnail_only(self) -> bool:
+        """Analyze only the cover image and caption, without the video."""
+        return self.num_frames == 0
+
+
+ANALYSIS_TIERS = {
+    AnalysisDepth.FAST: AnalysisTier(
+        depth=AnalysisDepth.FAST,
+        title="⚡ Быстрый",
+        num_frames=0,
+        image_detail="low",
+        vision_model="gpt-4o-mini",
+        scenario_model="gpt-4o-mini",
+        extract_patterns=False,
+        generate_variants=False,
+        generate_pdf=False,
+        max_sample_size=5,
+        price_multiplier=0.5,
+        scrape_timeout_seconds=15
+    ),
+    AnalysisDepth.STANDARD: AnalysisTier(
+        depth=AnalysisDepth.STANDARD,
+        title="📊 Стандарт",
+        num_frames=5,
+        image_detail="high",
+        vision_model="gpt-4o",
+        scenario_model="gpt-4o-mini",
+        extract_patterns=True,
+        generate_variants=True,
+        generate_pdf=True,
+        max_sample_size=10,
+        price_multiplier=1.0
+    ),
+    AnalysisDepth.DEEP: AnalysisTier(
+        depth=AnalysisDepth.DEEP,
+        title="🔬 Глубокий",
+        num_frames=8,
+        image_detail="high",
+        vision_model="gpt-4o",
+        scenario_model="gpt-4o",
+        extract_patterns=True,
+        generate_variants=True,
+        generate_pdf=True,
+        max_sample_size=10,
+        price_multiplier=1.5
+    ),
+}
+
+
+def get_analysis_tier(depth: Optional[str] = None) -> AnalysisTier:
+    """Get tier settings by depth value, falling back to standard."""
+    try:
+        return ANALYSIS_TIERS[AnalysisDepth(depth)]
+    except ValueError:
+        return ANALYSIS_TIERS[AnalysisDepth.STANDARD]
+
+
 @dataclass
 class QueryPayload:
     """Query parameters for Apify."""
@@ -124,10 +219,13 @@ class AnalysisResult:
     recommendations: List[str]
     usage_cost_usd: float
     created_at: datetime = None
+    vision_analyses: Dict[str, Dict[str, Any]] = None  # reel ID -> Vision analysis
     
     def __post_init__(self):
         if self.created_at is None:
             self.created_at = datetime.now()
+        if self.vision_analyses is None:
+            self.vision_analyses = {}
     
     @property
     def cost_rub(self) -> float:
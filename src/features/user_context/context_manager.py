@@ -3,13 +3,13 @@
 Позволяет пользователям сохранять/редактировать/удалять несколько контекстов.
 """
 
-import logging
 from typing import List, Optional, Dict, Any
 from dataclasses import dataclass
 from datetime import datetime
-from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy import select, insert, update, delete
 
 from src.utils.logger import get_logger
+from src.storage.cache import AsyncLRUCache
 from src.storage.models import UserContextModel
 
 logger = get_logger(__name__)
@@ -30,14 +30,48 @@ class UserContext:
 class ContextManager:
     """Менеджер для управления контекстами пользователей."""
     
-    def __init__(self, db_session):
+    def __init__(self, session_factory, cache_size: int = 1000):
         """
         Инициализация менеджера.
         
         Args:
-            db_session: Сессия базы данных
+            session_factory: Фабрика сессий БД (каждая операция открывает свою сессию)
+            cache_size: Сколько пользователей держать в кеше контекстов
         """
-        self.db_session = db_session
+        self.session_factory = session_factory
+        # user_id -> контексты пользователя (сброс при создании, изменении и удалении)
+        self._cache = AsyncLRUCache("user_contexts", cache_size)
+    
+    @staticmethod
+    def _to_user_context(context_model: UserContextModel) -> UserContext:
+        """Преобразовать запись БД в UserContext."""
+        return UserContext(
+            id=context_model.id,
+            user_id=context_model.user_id,
+            name=context_model.name,
+            description=context_model.description,
+            context_data=context_model.context_data,
+            created_at=context_model.created_at,
+            updated_at=context_model.updated_at
+        )
+    
+    async def _load_user_contexts(self, user_id: int) -> List[UserContext]:
+        """Загрузить контексты пользователя из БД (новые первыми)."""
+        async with self.session_factory() as session:
+            stmt = select(UserContextModel).where(
+                UserContextModel.user_id == user_id
+            ).order_by(UserContextModel.updated_at.desc())
+            
+            result = await session.execute(stmt)
+            return [self._to_user_context(context_model) for context_model in result.scalars()]
+    
+    async def _cached_user_contexts(self, user_id: int) -> List[UserContext]:
+        """Контексты пользователя из кеша (при промахе - из БД)."""
+        return await self._cache.get_or_load(user_id, lambda: self._load_user_contexts(user_id))
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Статистика кеша контекстов."""
+        return self._cache.get_metrics()
     
     async def create_context(self, user_id: int, name: str, description: str, context_data: str) -> UserContext:
         """
@@ -76,10 +110,10 @@ class ContextManager:
                 updated_at=now
             )
             
-            result = await self.db_session.execute(stmt)
-            context_id = result.inserted_primary_key[0]
-            
-            await self.db_session.commit()
+            async with self.session_factory() as session:
+                result = await session.execute(stmt)
+                context_id = result.inserted_primary_key[0]
+                await session.commit()
             
             context = UserContext(
                 id=context_id,
@@ -95,9 +129,10 @@ class ContextManager:
             return context
             
         except Exception as e:
-            await self.db_session.rollback()
             logger.error(f"Error creating context: {e}")
             raise
+        finally:
+            self._cache.invalidate(user_id)
     
     async def get_user_contexts(self, user_id: int) -> List[UserContext]:
         """
@@ -110,28 +145,7 @@ class ContextManager:
             Список контекстов
         """
         try:
-            stmt = select(UserContextModel).where(
-                UserContextModel.user_id == user_id
-            ).order_by(UserContextModel.updated_at.desc())
-            
-            result = await self.db_session.execute(stmt)
-            rows = result.fetchall()
-            
-            contexts = []
-            for row in rows:
-                context_model = row[0]
-                context = UserContext(
-                    id=context_model.id,
-                    user_id=context_model.user_id,
-                    name=context_model.name,
-                    description=context_model.description,
-                    context_data=context_model.context_data,
-                    created_at=context_model.created_at,
-                    updated_at=context_model.updated_at
-                )
-                contexts.append(context)
-            
-            return contexts
+            return list(await self._cached_user_contexts(user_id))
             
         except Exception as e:
             logger.error(f"Error getting user contexts: {e}")
@@ -149,26 +163,10 @@ class ContextManager:
             Контекст или None
         """
         try:
-            stmt = select(UserContextModel).where(
-                UserContextModel.id == context_id,
-                UserContextModel.user_id == user_id
-            )
-            
-            result = await self.db_session.execute(stmt)
-            context_model = result.scalar_one_or_none()
-            
-            if not context_model:
-                return None
-            
-            return UserContext(
-                id=context_model.id,
-                user_id=context_model.user_id,
-                name=context_model.name,
-                description=context_model.description,
-                context_data=context_model.context_data,
-                created_at=context_model.created_at,
-                updated_at=context_model.updated_at
-            )
+            for context in await self._cached_user_contexts(user_id):
+                if context.id == context_id:
+                    return context
+            return None
             
         except Exception as e:
             logger.error(f"Error getting context by ID: {e}")
@@ -186,26 +184,10 @@ class ContextManager:
             Контекст или None
         """
         try:
-            stmt = select(UserContextModel).where(
-                UserContextModel.user_id == user_id,
-                UserContextModel.name == name
-            )
-            
-            result = await self.db_session.execute(stmt)
-            context_model = result.scalar_one_or_none()
-            
-            if not context_model:
-                return None
-            
-            return UserContext(
-                id=context_model.id,
-                user_id=context_model.user_id,
-                name=context_model.name,
-                description=context_model.description,
-                context_data=context_model.context_data,
-                created_at=context_model.created_at,
-                updated_at=context_model.updated_at
-            )
+            for context in await self._cached_user_contexts(user_id):
+                if context.name == name:
+                    return context
+            return None
             
         except Exception as e:
             logger.error(f"Error getting context by name: {e}")
@@ -267,8 +249,10 @@ class ContextManager:
                 UserContextModel.user_id == user_id
             ).values(**update_data)
             
-            await self.db_session.execute(stmt)
-            await self.db_session.commit()
+            async with self.session_factory() as session:
+                await session.execute(stmt)
+                await session.commit()
+            self._cache.invalidate(user_id)
             
             # Получить обновленный контекст
             updated = await self.get_context_by_id(user_id, context_id)
@@ -277,7 +261,7 @@ class ContextManager:
             return updated
             
         except Exception as e:
-            await self.db_session.rollback()
+            self._cache.invalidate(user_id)
             logger.error(f"Error updating context: {e}")
             raise
     
@@ -302,8 +286,9 @@ class ContextManager:
                 UserContextModel.id == context_id,
                 UserContextModel.user_id == user_id
             )
-            result = await self.db_session.execute(stmt)
-            await self.db_session.commit()
+            async with self.session_factory() as session:
+                result = await session.execute(stmt)
+                await session.commit()
             
             deleted = result.rowcount > 0
             if deleted:
@@ -312,9 +297,10 @@ class ContextManager:
             return deleted
             
         except Exception as e:
-            await self.db_session.rollback()
             logger.error(f"Error deleting context: {e}")
             return False
+        finally:
+            self._cache.invalidate(user_id)
     
     async def count_user_contexts(self, user_id: int) -> int:
         """
@@ -327,11 +313,7 @@ class ContextManager:
             Количество контекстов
         """
         try:
-            stmt = select(func.count(UserContextModel.id)).where(
-                UserContextModel.user_id == user_id
-            )
-            result = await self.db_session.execute(stmt)
-            return result.scalar() or 0
+            return len(await self._cached_user_contexts(user_id))
             
         except Exception as e:
             logger.error(f"Error counting contexts: {e}")
@@ -390,18 +372,18 @@ class ContextManager:
 context_manager: Optional[ContextManager] = None
 
 
-def initialize_context_manager(db_session) -> ContextManager:
+def initialize_context_manager(session_factory) -> ContextManager:
     """
     Инициализация глобального экземпляра менеджера контекстов.
     
     Args:
-        db_session: Сессия базы данных
+        session_factory: Фабрика сессий БД (db.async_session)
         
     Returns:
         Экземпляр ContextManager
     """
     global context_manager
-    context_manager = ContextManager(db_session)
+    context_manager = ContextManager(session_factory)
     return context_manager
 
 
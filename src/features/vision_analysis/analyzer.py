@@ -1,17 +1,45 @@
 """GPT-4 Vision analyzer for Instagram Reels."""
 
+import asyncio
+import base64
 import logging
 from typing import List, Optional, Dict, Any
 import httpx
 import json
 from datetime import datetime
 
-from .prompts import VISION_SYSTEM_PROMPT, VISION_ANALYSIS_PROMPT, VISUAL_PATTERNS_PROMPT, AUDIO_ANALYSIS_PROMPT
+from .prompts import (
+    VISION_SYSTEM_PROMPT, VISION_ANALYSIS_PROMPT, VISUAL_PATTERNS_PROMPT,
+    AUDIO_ANALYSIS_PROMPT, THUMBNAIL_ANALYSIS_PROMPT
+)
+from .audio_features import AudioFeatures, analyze_audio
+from .decode_scheduler import decode_scheduler
+from .fingerprint import FingerprintIndex, FingerprintMatch, is_informative
+from .frame_policy import FramePolicy
 from .video_processor import VideoProcessor
-from src.domain.models import ReelData
+from src.domain.models import AnalysisDepth, AnalysisTier, ReelData, get_analysis_tier
+from src.services.image_cache import image_cache
+from src.utils.config import config
 
 logger = logging.getLogger(__name__)
 
+# Rough OpenAI costs used for the batch spend cap
+ESTIMATED_FRAME_COST_USD = 0.003  # one high-detail frame on gpt-4o
+ESTIMATED_ANSWER_COST_USD = 0.015  # frame analysis answer
+ESTIMATED_PATTERNS_COST_USD = 0.002
+ESTIMATED_THUMBNAIL_COST_USD = 0.002  # low-detail cover and caption
+
+
+def estimate_reel_analysis_cost(tier: AnalysisTier) -> float:
+    """Estimate the cost of analyzing one reel with the given tier."""
+    if tier.thumbnail_only:
+        return ESTIMATED_THUMBNAIL_COST_USD
+    
+    cost = tier.num_frames * ESTIMATED_FRAME_COST_USD + ESTIMATED_ANSWER_COST_USD
+    if tier.extract_patterns:
+        cost += ESTIMATED_PATTERNS_COST_USD
+    return cost
+
 
 class VisionAnalyzer:
     """Analyze Instagram Reels using GPT-4 Vision API."""
@@ -31,62 +59,132 @@ class VisionAnalyzer:
             "Content-Type": "application/json"
         }
         self.video_processor = VideoProcessor()
+        self.image_cache = image_cache
+        self.fingerprint_index = FingerprintIndex(max_distance=config.vision.fingerprint_max_distance)
     
-    async def analyze_reel(self, reel: ReelData, video_url: Optional[str] = None) -> Dict[str, Any]:
+    async def analyze_reel(
+        self,
+        reel: ReelData,
+        video_url: Optional[str] = None,
+        tier: Optional[AnalysisTier] = None
+    ) -> Dict[str, Any]:
         """Perform comprehensive analysis of Instagram Reel.
         
         Args:
             reel: ReelData object with reel information
             video_url: Direct URL to video file (if available)
+            tier: Analysis depth settings (standard by default)
             
         Returns:
             Dictionary with analysis results
         """
+        tier = tier or get_analysis_tier()
+        
         try:
             analysis_result = {
                 "reel_id": reel.id,
                 "visual_analysis": None,
                 "audio_analysis": None,
                 "patterns": None,
+                "audio_features": None,
+                "strategy": "video",
                 "error": None
             }
             
+            # Fast tier: cover image and caption only, no video download
+            if tier.thumbnail_only and reel.thumbnail_url:
+                logger.info(f"Analyzing thumbnail for reel {reel.id}")
+                image = await self.image_cache.fetch(reel.thumbnail_url)
+                analysis_result["visual_analysis"] = await self._analyze_thumbnail(reel, tier, image)
+                analysis_result["strategy"] = "thumbnail"
+            
             # Download video if URL provided
-            if video_url:
+            elif video_url:
+                visual_analysis = None
+                audio_features = None
+                audio_task = None
+                fingerprint = None
+                duplicate = None
+                video_path = None
+                frame_paths = []
                 try:
                     logger.info(f"Downloading video for reel {reel.id}")
                     video_path = await self.video_processor.download_video(video_url)
                     
-                    # Extract key frames
-                    logger.info("Extracting key frames")
-                    frame_paths = self.video_processor.extract_key_frames(video_path, num_frames=5)
+                    # Reels analyzed before at this depth or deeper (and their re-uploads) reuse the stored analysis
+                    fingerprint = await self._fingerprint(video_path)
+                    if fingerprint:
+                        duplicate = await self.fingerprint_index.find(fingerprint)
                     
-                    # Convert frames to base64
-                    base64_frames = self.video_processor.frames_to_base64(frame_paths)
-                    
-                    # Analyze frames
-                    logger.info("Analyzing frames with GPT-4 Vision")
-                    visual_analysis = await self._analyze_frames(base64_frames)
-                    analysis_result["visual_analysis"] = visual_analysis
+                    if duplicate and self._covers_tier(duplicate.analysis, tier):
+                        logger.info(
+                            f"Reel {reel.id} matches analyzed reel {duplicate.reel_id} "
+                            f"(distance {duplicate.distance:.1f}), reusing its analysis"
+                        )
+                        analysis_result.update(self._reuse_analysis(duplicate, reel.id))
+                    else:
+                        # Audio features are computed locally while frames are analyzed
+                        audio_task = asyncio.create_task(self._extract_audio_features(video_path))
+                        
+                        # Extract key frames
+                        logger.info("Extracting key frames")
+                        frame_paths = await decode_scheduler.run(
+                            self.video_processor.extract_key_frames,
+                            video_path,
+                            num_frames=tier.num_frames or 1,
+                            policy=self._frame_policy(tier.image_detail)
+                        )
+                        
+                        # Convert frames to base64
+                        base64_frames = self.video_processor.frames_to_base64(frame_paths)
+                        
+                        # Analyze frames
+                        logger.info("Analyzing frames with GPT-4 Vision")
+                        visual_analysis = await self._analyze_frames(
+                            base64_frames, detail=tier.image_detail, model=tier.vision_model
+                        )
+                        analysis_result["visual_analysis"] = visual_analysis
+                        
+                        audio_features = await audio_task
                     
                 except Exception as e:
+                    if audio_task:
+                        audio_task.cancel()
                     logger.warning(f"Could not download/analyze video for reel {reel.id}: {e}")
                     analysis_result["visual_analysis"] = "Видео анализ недоступен - не удалось загрузить видеофайл"
                     analysis_result["error"] = f"Video download failed: {str(e)}"
                 
                 # Extract patterns
-                if visual_analysis:
+                if visual_analysis and tier.extract_patterns:
                     patterns = await self._extract_patterns(visual_analysis)
                     analysis_result["patterns"] = patterns
                 
+                if audio_features:
+                    analysis_result["audio_features"] = audio_features.to_dict()
+                    analysis_result["audio_analysis"] = audio_features.to_prompt_text()
+                
+                # Remember the fresh analysis for future re-uploads
+                if fingerprint and visual_analysis:
+                    await self.fingerprint_index.add(
+                        reel.id,
+                        fingerprint,
+                        analysis={**analysis_result, "analysis_depth": tier.depth.value},
+                        reel_url=reel.url,
+                        author_username=reel.author_username
+                    )
+                
                 # Clean up temp files
-                self.video_processor.cleanup_temp_files(frame_paths + [video_path])
+                self.video_processor.cleanup_temp_files(
+                    frame_paths + ([video_path] if video_path else [])
+                )
             
-            # Analyze transcript if available
+            # Analyze transcript if available (together with audio features)
             if reel.transcript:
                 logger.info("Analyzing transcript")
-                audio_analysis = await self._analyze_transcript(reel.transcript)
-                analysis_result["audio_analysis"] = audio_analysis
+                audio_analysis = await self._analyze_transcript(
+                    reel.transcript, analysis_result["audio_analysis"]
+                )
+                analysis_result["audio_analysis"] = audio_analysis or analysis_result["audio_analysis"]
             
             return analysis_result
             
@@ -94,17 +192,129 @@ class VisionAnalyzer:
             logger.error(f"Error in full analysis for reel {reel.id}: {e}", exc_info=True)
             return {"error": str(e)}
 
-    async def analyze_reel_by_url(self, video_url: str) -> Optional[Dict[str, Any]]:
+    async def analyze_reels(
+        self,
+        reels: List[ReelData],
+        max_concurrency: int = 3,
+        max_cost_usd: Optional[float] = None,
+        tier: Optional[AnalysisTier] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Analyze several reels concurrently.
+        
+        At most ``max_concurrency`` analyses run at once. Reels are started in
+        the given order until the estimated spend would exceed ``max_cost_usd``;
+        the remaining reels are skipped.
+        
+        Args:
+            reels: Reels to analyze, most important first
+            max_concurrency: Maximum number of simultaneous analyses
+            max_cost_usd: Estimated spend cap for the whole batch
+            tier: Analysis depth settings (standard by default)
+            
+        Returns:
+            Dictionary mapping reel ID to its analysis result
+        """
+        tier = tier or get_analysis_tier()
+        reel_cost = estimate_reel_analysis_cost(tier)
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+        
+        selected = []
+        for reel in reels:
+            if not (tier.thumbnail_only and reel.thumbnail_url) and not reel.video_url:
+                continue
+            estimated_cost = (len(selected) + 1) * reel_cost
+            if max_cost_usd is not None and estimated_cost > max_cost_usd:
+                logger.info(f"Vision cost cap ${max_cost_usd} reached, skipping remaining reels")
+                break
+            selected.append(reel)
+        
+        async def analyze_one(reel: ReelData) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.analyze_reel(reel, reel.video_url, tier=tier)
+        
+        results = await asyncio.gather(
+            *(analyze_one(reel) for reel in selected),
+            return_exceptions=True
+        )
+        
+        analyses = {}
+        for reel, result in zip(selected, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Vision analysis failed for reel {reel.id}: {result}")
+                continue
+            if result.get("visual_analysis"):
+                analyses[reel.id] = result
+        
+        logger.info(f"Analyzed {len(analyses)}/{len(selected)} reels with GPT-4 Vision")
+        return analyses
+
+    async def analyze_thumbnails(
+        self,
+        reels: List[ReelData],
+        max_concurrency: int = 5,
+        tier: Optional[AnalysisTier] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Analyze cover image, caption and hashtags of every reel.
+        
+        No video is downloaded: all covers are fetched in parallel (cached
+        on disk by URL digest), then analyzed concurrently at low detail.
+        
+        Args:
+            reels: Reels to analyze
+            max_concurrency: Maximum number of simultaneous API requests
+            tier: Analysis depth settings (fast tier by default)
+            
+        Returns:
+            Dictionary mapping reel ID to its analysis result
+        """
+        tier = tier or get_analysis_tier(AnalysisDepth.FAST.value)
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+        
+        selected = [reel for reel in reels if reel.thumbnail_url]
+        images = await self.image_cache.fetch_many(
+            reel.thumbnail_url for reel in selected
+        )
+        
+        async def analyze_one(reel: ReelData) -> Optional[str]:
+            async with semaphore:
+                return await self._analyze_thumbnail(reel, tier, images.get(reel.thumbnail_url))
+        
+        results = await asyncio.gather(
+            *(analyze_one(reel) for reel in selected),
+            return_exceptions=True
+        )
+        
+        analyses = {}
+        for reel, visual_analysis in zip(selected, results):
+            if isinstance(visual_analysis, Exception) or not visual_analysis:
+                continue
+            analyses[reel.id] = {
+                "reel_id": reel.id,
+                "visual_analysis": visual_analysis,
+                "audio_analysis": None,
+                "patterns": None,
+                "strategy": "thumbnail",
+                "error": None
+            }
+        
+        logger.info(f"Analyzed {len(analyses)}/{len(selected)} reel thumbnails")
+        return analyses
+
+    async def analyze_reel_by_url(
+        self,
+        video_url: str,
+        tier: Optional[AnalysisTier] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Shortcut to analyze a reel directly from a video URL.
 
         Args:
             video_url: The direct URL to the video file.
+            tier: Analysis depth settings (standard by default).
 
         Returns:
             A dictionary with analysis results or None on failure.
         """
-        from datetime import datetime
         mock_reel = ReelData(
             id="from_url", 
             title="Vision Analysis Reel",
@@ -119,13 +329,20 @@ class VisionAnalyzer:
             engagement_rate=0.0,
             date=datetime.now()
         )
-        return await self.analyze_reel(mock_reel, video_url)
+        return await self.analyze_reel(mock_reel, video_url, tier=tier)
     
-    async def _analyze_frames(self, base64_frames: List[str]) -> Optional[str]:
+    async def _analyze_frames(
+        self,
+        base64_frames: List[str],
+        detail: str = "high",
+        model: Optional[str] = None
+    ) -> Optional[str]:
         """Analyze video frames using GPT-4 Vision.
         
         Args:
             base64_frames: List of base64 encoded frame images
+            detail: OpenAI image detail level
+            model: Vision model (analyzer default if not set)
             
         Returns:
             Analysis text or None
@@ -154,7 +371,7 @@ class VisionAnalyzer:
                     "type": "image_url",
                     "image_url": {
                         "url": f"data:image/jpeg;base64,{frame_base64}",
-                        "detail": "high"
+                        "detail": detail
                     }
                 })
             
@@ -164,7 +381,7 @@ class VisionAnalyzer:
                     self.api_url,
                     headers=self.headers,
                     json={
-                        "model": self.model,
+                        "model": model or self.model,
                         "messages": messages,
                         "max_tokens": 1500,
                         "temperature": 0.7
@@ -185,6 +402,79 @@ class VisionAnalyzer:
             logger.error(f"Error in frame analysis: {str(e)}")
             return None
     
+    async def _analyze_thumbnail(
+        self,
+        reel: ReelData,
+        tier: AnalysisTier,
+        image: Optional[bytes] = None
+    ) -> Optional[str]:
+        """Analyze reel cover image together with caption and hashtags.
+        
+        Args:
+            reel: ReelData object with thumbnail URL and caption
+            tier: Analysis depth settings
+            image: Prefetched cover image (remote URL is used if not set)
+            
+        Returns:
+            Analysis text or None
+        """
+        try:
+            content = [
+                {
+                    "type": "text",
+                    "text": THUMBNAIL_ANALYSIS_PROMPT.format(
+                        caption=reel.title or "Без подписи",
+                        hashtags=", ".join(reel.hashtags) if reel.hashtags else "нет"
+                    )
+                }
+            ]
+            if image:
+                image_url = f"data:image/jpeg;base64,{base64.b64encode(image).decode('utf-8')}"
+            else:
+                image_url = reel.thumbnail_url
+            
+            if image_url:
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image_url,
+                        "detail": tier.image_detail
+                    }
+                })
+            
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    self.api_url,
+                    headers=self.headers,
+                    json={
+                        "model": tier.vision_model,
+                        "messages": [
+                            {
+                                "role": "system",
+                                "content": VISION_SYSTEM_PROMPT
+                            },
+                            {
+                                "role": "user",
+                                "content": content
+                            }
+                        ],
+                        "max_tokens": 600,
+                        "temperature": 0.7
+                    },
+                    timeout=30.0
+                )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data["choices"][0]["message"]["content"]
+            else:
+                logger.error(f"Thumbnail API error: {response.status_code} - {response.text}")
+                return None
+                
+        except Exception as e:
+            logger.error(f"Error in thumbnail analysis: {str(e)}")
+            return None
+    
     async def _extract_patterns(self, visual_analysis: str) -> Optional[str]:
         """Extract success patterns from visual analysis.
         
@@ -229,17 +519,118 @@ class VisionAnalyzer:
             logger.error(f"Error extracting patterns: {str(e)}")
             return None
     
-    async def _analyze_transcript(self, transcript: str) -> Optional[str]:
+    async def _fingerprint(self, video_path: str) -> Optional[List[int]]:
+        """Compute temporal fingerprint of a downloaded video.
+        
+        Args:
+            video_path: Path to downloaded video
+            
+        Returns:
+            Frame hashes or None (disabled, unreadable or flat video)
+        """
+        if not config.vision.fingerprint_enabled:
+            return None
+        
+        fingerprint = await self.fingerprint_index.fingerprint(video_path)
+        if fingerprint and not is_informative(fingerprint):
+            return None
+        return fingerprint
+    
+    @staticmethod
+    def _covers_tier(analysis: Optional[Dict[str, Any]], tier: AnalysisTier) -> bool:
+        """Check that a stored analysis is at least as deep as the tier asks for.
+        
+        Args:
+            analysis: Stored analysis of a fingerprint match
+            tier: Analysis depth settings of the current run
+            
+        Returns:
+            True if the analysis can be reused (entries without a depth can't)
+        """
+        if not analysis:
+            return False
+        try:
+            return AnalysisDepth(analysis.get("analysis_depth")).rank >= tier.depth.rank
+        except ValueError:
+            return False
+    
+    @staticmethod
+    def _reuse_analysis(match: FingerprintMatch, reel_id: str) -> Dict[str, Any]:
+        """Build analysis fields from the stored analysis of a near-duplicate.
+        
+        Args:
+            match: Near-duplicate found in the fingerprint index
+            reel_id: ID of the analyzed reel
+            
+        Returns:
+            Fields to merge into the analysis result ("duplicate_of" only
+            when the match is another reel, not an earlier analysis of this one)
+        """
+        stored = match.analysis or {}
+        fields = {
+            "visual_analysis": stored.get("visual_analysis"),
+            "audio_analysis": stored.get("audio_analysis"),
+            "patterns": stored.get("patterns"),
+            "audio_features": stored.get("audio_features"),
+            "strategy": "fingerprint"
+        }
+        if match.reel_id != reel_id:
+            fields["duplicate_of"] = {
+                "reel_id": match.reel_id,
+                "reel_url": match.reel_url,
+                "author_username": match.author_username,
+                "distance": round(match.distance, 1)
+            }
+        return fields
+    
+    def _frame_policy(self, detail: str) -> FramePolicy:
+        """Frame resize policy for the image detail level."""
+        return FramePolicy.for_detail(
+            detail,
+            tiles_wide=config.vision.frame_tiles_wide,
+            tiles_high=config.vision.frame_tiles_high,
+            crop_letterbox=config.vision.frame_crop_letterbox,
+            center_crop_aspect=9 / 16 if config.vision.frame_center_crop else None
+        )
+    
+    async def _extract_audio_features(self, video_path: str) -> Optional[AudioFeatures]:
+        """Extract local audio features (no API call).
+        
+        Args:
+            video_path: Path to downloaded video
+            
+        Returns:
+            Audio features or None
+        """
+        if not config.audio.enabled:
+            return None
+        
+        return await analyze_audio(
+            video_path,
+            sample_rate=config.audio.sample_rate,
+            max_seconds=config.audio.max_duration_seconds,
+            timeout=config.audio.timeout_seconds
+        )
+    
+    async def _analyze_transcript(
+        self,
+        transcript: str,
+        audio_features: Optional[str] = None
+    ) -> Optional[str]:
         """Analyze audio transcript.
         
         Args:
             transcript: Audio transcript text
+            audio_features: Formatted local audio features
             
         Returns:
             Analysis text or None
         """
         try:
-            prompt = AUDIO_ANALYSIS_PROMPT.format(transcript=transcript)
+            prompt = AUDIO_ANALYSIS_PROMPT.format(
+                transcript=transcript,
+                audio_features=audio_features or "Недоступны"
+            )
             
             async with httpx.AsyncClient() as client:
                 response = await client.post(
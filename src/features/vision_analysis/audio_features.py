@@ -0,0 +1,302 @@
+"""Local audio feature extraction for Instagram Reels (no API calls)."""
+
+import logging
+import shutil
+import subprocess
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.utils.process_pool import run_in_process
+
+logger = logging.getLogger(__name__)
+
+# Analysis frames: 25 ms windows with 10 ms hop
+FRAME_SECONDS = 0.025
+HOP_SECONDS = 0.010
+
+# Loudness curve resolution
+LOUDNESS_WINDOW_SECONDS = 0.5
+
+# Hook is the first seconds of a reel
+HOOK_SECONDS = 3.0
+
+# Frames quieter than this are silence; shorter pauses are not reported
+SILENCE_DB = -45.0
+MIN_SILENCE_SECONDS = 0.3
+
+# Speech has many low-energy frames between syllables, music is denser.
+# A 1 s segment is speech-like when this share of its frames is below
+# half of the segment mean energy.
+SPEECH_LOW_ENERGY_RATIO = 0.3
+
+# Tempo search range
+MIN_BPM = 60
+MAX_BPM = 180
+MIN_TEMPO_STRENGTH = 0.1
+
+
+@dataclass
+class AudioFeatures:
+    """Audio features of a reel."""
+    duration_seconds: float
+    mean_loudness_db: float
+    hook_loudness_db: float
+    loudness_curve_db: List[float] = field(default_factory=list)  # one value per 0.5 s
+    speech_ratio: float = 0.0
+    music_ratio: float = 0.0
+    tempo_bpm: Optional[float] = None
+    silence_gaps: List[Tuple[float, float]] = field(default_factory=list)  # (start, end) seconds
+
+    @property
+    def hook_contrast_db(self) -> float:
+        """How much louder the hook is than the rest of the reel."""
+        return self.hook_loudness_db - self.mean_loudness_db
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for storage."""
+        return asdict(self)
+
+    def to_prompt_text(self) -> str:
+        """Format features for GPT prompts."""
+        if self.speech_ratio >= 0.6:
+            content = "преимущественно речь"
+        elif self.music_ratio >= 0.6:
+            content = "преимущественно музыка"
+        else:
+            content = "речь и музыка"
+
+        lines = [
+            f"- Длительность аудио: {self.duration_seconds:.1f} сек",
+            f"- Содержание: {content} (речь {self.speech_ratio:.0%}, музыка {self.music_ratio:.0%})",
+            f"- Средняя громкость: {self.mean_loudness_db:.1f} dBFS",
+            f"- Громкость хука (первые {HOOK_SECONDS:.0f} сек): {self.hook_loudness_db:.1f} dBFS "
+            f"({self.hook_contrast_db:+.1f} dB к среднему)",
+            f"- Темп: {self.tempo_bpm:.0f} BPM" if self.tempo_bpm else "- Темп: не выражен",
+        ]
+
+        if self.silence_gaps:
+            gaps = ", ".join(f"{start:.1f}-{end:.1f}с" for start, end in self.silence_gaps[:5])
+            lines.append(f"- Паузы ({len(self.silence_gaps)}): {gaps}")
+        else:
+            lines.append("- Пауз нет")
+
+        if self.loudness_curve_db:
+            # Coarse curve: one value per second
+            curve = self.loudness_curve_db[::2][:30]
+            lines.append("- Кривая громкости по секундам (dBFS): " + " ".join(f"{v:.0f}" for v in curve))
+
+        return "\n".join(lines)
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Find FFmpeg binary (local bin/ffmpeg first, then system)."""
+    project_root = Path(__file__).parent.parent.parent.parent.absolute()
+    local_ffmpeg = project_root / "bin" / "ffmpeg"
+    if local_ffmpeg.exists():
+        return str(local_ffmpeg)
+    return shutil.which("ffmpeg")
+
+
+def decode_audio(
+    video_path: str,
+    ffmpeg_path: str,
+    sample_rate: int = 16000,
+    max_seconds: float = 60.0,
+    timeout: float = 20.0
+) -> np.ndarray:
+    """Demux audio track into mono float32 samples in [-1, 1].
+
+    Args:
+        video_path: Path to video file
+        ffmpeg_path: Path to FFmpeg binary
+        sample_rate: Output sample rate
+        max_seconds: Decode at most this many seconds
+        timeout: FFmpeg timeout in seconds
+
+    Returns:
+        Audio samples (empty if the video has no audio)
+    """
+    command = [
+        ffmpeg_path, "-nostdin", "-v", "error",
+        "-t", str(max_seconds),
+        "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(sample_rate),
+        "-f", "s16le", "-"
+    ]
+    result = subprocess.run(command, capture_output=True, timeout=timeout, check=True)
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def compute_audio_features(samples: np.ndarray, sample_rate: int = 16000) -> AudioFeatures:
+    """Compute audio features from mono samples.
+
+    Args:
+        samples: Mono float samples in [-1, 1]
+        sample_rate: Sample rate
+
+    Returns:
+        Computed audio features
+    """
+    duration = samples.size / sample_rate
+    frame_size = int(FRAME_SECONDS * sample_rate)
+    hop_size = int(HOP_SECONDS * sample_rate)
+
+    if samples.size < frame_size:
+        return AudioFeatures(
+            duration_seconds=round(duration, 2),
+            mean_loudness_db=-100.0,
+            hook_loudness_db=-100.0
+        )
+
+    # Frame energy
+    frames = sliding_window_view(samples, frame_size)[::hop_size]
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    db = 20 * np.log10(np.maximum(rms, 1e-5))
+    silent = db < SILENCE_DB
+
+    # Loudness curve
+    per_window = int(round(LOUDNESS_WINDOW_SECONDS / HOP_SECONDS))
+    windows = db.size // per_window
+    if windows:
+        curve = db[:windows * per_window].reshape(windows, per_window).mean(axis=1)
+    else:
+        curve = np.array([db.mean()])
+
+    mean_db = float(db[~silent].mean()) if (~silent).any() else float(db.mean())
+    hook_db = float(db[:int(HOOK_SECONDS / HOP_SECONDS)].mean())
+
+    return AudioFeatures(
+        duration_seconds=round(duration, 2),
+        mean_loudness_db=round(mean_db, 1),
+        hook_loudness_db=round(hook_db, 1),
+        loudness_curve_db=[round(float(v), 1) for v in curve],
+        **_speech_music_ratio(rms, silent),
+        tempo_bpm=_estimate_tempo(rms),
+        silence_gaps=_silence_gaps(silent)
+    )
+
+
+def _speech_music_ratio(rms: np.ndarray, silent: np.ndarray) -> Dict[str, float]:
+    """Share of speech-like and music-like seconds among non-silent ones."""
+    per_segment = int(round(1.0 / HOP_SECONDS))
+    segments = rms.size // per_segment
+    if not segments:
+        return {"speech_ratio": 0.0, "music_ratio": 0.0}
+
+    segment_rms = rms[:segments * per_segment].reshape(segments, per_segment)
+    voiced = ~silent[:segments * per_segment].reshape(segments, per_segment).all(axis=1)
+    if not voiced.any():
+        return {"speech_ratio": 0.0, "music_ratio": 0.0}
+
+    low_energy = (segment_rms < 0.5 * segment_rms.mean(axis=1, keepdims=True)).mean(axis=1)
+    speech = voiced & (low_energy > SPEECH_LOW_ENERGY_RATIO)
+
+    speech_ratio = float(speech.sum() / voiced.sum())
+    return {"speech_ratio": round(speech_ratio, 2), "music_ratio": round(1.0 - speech_ratio, 2)}
+
+
+def _estimate_tempo(rms: np.ndarray) -> Optional[float]:
+    """Estimate tempo from autocorrelation of the onset envelope."""
+    onset = np.maximum(np.diff(np.log1p(1000 * rms)), 0)
+    onset = onset - onset.mean()
+
+    min_lag = int(round(60 / (MAX_BPM * HOP_SECONDS)))
+    max_lag = min(int(round(60 / (MIN_BPM * HOP_SECONDS))), onset.size - 1)
+    if max_lag <= min_lag:
+        return None
+
+    # Autocorrelation via FFT
+    n_fft = 1 << int(np.ceil(np.log2(2 * onset.size)))
+    spectrum = np.fft.rfft(onset, n_fft)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), n_fft)[:onset.size]
+    if autocorr[0] <= 0:
+        return None
+
+    lag = min_lag + int(np.argmax(autocorr[min_lag:max_lag + 1]))
+    if autocorr[lag] / autocorr[0] < MIN_TEMPO_STRENGTH:
+        return None
+
+    return round(60 / (lag * HOP_SECONDS), 1)
+
+
+def _silence_gaps(silent: np.ndarray) -> List[Tuple[float, float]]:
+    """Find silence runs longer than MIN_SILENCE_SECONDS."""
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    long_enough = (ends - starts) * HOP_SECONDS >= MIN_SILENCE_SECONDS
+
+    return [
+        (round(float(start) * HOP_SECONDS, 2), round(float(end) * HOP_SECONDS, 2))
+        for start, end in zip(starts[long_enough], ends[long_enough])
+    ]
+
+
+def extract_audio_features(
+    video_path: str,
+    ffmpeg_path: Optional[str] = None,
+    sample_rate: int = 16000,
+    max_seconds: float = 60.0,
+    timeout: float = 20.0
+) -> Optional[AudioFeatures]:
+    """Decode audio of a video and compute its features.
+
+    Module-level so it can run in the process pool.
+
+    Args:
+        video_path: Path to video file
+        ffmpeg_path: Path to FFmpeg binary (searched if not set)
+        sample_rate: Decode sample rate
+        max_seconds: Analyze at most this many seconds
+        timeout: FFmpeg timeout in seconds
+
+    Returns:
+        Audio features or None if the video has no audio
+    """
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    if not ffmpeg_path:
+        raise RuntimeError("FFmpeg not found")
+
+    samples = decode_audio(video_path, ffmpeg_path, sample_rate, max_seconds, timeout)
+    if samples.size == 0:
+        return None
+
+    return compute_audio_features(samples, sample_rate)
+
+
+async def analyze_audio(
+    video_path: str,
+    sample_rate: int = 16000,
+    max_seconds: float = 60.0,
+    timeout: float = 20.0
+) -> Optional[AudioFeatures]:
+    """Extract audio features in the shared process pool.
+
+    Args:
+        video_path: Path to video file
+        sample_rate: Decode sample rate
+        max_seconds: Analyze at most this many seconds
+        timeout: FFmpeg timeout in seconds
+
+    Returns:
+        Audio features or None if unavailable
+    """
+    try:
+        # Arguments are positional: run_in_process takes its own timeout.
+        # Computing features after decoding is fast, so a small margin is enough.
+        return await run_in_process(
+            extract_audio_features,
+            video_path,
+            None,
+            sample_rate,
+            max_seconds,
+            timeout,
+            timeout=timeout + 5
+        )
+    except Exception as e:
+        logger.warning(f"Audio feature extraction failed for {video_path}: {e}")
+        return None
@@ -0,0 +1,157 @@
+"""Scheduler for parallel video decoding with OpenCV.
+
+Each OpenCV decode uses its own thread pool sized to all cores by default,
+so several simultaneous analyses oversubscribe the CPU and throughput
+collapses. The scheduler runs decode jobs in worker processes with
+cv2.setNumThreads set per worker and never runs more jobs than workers.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+
+from src.utils.config import config
+
+logger = logging.getLogger(__name__)
+
+# Window for the recent decoded-frames-per-second metric
+METRICS_WINDOW_SECONDS = 60.0
+
+
+def _init_worker(threads: int) -> None:
+    """Limit OpenCV threads in a decode worker process."""
+    cv2.setNumThreads(threads)
+
+
+def _count_frames(result: Any) -> int:
+    """Default frame counter: decode jobs return a list per decoded frame."""
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 0
+
+
+class DecodeScheduler:
+    """Run OpenCV decode jobs in a process pool capped to the core count."""
+
+    def __init__(self, max_workers: Optional[int] = None, threads_per_worker: int = 1):
+        """Initialize scheduler.
+
+        Args:
+            max_workers: Concurrent decodes (CPU count by default)
+            threads_per_worker: OpenCV threads in each worker
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.in_flight = 0
+        self.jobs_completed = 0
+        self.frames_decoded = 0
+        self.busy_seconds = 0.0
+        self._recent = deque()  # (finished_at, frames)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get worker pool, creating it on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.threads_per_worker,)
+            )
+            logger.info(
+                f"Decode scheduler started: {self.max_workers} workers, "
+                f"{self.threads_per_worker} OpenCV threads each"
+            )
+        return self._executor
+
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        count_frames: Callable[[Any], int] = _count_frames,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> Any:
+        """Run a picklable decode job, waiting for a free worker.
+
+        Args:
+            func: Module-level function or method of a picklable object
+            *args: Positional arguments
+            count_frames: Number of frames decoded, computed from the result
+            timeout: Seconds to wait for the job once started
+            **kwargs: Keyword arguments
+
+        Returns:
+            Job result
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                future = loop.run_in_executor(self._get_executor(), partial(func, *args, **kwargs))
+                result = await asyncio.wait_for(future, timeout=timeout)
+            finally:
+                self.in_flight -= 1
+
+            self._record(count_frames(result), time.perf_counter() - started)
+            return result
+
+    def _record(self, frames: int, seconds: float) -> None:
+        """Update throughput metrics with a finished job."""
+        now = time.monotonic()
+        self.jobs_completed += 1
+        self.frames_decoded += frames
+        self.busy_seconds += seconds
+        self._recent.append((now, frames))
+
+        while self._recent and now - self._recent[0][0] > METRICS_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    @property
+    def decoded_fps(self) -> float:
+        """Decoded frames per second over the recent window."""
+        if not self._recent:
+            return 0.0
+
+        now = time.monotonic()
+        frames = sum(count for finished_at, count in self._recent if now - finished_at <= METRICS_WINDOW_SECONDS)
+        span = min(METRICS_WINDOW_SECONDS, max(now - self._recent[0][0], 1.0))
+        return frames / span
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get scheduler metrics."""
+        return {
+            "max_workers": self.max_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "in_flight": self.in_flight,
+            "jobs_completed": self.jobs_completed,
+            "frames_decoded": self.frames_decoded,
+            "decoded_fps": round(self.decoded_fps, 1),
+            "avg_job_seconds": round(self.busy_seconds / self.jobs_completed, 3) if self.jobs_completed else 0.0
+        }
+
+    def shutdown(self) -> None:
+        """Stop worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info(f"Decode scheduler stopped: {self.get_metrics()}")
+
+
+# Global decode scheduler instance
+decode_scheduler = DecodeScheduler(
+    max_workers=config.vision.decode_workers or None,
+    threads_per_worker=config.vision.decode_threads_per_worker
+)
@@ -0,0 +1,196 @@
+"""Temporal video fingerprints for duplicate and re-upload detection.
+
+A reel is fingerprinted by the dHashes of frames sampled evenly over its
+duration. Every 64-bit hash is split into four 16-bit bands; two frames
+within Hamming distance 3 always share at least one band exactly, so
+band keys stored in the database act as a multi-index hash for candidate
+lookup, and candidates are then ranked by the full Hamming distance.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .decode_scheduler import decode_scheduler
+from src.storage.serialization import decode
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8  # 8x8 = 64-bit dHash
+FINGERPRINT_FRAMES = 8
+BAND_BITS = 16
+BANDS = 64 // BAND_BITS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+@dataclass
+class FingerprintMatch:
+    """Stored reel that is a near-duplicate of the analyzed one."""
+    reel_id: str
+    reel_url: Optional[str]
+    author_username: Optional[str]
+    distance: float  # mean Hamming distance per frame (bits)
+    analysis: Optional[Dict[str, Any]]
+
+
+def dhash(frame: np.ndarray, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash of a frame: sign of horizontal gradients on a tiny grayscale image."""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def compute_fingerprint(video_path: str, num_frames: int = FINGERPRINT_FRAMES) -> Optional[List[int]]:
+    """Compute dHashes of frames sampled evenly over the video.
+
+    Module-level so it can run in a decode worker process.
+
+    Args:
+        video_path: Path to video file
+        num_frames: Number of frames to hash
+
+    Returns:
+        Frame hashes in temporal order or None if the video can't be read
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            return None
+
+        # Skip the very first/last frames: re-uploads often trim or add intros
+        positions = np.linspace(0.05, 0.95, num_frames) * (total_frames - 1)
+
+        hashes = []
+        for position in positions.astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(position))
+            ret, frame = cap.read()
+            if ret:
+                hashes.append(dhash(frame))
+
+        return hashes or None
+    finally:
+        cap.release()
+
+
+def band_keys(hashes: List[int]) -> List[int]:
+    """Multi-index hashing keys (band index << 16 | band value) of frame hashes."""
+    keys = set()
+    for value in hashes:
+        for band in range(BANDS):
+            keys.add((band << BAND_BITS) | ((value >> (band * BAND_BITS)) & BAND_MASK))
+    return sorted(keys)
+
+
+def is_informative(hashes: List[int]) -> bool:
+    """Check that a fingerprint is not dominated by flat (e.g. black) frames."""
+    bits = HASH_SIZE * HASH_SIZE
+    textured = [h for h in hashes if bits // 8 <= bin(h).count("1") <= bits - bits // 8]
+    return len(textured) * 2 >= len(hashes)
+
+
+def fingerprint_distance(first: List[int], second: List[int]) -> float:
+    """Mean Hamming distance between aligned frame hashes.
+
+    Each frame is compared with the nearest frame of the other fingerprint
+    within one position, which tolerates small trims at the start.
+    """
+    if not first or not second:
+        return float(HASH_SIZE * HASH_SIZE)
+
+    a = np.array(first, dtype=np.uint64)
+    b = np.array(second, dtype=np.uint64)
+    # Pairwise Hamming distances between all frames
+    xor = a[:, None] ^ b[None, :]
+    distances = np.unpackbits(xor.view(np.uint8).reshape(len(a), len(b), 8), axis=2).sum(axis=2)
+
+    best = []
+    for i in range(len(a)):
+        j = i * (len(b) - 1) // max(len(a) - 1, 1)
+        window = distances[i, max(j - 1, 0):j + 2]
+        best.append(window.min())
+
+    return float(np.mean(best))
+
+
+class FingerprintIndex:
+    """Near-duplicate lookup of reels by temporal fingerprint (database backed)."""
+
+    def __init__(self, database=None, max_distance: float = 6.0, min_band_matches: int = 2):
+        """Initialize index.
+
+        Args:
+            database: Database instance (global one by default)
+            max_distance: Mean per-frame Hamming distance to treat reels as duplicates
+            min_band_matches: Shared band keys required to consider a candidate
+        """
+        if database is None:
+            from src.storage.sqlite import db as database
+        self.db = database
+        self.max_distance = max_distance
+        self.min_band_matches = min_band_matches
+
+    async def fingerprint(self, video_path: str) -> Optional[List[int]]:
+        """Compute fingerprint of a downloaded video in a decode worker."""
+        try:
+            return await decode_scheduler.run(compute_fingerprint, video_path, timeout=30)
+        except Exception as e:
+            logger.warning(f"Could not fingerprint {video_path}: {e}")
+            return None
+
+    async def find(self, hashes: List[int]) -> Optional[FingerprintMatch]:
+        """Find the closest stored reel within max_distance (the reel itself included).
+
+        Args:
+            hashes: Fingerprint of the analyzed reel
+
+        Returns:
+            Best match or None
+        """
+        try:
+            candidates = await self.db.find_fingerprint_candidates(
+                band_keys(hashes), min_matches=self.min_band_matches
+            )
+        except Exception as e:
+            logger.warning(f"Fingerprint lookup failed: {e}")
+            return None
+
+        best = None
+        for candidate in candidates:
+            stored = [int(value, 16) for value in candidate.frame_hashes.split()]
+            distance = fingerprint_distance(hashes, stored)
+            if distance <= self.max_distance and (best is None or distance < best.distance):
+                best = FingerprintMatch(
+                    reel_id=candidate.reel_id,
+                    reel_url=candidate.reel_url,
+                    author_username=candidate.author_username,
+                    distance=distance,
+                    analysis=decode(candidate.analysis_json)
+                )
+
+        return best
+
+    async def add(
+        self,
+        reel_id: str,
+        hashes: List[int],
+        analysis: Optional[Dict[str, Any]] = None,
+        reel_url: Optional[str] = None,
+        author_username: Optional[str] = None
+    ) -> None:
+        """Store fingerprint of an analyzed reel."""
+        try:
+            await self.db.save_fingerprint(
+                reel_id=reel_id,
+                frame_hashes=hashes,
+                band_keys=band_keys(hashes),
+                analysis=analysis,
+                reel_url=reel_url,
+                author_username=author_username
+            )
+        except Exception as e:
+            logger.warning(f"Could not store fingerprint for reel {reel_id}: {e}")
@@ -0,0 +1,126 @@
+"""Resize policy for sending vertical Reels frames to the vision model.
+
+OpenAI bills high-detail images by 512 px tiles: the image is fit into
+2048x2048, then scaled down so its shortest side is at most 768 px, and
+every started 512x512 tile costs 170 tokens on top of a fixed 85. A full
+1080x1920 reel frame becomes 768x1365, i.e. 2x3 = 6 tiles (1105 tokens).
+Resizing it ourselves to fit a 1x2 tile grid (512x910) costs 2 tiles
+(425 tokens) and shrinks the payload several times.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# OpenAI image billing constants
+TILE_SIZE = 512
+MAX_SIDE = 2048
+MAX_SHORT_SIDE = 768
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+
+# Rows/columns darker than this (0-255) are treated as letterbox bars
+LETTERBOX_THRESHOLD = 16
+
+
+def billed_size(width: int, height: int) -> Tuple[int, int]:
+    """Size the model actually sees for a high-detail image."""
+    scale = min(1.0, MAX_SIDE / max(width, height))
+    width, height = width * scale, height * scale
+
+    scale = min(1.0, MAX_SHORT_SIDE / min(width, height))
+    return int(width * scale), int(height * scale)
+
+
+def billed_tiles(width: int, height: int, detail: str = "high") -> int:
+    """Number of 512 px tiles billed for an image (0 for low detail)."""
+    if detail == "low":
+        return 0
+
+    width, height = billed_size(width, height)
+    return math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+
+
+def billed_tokens(width: int, height: int, detail: str = "high") -> int:
+    """Input tokens billed for an image."""
+    return BASE_TOKENS + TILE_TOKENS * billed_tiles(width, height, detail)
+
+
+@dataclass(frozen=True)
+class FramePolicy:
+    """How frames are cropped, resized and encoded before upload."""
+    tiles_wide: int = 1
+    tiles_high: int = 2
+    crop_letterbox: bool = True
+    center_crop_aspect: Optional[float] = None  # width / height, e.g. 9 / 16
+    jpeg_quality: int = 85
+
+    @classmethod
+    def for_detail(cls, detail: str, **kwargs) -> "FramePolicy":
+        """Policy for an OpenAI detail level (low detail is a single 512 px image)."""
+        if detail == "low":
+            kwargs.update(tiles_wide=1, tiles_high=1)
+        return cls(**kwargs)
+
+    def target_size(self, width: int, height: int) -> Tuple[int, int]:
+        """Largest size (no upscaling) that fits the tile grid."""
+        max_width = self.tiles_wide * TILE_SIZE
+        max_height = self.tiles_high * TILE_SIZE
+        scale = min(1.0, max_width / width, max_height / height)
+        return max(int(width * scale), 1), max(int(height * scale), 1)
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Crop and resize frame for upload."""
+        if self.crop_letterbox:
+            frame = remove_letterbox(frame)
+
+        if self.center_crop_aspect:
+            frame = center_crop(frame, self.center_crop_aspect)
+
+        height, width = frame.shape[:2]
+        new_width, new_height = self.target_size(width, height)
+        if (new_width, new_height) != (width, height):
+            frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
+
+        return frame
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        """Encode frame as JPEG."""
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("Could not encode frame")
+        return buffer.tobytes()
+
+    def write(self, frame: np.ndarray, path: str) -> None:
+        """Write frame as JPEG with policy quality."""
+        cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+
+
+def remove_letterbox(frame: np.ndarray, threshold: int = LETTERBOX_THRESHOLD) -> np.ndarray:
+    """Crop dark bars around the picture (letterbox/pillarbox)."""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    rows = np.flatnonzero(gray.max(axis=1) > threshold)
+    cols = np.flatnonzero(gray.max(axis=0) > threshold)
+
+    # Fully dark frame: nothing to crop to
+    if rows.size == 0 or cols.size == 0:
+        return frame
+
+    return frame[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+
+def center_crop(frame: np.ndarray, aspect: float) -> np.ndarray:
+    """Crop frame around its centre to width / height = aspect."""
+    height, width = frame.shape[:2]
+
+    if width / height > aspect:
+        new_width = max(int(height * aspect), 1)
+        left = (width - new_width) // 2
+        return frame[:, left:left + new_width]
+
+    new_height = max(int(width / aspect), 1)
+    top = (height - new_height) // 2
+    return frame[top:top + new_height]
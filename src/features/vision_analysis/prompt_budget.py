@@ -0,0 +1,279 @@
+"""
+Бюджетирование размера промтов для генерации сценариев.
+
+Оценивает размер промта в токенах до запроса, сжимает слишком большие поля
+(визуальный анализ, предыдущие сценарии, контекст пользователя) и подбирает
+max_tokens под оставшееся окно модели.
+"""
+
+import hashlib
+import math
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from src.utils.logger import get_logger
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken не обязателен - используем эвристику
+    tiktoken = None
+
+logger = get_logger(__name__)
+
+# Размер контекстного окна моделей (токены)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 16385
+
+# Средняя длина токена в символах для смешанного русского/английского текста
+CHARS_PER_TOKEN = 3.0
+
+# Запас на служебные токены сообщений
+MESSAGE_OVERHEAD_TOKENS = 16
+
+# Разделы визуального анализа, которые важнее всего для сценариев
+PRIORITY_SECTIONS = ("СВОДКА", "Маркетинг", "Хук", "МОНТАЖ", "ТЕКСТОВЫЕ")
+
+TRUNCATION_MARKER = "\n[...]\n"
+
+SUMMARY_PROMPT = """Сожми текст до {max_words} слов, сохранив структуру, тайминги, \
+текст на экране, хуки и призывы к действию. Ответь только сжатым текстом.
+
+ТЕКСТ:
+{text}"""
+
+
+@dataclass
+class PromptBudget:
+    """Промт, уложенный в бюджет, и подобранный max_tokens."""
+    prompt: str
+    prompt_tokens: int
+    max_tokens: int
+    compacted_fields: List[str] = field(default_factory=list)
+
+
+class PromptBudgeter:
+    """Оценка и сжатие промтов под бюджет токенов."""
+
+    def __init__(
+        self,
+        openai_client=None,
+        input_budget_tokens: int = 6000,
+        summary_model: str = "gpt-4o-mini",
+        summary_cache_size: int = 256
+    ):
+        """
+        Инициализация бюджетировщика.
+
+        Args:
+            openai_client: AsyncOpenAI клиент для сжатия дешевой моделью
+                (без него используется только детерминированное сжатие)
+            input_budget_tokens: Максимальный размер промта в токенах
+            summary_model: Модель для сжатия больших полей
+            summary_cache_size: Сколько сжатых текстов держать в кеше
+        """
+        self.openai_client = openai_client
+        self.input_budget_tokens = input_budget_tokens
+        self.summary_model = summary_model
+        self.summary_cache_size = summary_cache_size
+        self._summary_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._encodings: Dict[str, object] = {}
+
+    def count_tokens(self, text: str, model: str = "gpt-4o-mini") -> int:
+        """Оценить количество токенов в тексте."""
+        if not text:
+            return 0
+
+        encoding = self._get_encoding(model)
+        if encoding is not None:
+            return len(encoding.encode(text))
+
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    async def fit(
+        self,
+        template: str,
+        fields: Dict[str, str],
+        model: str = "gpt-4o-mini",
+        max_output_tokens: int = 2000,
+        min_output_tokens: int = 400,
+        compact_order: Optional[Sequence[str]] = None
+    ) -> PromptBudget:
+        """
+        Подставить поля в шаблон, уложив промт в бюджет.
+
+        Args:
+            template: Шаблон промта с плейсхолдерами {field}
+            fields: Значения полей
+            model: Модель, для которой считается окно
+            max_output_tokens: Максимальный ответ для этапа
+            min_output_tokens: Минимальный ответ, который нужно оставить
+            compact_order: Порядок сжатия полей (первые сжимаются первыми);
+                по умолчанию - от самого большого к меньшему
+
+        Returns:
+            Итоговый промт с оценкой размера и max_tokens
+        """
+        fields = dict(fields)
+        compacted: List[str] = []
+
+        window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+        budget = min(self.input_budget_tokens, window - min_output_tokens - MESSAGE_OVERHEAD_TOKENS)
+
+        prompt = template.format(**fields)
+        prompt_tokens = self.count_tokens(prompt, model)
+
+        if prompt_tokens > budget:
+            order = list(compact_order) if compact_order else sorted(
+                fields, key=lambda name: len(fields[name] or ""), reverse=True
+            )
+
+            for name in order:
+                overflow = prompt_tokens - budget
+                if overflow <= 0:
+                    break
+
+                value = fields.get(name) or ""
+                value_tokens = self.count_tokens(value, model)
+                if value_tokens == 0:
+                    continue
+
+                target = max(value_tokens - overflow, value_tokens // 4, 1)
+                fields[name] = await self.compact(value, target, model)
+                compacted.append(name)
+
+                prompt = template.format(**fields)
+                prompt_tokens = self.count_tokens(prompt, model)
+
+            logger.info(
+                f"Prompt compacted to {prompt_tokens} tokens "
+                f"(budget {budget}, fields: {', '.join(compacted)})"
+            )
+
+        available = window - prompt_tokens - MESSAGE_OVERHEAD_TOKENS
+        max_tokens = max(min(max_output_tokens, available), min_output_tokens)
+
+        return PromptBudget(
+            prompt=prompt,
+            prompt_tokens=prompt_tokens,
+            max_tokens=max_tokens,
+            compacted_fields=compacted
+        )
+
+    async def compact(self, text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+        """
+        Сжать текст до max_tokens.
+
+        Сначала извлекаются приоритетные разделы, затем, если текст намного
+        больше бюджета и доступен клиент, - сжатие дешевой моделью (с кешем),
+        в конце - детерминированная обрезка начала и конца.
+        """
+        if self.count_tokens(text, model) <= max_tokens:
+            return text
+
+        extracted = self.extract_sections(text, max_tokens, model)
+        if self.count_tokens(extracted, model) <= max_tokens:
+            return extracted
+
+        if self.openai_client is not None and self.count_tokens(text, model) > 2 * max_tokens:
+            summary = await self._summarize(text, max_tokens)
+            if summary and self.count_tokens(summary, model) <= max_tokens:
+                return summary
+
+        return self.truncate(text, max_tokens, model)
+
+    def extract_sections(self, text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+        """Оставить приоритетные разделы текста, пока они влезают в бюджет."""
+        sections = self._split_sections(text)
+        if len(sections) <= 1:
+            return text
+
+        def priority(index: int) -> int:
+            heading = sections[index].split("\n", 1)[0]
+            for rank, marker in enumerate(PRIORITY_SECTIONS):
+                if marker.lower() in heading.lower():
+                    return rank
+            return len(PRIORITY_SECTIONS)
+
+        selected = set()
+        used = 0
+        # Первый раздел (обычно хук/начало) важен всегда
+        for index in [0] + sorted(range(1, len(sections)), key=priority):
+            tokens = self.count_tokens(sections[index], model)
+            if used + tokens > max_tokens:
+                continue
+            selected.add(index)
+            used += tokens
+
+        return "\n".join(sections[i] for i in sorted(selected))
+
+    def truncate(self, text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+        """Детерминированно обрезать текст, сохранив начало и конец."""
+        if self.count_tokens(text, model) <= max_tokens:
+            return text
+
+        # Пропорция символов на токен для этого текста
+        ratio = len(text) / max(self.count_tokens(text, model), 1)
+        keep_chars = max(int(max_tokens * ratio) - len(TRUNCATION_MARKER), 0)
+        head = keep_chars * 2 // 3
+        tail = keep_chars - head
+
+        return text[:head] + TRUNCATION_MARKER + (text[-tail:] if tail else "")
+
+    async def _summarize(self, text: str, max_tokens: int) -> Optional[str]:
+        """Сжать текст дешевой моделью с кешированием по содержимому."""
+        key = hashlib.sha256(f"{max_tokens}:{text}".encode("utf-8")).hexdigest()
+
+        cached = self._summary_cache.get(key)
+        if cached is not None:
+            self._summary_cache.move_to_end(key)
+            return cached
+
+        try:
+            response = await self.openai_client.chat.completions.create(
+                model=self.summary_model,
+                messages=[{
+                    "role": "user",
+                    "content": SUMMARY_PROMPT.format(
+                        max_words=max(int(max_tokens * 0.6), 50),
+                        text=text
+                    )
+                }],
+                max_tokens=max_tokens,
+                temperature=0
+            )
+            summary = response.choices[0].message.content
+        except Exception as e:
+            logger.warning(f"Prompt summary failed, falling back to truncation: {e}")
+            return None
+
+        if summary:
+            self._summary_cache[key] = summary
+            if len(self._summary_cache) > self.summary_cache_size:
+                self._summary_cache.popitem(last=False)
+
+        return summary
+
+    @staticmethod
+    def _split_sections(text: str) -> List[str]:
+        """Разбить текст на разделы по заголовкам markdown и разделителям сцен."""
+        parts = re.split(r"\n(?=#{1,6} |---|\*\*\[)", text)
+        return [part for part in parts if part.strip()]
+
+    def _get_encoding(self, model: str):
+        """Получить токенизатор модели (если установлен tiktoken)."""
+        if tiktoken is None:
+            return None
+
+        if model not in self._encodings:
+            try:
+                self._encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encodings[model] = tiktoken.get_encoding("cl100k_base")
+
+        return self._encodings[model]
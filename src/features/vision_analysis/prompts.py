@@ -83,6 +83,20 @@ VISION_ANALYSIS_PROMPT = """Проанализируй предоставлен
 
 Ответь на русском языке."""
 
+THUMBNAIL_ANALYSIS_PROMPT = """Проанализируй обложку Instagram Reels вместе с подписью и хештегами.
+
+Подпись: {caption}
+Хештеги: {hashtags}
+
+Кратко опиши:
+1. Что изображено на обложке (персонажи, локация, текст на экране)
+2. Хук: чем обложка и подпись цепляют зрителя
+3. Формат ролика (говорящая голова, туториал, юмор, тренд и т.д.)
+4. Эмоциональные триггеры и целевая аудитория
+5. Идею для похожего ролика
+
+Ответь на русском языке, не более 10 пунктов."""
+
 VISUAL_PATTERNS_PROMPT = """На основе визуального анализа определи паттерны успешного контента:
 
 1. Структура видео (тайминг ключевых моментов)
@@ -91,10 +105,13 @@ VISUAL_PATTERNS_PROMPT = """На основе визуального анали
 4. Технические приемы монтажа
 5. Рекомендации для создания похожего контента"""
 
-AUDIO_ANALYSIS_PROMPT = """Проанализируй транскрипцию аудио из Instagram Reels:
+AUDIO_ANALYSIS_PROMPT = """Проанализируй аудио из Instagram Reels:
 
 Текст: {transcript}
 
+Аудио-признаки:
+{audio_features}
+
 Определи:
 1. Ключевые фразы и хуки
 2. Эмоциональный тон
@@ -107,6 +124,9 @@ ORIGINAL_SCENARIO_PROMPT = """На основе анализа создай ор
 ДАННЫЕ:
 {vision_analysis}
 
+АУДИО:
+{audio_analysis}
+
 Создай сценарий используя выявленные паттерны успеха:
 
 📝 ВИРУСНЫЙ СЦЕНАРИЙ
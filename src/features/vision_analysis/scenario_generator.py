@@ -1,13 +1,16 @@
 """
 Генератор сценариев с полным workflow из 4 промтов.
-Включает AI Vision анализ, Whisper транскрипцию и интеграцию с контекстами пользователя.
+Включает AI Vision анализ, локальный анализ аудио и интеграцию с контекстами пользователя.
 """
 
+import asyncio
+import contextlib
 import logging
 import tempfile
+import time
 import os
-from typing import Optional, Dict, Any, List
-from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+from dataclasses import dataclass, field
 from datetime import datetime
 
 import httpx
@@ -20,14 +23,20 @@ from .prompts import (
     VARIANT_SCENARIO_PROMPT,
     CONTEXT_BASED_SCENARIO_PROMPT
 )
+from .audio_features import AudioFeatures, analyze_audio
+from .prompt_budget import PromptBudgeter
 from .video_processor_dummy import VideoProcessor  # Использем заглушку вместо cv2
 # Whisper service removed
 from src.features.user_context import get_context_manager
-from src.domain.models import ReelData
+from src.domain.models import AnalysisTier, ReelData, get_analysis_tier
+from src.utils.config import config
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Колбэк потоковой генерации: (этап, накопленный текст этапа)
+StreamCallback = Callable[[str, str], Awaitable[None]]
+
 
 @dataclass
 class ScenarioResult:
@@ -38,22 +47,28 @@ class ScenarioResult:
     variant_scenario: Optional[str] = None
     context_scenario: Optional[str] = None
     audio_transcript: Optional[str] = None
+    audio_features: Optional[AudioFeatures] = None
     user_context: Optional[str] = None
     error_message: Optional[str] = None
     processing_time_seconds: Optional[float] = None
+    stage_timings: Dict[str, float] = field(default_factory=dict)  # этап -> секунды
 
 
 class ScenarioGenerator:
     """Генератор сценариев с полным 4-промтовым workflow."""
     
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, prompt_budget_tokens: int = 6000):
         """
         Инициализация генератора сценариев.
         
         Args:
             openai_api_key: API ключ OpenAI
+            prompt_budget_tokens: Максимальный размер промта в токенах
         """
         self.openai_client = AsyncOpenAI(api_key=openai_api_key)
+        self.budgeter = PromptBudgeter(self.openai_client, input_budget_tokens=prompt_budget_tokens)
+        # Доля бюджета промта под контекст пользователя
+        self.user_context_budget_tokens = prompt_budget_tokens // 4
         self.video_processor = VideoProcessor()  # Используем заглушку
         self.max_frames = 8  # Максимум кадров для анализа
         
@@ -62,7 +77,12 @@ class ScenarioGenerator:
         reel_data: ReelData,
         video_url: Optional[str] = None,
         user_id: Optional[int] = None,
-        context_id: Optional[int] = None
+        context_id: Optional[int] = None,
+        stream_callback: Optional[StreamCallback] = None,
+        pipelined: bool = False,
+        vision_analysis: Optional[str] = None,
+        tier: Optional[AnalysisTier] = None,
+        audio_features: Optional[AudioFeatures] = None
     ) -> ScenarioResult:
         """
         Генерация полного сценария с использованием всех 4 промтов.
@@ -72,69 +92,48 @@ class ScenarioGenerator:
             video_url: Прямая ссылка на видео для Vision анализа
             user_id: ID пользователя для получения контекста
             context_id: ID конкретного контекста пользователя
+            stream_callback: Колбэк для потоковой выдачи текста сценариев
+                (этап, накопленный текст); без него ответы ждутся целиком
+            pipelined: Запускать независимые этапы параллельно: визуальный
+                анализ и аудио одновременно, контекст готовится на фоне
+            vision_analysis: Готовый визуальный анализ (например, сохраненный
+                в отчете) - этап Vision анализа пропускается
+            tier: Режим анализа: модель сценариев и нужен ли вариативный
+                сценарий (по умолчанию - стандартный)
+            audio_features: Готовые аудио-признаки - этап анализа аудио
+                пропускается
             
         Returns:
             Результат генерации со всеми сценариями
         """
         start_time = datetime.now()
-        result = ScenarioResult()
+        result = ScenarioResult(vision_analysis=vision_analysis, audio_features=audio_features)
+        tier = tier or get_analysis_tier()
         
         try:
-            logger.info(f"Starting complete scenario generation for reel {reel_data.id}")
-            
-            # Шаг 1: Анализ видео с AI Vision (если есть URL)
-            if video_url:
-                try:
-                    result.vision_analysis = await self._generate_vision_analysis(video_url)
-                    logger.info("Vision analysis completed")
-                except Exception as e:
-                    logger.warning(f"Vision analysis failed: {e}")
-                    result.vision_analysis = "Визуальный анализ недоступен"
-            
-            # Шаг 2: Транскрипция аудио (если есть видео)
-            if video_url:
-                try:
-                    result.audio_transcript = await self._transcribe_audio(video_url)
-                    logger.info("Audio transcription completed")
-                except Exception as e:
-                    logger.warning(f"Audio transcription failed: {e}")
-                    result.audio_transcript = "Аудио транскрипция недоступна"
-            
-            # Шаг 3: Получить контекст пользователя (если указан)
-            if user_id and context_id:
-                result.user_context = await self._get_user_context(user_id, context_id)
-                logger.info("User context retrieved")
-            
-            # Шаг 4: Генерация оригинального сценария
-            result.original_scenario = await self._generate_original_scenario(
-                reel_data=reel_data,
-                vision_analysis=result.vision_analysis,
-                audio_transcript=result.audio_transcript
+            logger.info(
+                f"Starting complete scenario generation for reel {reel_data.id} "
+                f"({'pipelined' if pipelined else 'sequential'}, {tier.depth.value})"
             )
-            logger.info("Original scenario generated")
             
-            # Шаг 5: Генерация вариативного сценария
-            if result.original_scenario:
-                result.variant_scenario = await self._generate_variant_scenario(
-                    original_scenario=result.original_scenario,
-                    vision_analysis=result.vision_analysis
+            if pipelined:
+                await self._run_pipelined(
+                    result, reel_data, video_url, user_id, context_id, stream_callback, tier
                 )
-                logger.info("Variant scenario generated")
-            
-            # Шаг 6: Генерация персонализированного сценария (если есть контекст)
-            if result.user_context and result.original_scenario and result.variant_scenario:
-                result.context_scenario = await self._generate_context_scenario(
-                    original_scenario=result.original_scenario,
-                    variant_scenario=result.variant_scenario,
-                    user_context=result.user_context
+            else:
+                await self._run_sequential(
+                    result, reel_data, video_url, user_id, context_id, stream_callback, tier
                 )
-                logger.info("Context-based scenario generated")
             
             # Подсчитать время обработки
             end_time = datetime.now()
             result.processing_time_seconds = (end_time - start_time).total_seconds()
+            result.stage_timings["total"] = result.processing_time_seconds
             
-            logger.info(f"Complete scenario generation finished in {result.processing_time_seconds:.2f}s")
+            logger.info(
+                f"Complete scenario generation finished in {result.processing_time_seconds:.2f}s, "
+                f"stages: {self._format_timings(result.stage_timings)}"
+            )
             return result
             
         except Exception as e:
@@ -142,69 +141,277 @@ class ScenarioGenerator:
             result.error_message = str(e)
             return result
     
-    async def _generate_vision_analysis(self, video_url: str) -> Optional[str]:
-        """Генерация анализа визуальной составляющей."""
+    async def _run_sequential(
+        self,
+        result: ScenarioResult,
+        reel_data: ReelData,
+        video_url: Optional[str],
+        user_id: Optional[int],
+        context_id: Optional[int],
+        stream_callback: Optional[StreamCallback],
+        tier: AnalysisTier
+    ) -> None:
+        """Последовательный workflow: каждый этап ждет предыдущий."""
+        # Шаги 1-2: AI Vision и локальный анализ аудио (если есть URL и нет готовых)
+        if video_url:
+            await self._analyze_video(result, video_url, concurrent=False)
+        
+        # Шаг 3: Получить контекст пользователя (если указан)
+        if user_id and context_id:
+            result.user_context = await self._timed(
+                result, "user_context", self._get_user_context(user_id, context_id)
+            )
+            logger.info("User context retrieved")
+        
+        # Шаг 4: Генерация оригинального сценария
+        result.original_scenario = await self._timed(
+            result, "original", self._generate_original_scenario(
+                reel_data=reel_data,
+                vision_analysis=result.vision_analysis,
+                audio_features=result.audio_features,
+                stream_callback=stream_callback,
+                model=tier.scenario_model
+            )
+        )
+        logger.info("Original scenario generated")
+        
+        # Шаг 5: Генерация вариативного сценария (не во всех режимах)
+        if result.original_scenario and tier.generate_variants:
+            result.variant_scenario = await self._timed(
+                result, "variant", self._generate_variant_scenario(
+                    original_scenario=result.original_scenario,
+                    vision_analysis=result.vision_analysis,
+                    stream_callback=stream_callback,
+                    model=tier.scenario_model
+                )
+            )
+            logger.info("Variant scenario generated")
+        
+        # Шаг 6: Генерация персонализированного сценария (если есть контекст)
+        if result.user_context and result.original_scenario and (
+            result.variant_scenario or not tier.generate_variants
+        ):
+            result.context_scenario = await self._timed(
+                result, "context", self._generate_context_scenario(
+                    original_scenario=result.original_scenario,
+                    variant_scenario=result.variant_scenario,
+                    user_context=result.user_context,
+                    vision_analysis=result.vision_analysis,
+                    stream_callback=stream_callback,
+                    model=tier.scenario_model
+                )
+            )
+            logger.info("Context-based scenario generated")
+    
+    async def _run_pipelined(
+        self,
+        result: ScenarioResult,
+        reel_data: ReelData,
+        video_url: Optional[str],
+        user_id: Optional[int],
+        context_id: Optional[int],
+        stream_callback: Optional[StreamCallback],
+        tier: AnalysisTier
+    ) -> None:
+        """
+        Конвейерный workflow.
+        
+        Контекст пользователя загружается и сжимается параллельно с анализом
+        видео и генерацией сценариев, визуальный анализ и аудио идут
+        одновременно. Вариативный сценарий ждет полный оригинал: он строится
+        как альтернатива всему сценарию, а не только хуку. Персонализированный
+        сценарий ждет оба.
+        """
+        # Подготовка контекста (загрузка и сжатие) не зависит от видео - запускаем сразу
+        context_task = None
+        if user_id and context_id:
+            context_task = asyncio.create_task(self._timed(
+                result, "user_context", self._prepare_user_context(user_id, context_id)
+            ))
+        
         try:
-            # Скачать видео во временный файл
-            video_path = await self._download_video(video_url)
-            if not video_path:
-                logger.error("Failed to download video for vision analysis")
-                return None
+            # Визуальный анализ и аудио независимы друг от друга
+            if video_url:
+                await self._analyze_video(result, video_url, concurrent=True)
             
-            try:
-                # Извлечь кадры из видео
-                # frames_base64 = await self._extract_video_frames(video_path)  # Временно отключено
-                frames_base64 = []
-                if not frames_base64:
-                    logger.warning("Video analysis temporarily disabled - returning placeholder")
-                    return "Video analysis currently not available"
-                
-                # Подготовить содержимое для GPT-4o
-                content = [{"type": "text", "text": VISION_ANALYSIS_PROMPT}]
-                
-                # Добавить изображения
-                for frame_base64 in frames_base64:
-                    content.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{frame_base64}",
-                            "detail": "high"
-                        }
-                    })
-                
-                # Отправить запрос к GPT-4o
-                response = await self.openai_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": VISION_SYSTEM_PROMPT
-                        },
-                        {
-                            "role": "user",
-                            "content": content
-                        }
-                    ],
-                    max_tokens=1500,
-                    temperature=0.7
+            result.original_scenario = await self._timed(
+                result, "original", self._generate_original_scenario(
+                    reel_data=reel_data,
+                    vision_analysis=result.vision_analysis,
+                    audio_features=result.audio_features,
+                    stream_callback=stream_callback,
+                    model=tier.scenario_model
                 )
-                
-                return response.choices[0].message.content
-                
-            finally:
-                # Очистить временный файл
-                if os.path.exists(video_path):
-                    os.unlink(video_path)
-                    
+            )
+            
+            if result.original_scenario and tier.generate_variants:
+                result.variant_scenario = await self._timed(
+                    result, "variant", self._generate_variant_scenario(
+                        original_scenario=result.original_scenario,
+                        vision_analysis=result.vision_analysis,
+                        stream_callback=stream_callback,
+                        model=tier.scenario_model
+                    )
+                )
+            
+            logger.info("Original and variant scenarios generated")
+            
+            if context_task:
+                result.user_context = await context_task
+        finally:
+            # Упавший этап не должен оставлять подготовку контекста работать в фоне
+            if context_task and not context_task.done():
+                context_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await context_task
+        
+        if result.user_context and result.original_scenario and (
+            result.variant_scenario or not tier.generate_variants
+        ):
+            result.context_scenario = await self._timed(
+                result, "context", self._generate_context_scenario(
+                    original_scenario=result.original_scenario,
+                    variant_scenario=result.variant_scenario,
+                    user_context=result.user_context,
+                    vision_analysis=result.vision_analysis,
+                    stream_callback=stream_callback,
+                    model=tier.scenario_model
+                )
+            )
+            logger.info("Context-based scenario generated")
+    
+    async def _analyze_video(self, result: ScenarioResult, video_url: str, concurrent: bool) -> None:
+        """
+        Скачать Reel один раз и выполнить по нему недостающие этапы анализа.
+        
+        Args:
+            result: Результат генерации, куда записываются анализы и тайминги
+            video_url: Прямая ссылка на видео
+            concurrent: Выполнять визуальный анализ и аудио параллельно
+        """
+        need_vision = not result.vision_analysis
+        need_audio = not result.audio_features and config.audio.enabled
+        if not (need_vision or need_audio):
+            return
+        
+        video_path = await self._timed(result, "download", self._download_video(video_url))
+        if not video_path:
+            logger.error("Failed to download video for analysis")
+            return
+        
+        try:
+            stages = {}
+            if need_vision:
+                stages["vision"] = self._timed(result, "vision", self._safe_vision_analysis(video_path))
+            if need_audio:
+                stages["audio"] = self._timed(result, "audio", self._safe_audio_features(video_path))
+            
+            if concurrent:
+                outputs = dict(zip(stages, await asyncio.gather(*stages.values())))
+            else:
+                outputs = {stage: await coro for stage, coro in stages.items()}
+            result.vision_analysis = outputs.get("vision", result.vision_analysis)
+            result.audio_features = outputs.get("audio", result.audio_features)
+        finally:
+            # Очистить временный файл
+            if os.path.exists(video_path):
+                os.unlink(video_path)
+    
+    async def _safe_vision_analysis(self, video_path: str) -> Optional[str]:
+        """Визуальный анализ с заглушкой вместо исключения."""
+        try:
+            vision_analysis = await self._generate_vision_analysis(video_path)
+            logger.info("Vision analysis completed")
+            return vision_analysis
+        except Exception as e:
+            logger.warning(f"Vision analysis failed: {e}")
+            return "Визуальный анализ недоступен"
+    
+    async def _safe_audio_features(self, video_path: str) -> Optional[AudioFeatures]:
+        """Анализ аудио с None вместо исключения."""
+        try:
+            audio_features = await self._extract_audio_features(video_path)
+            logger.info("Audio features extracted")
+            return audio_features
+        except Exception as e:
+            logger.warning(f"Audio feature extraction failed: {e}")
+            return None
+    
+    async def _timed(self, result: ScenarioResult, stage: str, coro: Awaitable[Any]) -> Any:
+        """Выполнить этап и записать его длительность в result.stage_timings."""
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            result.stage_timings[stage] = round(time.perf_counter() - started, 3)
+    
+    @staticmethod
+    def _format_timings(timings: Dict[str, float]) -> str:
+        """Форматировать тайминги этапов для лога."""
+        return ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items())
+    
+    async def _generate_vision_analysis(self, video_path: str) -> Optional[str]:
+        """Генерация анализа визуальной составляющей по скачанному видео."""
+        try:
+            # Извлечь кадры из видео
+            # frames_base64 = await self._extract_video_frames(video_path)  # Временно отключено
+            frames_base64 = []
+            if not frames_base64:
+                logger.warning("Video analysis temporarily disabled - returning placeholder")
+                return "Video analysis currently not available"
+            
+            # Подготовить содержимое для GPT-4o
+            content = [{"type": "text", "text": VISION_ANALYSIS_PROMPT}]
+            
+            # Добавить изображения
+            for frame_base64 in frames_base64:
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{frame_base64}",
+                        "detail": "high"
+                    }
+                })
+            
+            # Отправить запрос к GPT-4o
+            response = await self.openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": VISION_SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": content
+                    }
+                ],
+                max_tokens=1500,
+                temperature=0.7
+            )
+            
+            return response.choices[0].message.content
+            
         except Exception as e:
             logger.error(f"Error in vision analysis: {e}")
             return None
     
-    async def _transcribe_audio(self, video_url: str) -> Optional[str]:
-        """Транскрипция аудио из видео (заглушка)."""
-        # Whisper service removed - return placeholder
-        logger.info("Audio transcription not available")
-        return None
+    async def _extract_audio_features(self, video_path: str) -> Optional[AudioFeatures]:
+        """
+        Локальный анализ аудио: громкость, речь/музыка, темп, паузы, хук.
+        
+        Выполняется в пуле процессов без запросов к API; время на Reel
+        ограничено длительностью декодирования и таймаутом ffmpeg.
+        """
+        if not config.audio.enabled:
+            return None
+        
+        return await analyze_audio(
+            video_path,
+            sample_rate=config.audio.sample_rate,
+            max_seconds=config.audio.max_duration_seconds,
+            timeout=config.audio.timeout_seconds
+        )
     
     async def _get_user_context(self, user_id: int, context_id: int) -> Optional[str]:
         """Получить контекст пользователя."""
@@ -224,34 +431,48 @@ class ScenarioGenerator:
             logger.error(f"Error getting user context: {e}")
             return None
     
+    async def _prepare_user_context(self, user_id: int, context_id: int) -> Optional[str]:
+        """Загрузить контекст пользователя и заранее сжать его до бюджета."""
+        user_context = await self._get_user_context(user_id, context_id)
+        if not user_context:
+            return None
+        return await self.budgeter.compact(user_context, self.user_context_budget_tokens)
+    
     async def _generate_original_scenario(
         self,
         reel_data: ReelData,
         vision_analysis: Optional[str] = None,
-        audio_transcript: Optional[str] = None
+        audio_features: Optional[AudioFeatures] = None,
+        stream_callback: Optional[StreamCallback] = None,
+        model: str = "gpt-4o-mini"
     ) -> Optional[str]:
         """Генерация сценария оригинального Reel."""
         try:
-            # Подготовить данные для промта
-            prompt = ORIGINAL_SCENARIO_PROMPT.format(
-                vision_analysis=vision_analysis or "Визуальный анализ не доступен"
+            # Подготовить данные для промта в пределах бюджета
+            budget = await self.budgeter.fit(
+                ORIGINAL_SCENARIO_PROMPT,
+                {
+                    "vision_analysis": vision_analysis or "Визуальный анализ не доступен",
+                    "audio_analysis": (
+                        audio_features.to_prompt_text() if audio_features
+                        else "Аудио анализ не доступен"
+                    )
+                },
+                model=model,
+                max_output_tokens=2000,
+                compact_order=["vision_analysis", "audio_analysis"]
             )
             
             # Отправить запрос к GPT
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.7
+            return await self._complete(
+                prompt=budget.prompt,
+                stage="original",
+                max_tokens=budget.max_tokens,
+                temperature=0.7,
+                stream_callback=stream_callback,
+                model=model
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             logger.error(f"Error generating original scenario: {e}")
             return None
@@ -259,29 +480,33 @@ class ScenarioGenerator:
     async def _generate_variant_scenario(
         self,
         original_scenario: str,
-        vision_analysis: Optional[str] = None
+        vision_analysis: Optional[str] = None,
+        stream_callback: Optional[StreamCallback] = None,
+        model: str = "gpt-4o-mini"
     ) -> Optional[str]:
         """Генерация вариативного сценария."""
         try:
-            prompt = VARIANT_SCENARIO_PROMPT.format(
-                original_scenario=original_scenario,
-                visual_analysis=vision_analysis or "Визуальный анализ не доступен"
+            budget = await self.budgeter.fit(
+                VARIANT_SCENARIO_PROMPT,
+                {
+                    "original_scenario": original_scenario,
+                    "vision_analysis": vision_analysis or "Визуальный анализ не доступен"
+                },
+                model=model,
+                max_output_tokens=2000,
+                # Сценарий - основа варианта, поэтому сначала сжимаем анализ
+                compact_order=["vision_analysis", "original_scenario"]
             )
             
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.8  # Немного больше креативности
+            return await self._complete(
+                prompt=budget.prompt,
+                stage="variant",
+                max_tokens=budget.max_tokens,
+                temperature=0.8,  # Немного больше креативности
+                stream_callback=stream_callback,
+                model=model
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             logger.error(f"Error generating variant scenario: {e}")
             return None
@@ -289,35 +514,91 @@ class ScenarioGenerator:
     async def _generate_context_scenario(
         self,
         original_scenario: str,
-        variant_scenario: str,
-        user_context: str
+        variant_scenario: Optional[str],
+        user_context: str,
+        vision_analysis: Optional[str] = None,
+        stream_callback: Optional[StreamCallback] = None,
+        model: str = "gpt-4o-mini"
     ) -> Optional[str]:
         """Генерация персонализированного сценария."""
         try:
-            prompt = CONTEXT_BASED_SCENARIO_PROMPT.format(
-                original_scenario=original_scenario,
-                variant_scenario=variant_scenario,
-                user_context=user_context
+            budget = await self.budgeter.fit(
+                CONTEXT_BASED_SCENARIO_PROMPT,
+                {
+                    "base_scenario": "\n\n".join(
+                        scenario for scenario in (original_scenario, variant_scenario) if scenario
+                    ),
+                    "user_context": user_context,
+                    "vision_analysis": vision_analysis or "Визуальный анализ не доступен"
+                },
+                model=model,
+                max_output_tokens=2500,
+                compact_order=["vision_analysis", "base_scenario", "user_context"]
             )
             
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2500,
-                temperature=0.7
+            return await self._complete(
+                prompt=budget.prompt,
+                stage="context",
+                max_tokens=budget.max_tokens,
+                temperature=0.7,
+                stream_callback=stream_callback,
+                model=model
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             logger.error(f"Error generating context scenario: {e}")
             return None
     
+    async def _complete(
+        self,
+        prompt: str,
+        stage: str,
+        max_tokens: int,
+        temperature: float,
+        stream_callback: Optional[StreamCallback] = None,
+        model: str = "gpt-4o-mini"
+    ) -> Optional[str]:
+        """
+        Запрос к GPT с опциональной потоковой выдачей.
+        
+        Без колбэка ждет полный ответ. С колбэком читает stream-ответ
+        и после каждого фрагмента передает накопленный текст этапа.
+        """
+        messages = [{"role": "user", "content": prompt}]
+        
+        if stream_callback is None:
+            response = await self.openai_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            return response.choices[0].message.content
+        
+        stream = await self.openai_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        
+        parts: List[str] = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            try:
+                await stream_callback(stage, "".join(parts))
+            except Exception as e:
+                # Ошибка отображения не должна прерывать генерацию
+                logger.debug(f"Stream callback failed: {e}")
+        
+        return "".join(parts) or None
+    
     async def _download_video(self, video_url: str) -> Optional[str]:
         """Скачать видео во временный файл."""
         try:
@@ -405,18 +686,19 @@ class ScenarioGenerator:
 scenario_generator: Optional[ScenarioGenerator] = None
 
 
-def initialize_scenario_generator(openai_api_key: str) -> ScenarioGenerator:
+def initialize_scenario_generator(openai_api_key: str, prompt_budget_tokens: int = 6000) -> ScenarioGenerator:
     """
     Инициализация глобального экземпляра генератора сценариев.
     
     Args:
         openai_api_key: OpenAI API ключ
+        prompt_budget_tokens: Максимальный размер промта в токенах
         
     Returns:
         Экземпляр ScenarioGenerator
     """
     global scenario_generator
-    scenario_generator = ScenarioGenerator(openai_api_key)
+    scenario_generator = ScenarioGenerator(openai_api_key, prompt_budget_tokens=prompt_budget_tokens)
     return scenario_generator
 
 
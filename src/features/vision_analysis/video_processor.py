@@ -11,19 +11,23 @@ import cv2
 import numpy as np
 from pathlib import Path
 
+from .frame_policy import FramePolicy
+
 logger = logging.getLogger(__name__)
 
 
 class VideoProcessor:
     """Process Instagram Reels videos for analysis."""
     
-    def __init__(self, temp_dir: Optional[str] = None):
+    def __init__(self, temp_dir: Optional[str] = None, frame_policy: Optional[FramePolicy] = None):
         """Initialize video processor.
         
         Args:
             temp_dir: Directory for temporary files
+            frame_policy: Crop/resize policy for extracted frames
         """
         self.temp_dir = temp_dir or tempfile.gettempdir()
+        self.frame_policy = frame_policy or FramePolicy()
         os.makedirs(self.temp_dir, exist_ok=True)
         self.ffmpeg_path = self._find_ffmpeg()
         
@@ -63,17 +67,26 @@ class VideoProcessor:
             logger.error(f"Error downloading video: {str(e)}")
             raise
     
-    def extract_frames(self, video_path: str, fps: float = 0.5, max_frames: int = 10) -> List[str]:
+    def extract_frames(
+        self,
+        video_path: str,
+        fps: float = 0.5,
+        max_frames: int = 10,
+        policy: Optional[FramePolicy] = None
+    ) -> List[str]:
         """Extract frames from video.
         
         Args:
             video_path: Path to video file
             fps: Frames per second to extract (0.5 = 1 frame every 2 seconds)
             max_frames: Maximum number of frames to extract
+            policy: Crop/resize policy (processor default if not set)
             
         Returns:
             List of paths to extracted frame images
         """
+        policy = policy or self.frame_policy
+        
         try:
             cap = cv2.VideoCapture(video_path)
             
@@ -102,15 +115,10 @@ class VideoProcessor:
                     frame_filename = f"frame_{hash(video_path)}_{i}.jpg"
                     frame_path = os.path.join(self.temp_dir, frame_filename)
                     
-                    # Resize if too large (max 1920x1080)
-                    height, width = frame.shape[:2]
-                    if width > 1920 or height > 1080:
-                        scale = min(1920/width, 1080/height)
-                        new_width = int(width * scale)
-                        new_height = int(height * scale)
-                        frame = cv2.resize(frame, (new_width, new_height))
+                    # Crop letterbox and resize to the billed tile grid
+                    frame = policy.apply(frame)
                     
-                    cv2.imwrite(frame_path, frame)
+                    policy.write(frame, frame_path)
                     frame_paths.append(frame_path)
                     frame_count += 1
             
@@ -122,16 +130,24 @@ class VideoProcessor:
             logger.error(f"Error extracting frames: {str(e)}")
             raise
     
-    def extract_key_frames(self, video_path: str, num_frames: int = 5) -> List[str]:
+    def extract_key_frames(
+        self,
+        video_path: str,
+        num_frames: int = 5,
+        policy: Optional[FramePolicy] = None
+    ) -> List[str]:
         """Extract key frames at specific intervals.
         
         Args:
             video_path: Path to video file
             num_frames: Number of key frames to extract
+            policy: Crop/resize policy (processor default if not set)
             
         Returns:
             List of paths to key frame images
         """
+        policy = policy or self.frame_policy
+        
         try:
             cap = cv2.VideoCapture(video_path)
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -155,7 +171,7 @@ class VideoProcessor:
                 if ret:
                     frame_filename = f"keyframe_{hash(video_path)}_{pos}.jpg"
                     frame_path = os.path.join(self.temp_dir, frame_filename)
-                    cv2.imwrite(frame_path, frame)
+                    policy.write(policy.apply(frame), frame_path)
                     frame_paths.append(frame_path)
             
             cap.release()
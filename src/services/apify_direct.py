@@ -6,7 +6,7 @@ from typing import List, Dict, Any, Optional, Callable
 from datetime import datetime, timedelta
 import httpx
 
-from src.domain.models import AnalysisResult, ReelData
+from src.domain.models import AnalysisResult, AnalysisTier, ReelData
 from src.utils.config import config
 from src.utils.progress import ApifyProgressTracker
 
@@ -23,10 +23,11 @@ class ApifyDirectService:
         self.actor_id = "apify/instagram-scraper"
         
     async def analyze_account(self, username: str, period_days: int, sample_size: int, 
-                            progress_callback: Optional[Callable] = None) -> AnalysisResult:
+                            progress_callback: Optional[Callable] = None,
+                            tier: Optional[AnalysisTier] = None) -> AnalysisResult:
         """Analyze Instagram account reels."""
-        # Limit sample size to maximum 10
-        sample_size = min(sample_size, 10)
+        # Limit sample size to maximum 10 (or the tier limit)
+        sample_size = self._limit_sample_size(sample_size, tier)
         logger.info(f"Analyzing account @{username} for {period_days} days, sample size: {sample_size}")
         
         # Clean username
@@ -41,16 +42,17 @@ class ApifyDirectService:
         }
         
         # Run actor and get results
-        results = await self._run_actor(input_data, progress_callback)
+        results = await self._run_actor(input_data, progress_callback, self._scrape_timeout(tier))
         
         # Process results
         return await self._process_results(results, period_days, sample_size, f"@{username}")
     
     async def analyze_hashtag(self, hashtag: str, period_days: int, sample_size: int, 
-                            progress_callback: Optional[Callable] = None) -> AnalysisResult:
+                            progress_callback: Optional[Callable] = None,
+                            tier: Optional[AnalysisTier] = None) -> AnalysisResult:
         """Analyze Instagram hashtag reels."""
-        # Limit sample size to maximum 10
-        sample_size = min(sample_size, 10)
+        # Limit sample size to maximum 10 (or the tier limit)
+        sample_size = self._limit_sample_size(sample_size, tier)
         logger.info(f"Analyzing hashtag #{hashtag} for {period_days} days, sample size: {sample_size}")
         
         # Clean hashtag
@@ -65,16 +67,17 @@ class ApifyDirectService:
         }
         
         # Run actor and get results
-        results = await self._run_actor(input_data, progress_callback)
+        results = await self._run_actor(input_data, progress_callback, self._scrape_timeout(tier))
         
         # Process results
         return await self._process_results(results, period_days, sample_size, f"#{hashtag}")
     
     async def analyze_location(self, location: str, period_days: int, sample_size: int,
-                             progress_callback: Optional[Callable] = None) -> AnalysisResult:
+                             progress_callback: Optional[Callable] = None,
+                             tier: Optional[AnalysisTier] = None) -> AnalysisResult:
         """Analyze Instagram location reels."""
-        # Limit sample size to maximum 10
-        sample_size = min(sample_size, 10)
+        # Limit sample size to maximum 10 (or the tier limit)
+        sample_size = self._limit_sample_size(sample_size, tier)
         logger.info(f"Analyzing location {location} for {period_days} days, sample size: {sample_size}")
         
         # First, search for location to get ID
@@ -91,7 +94,7 @@ class ApifyDirectService:
         }
         
         # Run actor and get results
-        results = await self._run_actor(input_data, progress_callback)
+        results = await self._run_actor(input_data, progress_callback, self._scrape_timeout(tier))
         
         # Process results
         return await self._process_results(results, period_days, sample_size, f"📍 {location}")
@@ -122,8 +125,23 @@ class ApifyDirectService:
         # Process single reel
         return await self._process_results(results, 0, 1, f"Reel {shortcode}")
     
-    async def _run_actor(self, input_data: Dict[str, Any], progress_callback: Optional[Callable] = None) -> List[Dict[str, Any]]:
-        """Run Apify actor with given input."""
+    def _limit_sample_size(self, sample_size: int, tier: Optional[AnalysisTier]) -> int:
+        """Limit sample size to maximum 10 and to the tier's maximum."""
+        max_size = min(10, tier.max_sample_size) if tier else 10
+        return min(sample_size, max_size)
+    
+    def _scrape_timeout(self, tier: Optional[AnalysisTier]) -> int:
+        """Apify run time cap of the tier in seconds (0 = actor default)."""
+        return tier.scrape_timeout_seconds if tier else 0
+    
+    async def _run_actor(self, input_data: Dict[str, Any], progress_callback: Optional[Callable] = None,
+                         timeout_seconds: int = 0) -> List[Dict[str, Any]]:
+        """
+        Run Apify actor with given input.
+        
+        With timeout_seconds the run is stopped by Apify after that time and
+        the items scraped so far are returned instead of an error.
+        """
         actor_url = self.actor_id.replace("/", "~")
         
         # Initialize progress tracker if callback provided
@@ -140,6 +158,7 @@ class ApifyDirectService:
             response = await client.post(
                 f"{self.base_url}/acts/{actor_url}/runs",
                 headers={"Authorization": f"Bearer {self.api_token}"},
+                params={"timeout": timeout_seconds} if timeout_seconds else None,
                 json=input_data,
                 timeout=30
             )
@@ -158,10 +177,11 @@ class ApifyDirectService:
                 await tracker.update("send_request", 1.0)
             
             # Wait for completion
+            allow_timeout = timeout_seconds > 0
             if tracker:
-                await self._wait_for_run_with_progress(client, run_id, tracker)
+                await self._wait_for_run_with_progress(client, run_id, tracker, allow_timeout=allow_timeout)
             else:
-                await self._wait_for_run(client, run_id)
+                await self._wait_for_run(client, run_id, allow_timeout=allow_timeout)
             
             # Get results
             if tracker:
@@ -174,8 +194,9 @@ class ApifyDirectService:
                 
             return results
     
-    async def _wait_for_run(self, client: httpx.AsyncClient, run_id: str, max_attempts: int = 90):
-        """Wait for actor run to complete."""
+    async def _wait_for_run(self, client: httpx.AsyncClient, run_id: str, max_attempts: int = 90,
+                            allow_timeout: bool = False):
+        """Wait for actor run to complete (a TIMED-OUT run counts as done with allow_timeout)."""
         # Increased timeout: 90 attempts * 2s = 180s (3 minutes) max
         for _ in range(max_attempts):
             response = await client.get(
@@ -186,7 +207,7 @@ class ApifyDirectService:
             
             status = response.json()["data"]["status"]
             
-            if status == "SUCCEEDED":
+            if status == "SUCCEEDED" or (allow_timeout and status == "TIMED-OUT"):
                 return
             elif status in ["FAILED", "ABORTED", "TIMED-OUT"]:
                 raise Exception(f"Actor run {status}")
@@ -195,8 +216,9 @@ class ApifyDirectService:
         
         raise Exception("Actor run timed out")
     
-    async def _wait_for_run_with_progress(self, client: httpx.AsyncClient, run_id: str, tracker: ApifyProgressTracker, max_attempts: int = 90):
-        """Wait for actor run to complete with progress tracking."""
+    async def _wait_for_run_with_progress(self, client: httpx.AsyncClient, run_id: str, tracker: ApifyProgressTracker, max_attempts: int = 90,
+                                          allow_timeout: bool = False):
+        """Wait for actor run to complete with progress tracking (a TIMED-OUT run counts as done with allow_timeout)."""
         for attempt in range(max_attempts):
             response = await client.get(
                 f"{self.base_url}/actor-runs/{run_id}",
@@ -210,7 +232,7 @@ class ApifyDirectService:
             sub_progress = min(attempt / max_attempts, 0.9)  # Max 90% for waiting
             await tracker.update("wait_actor", sub_progress)
             
-            if status == "SUCCEEDED":
+            if status == "SUCCEEDED" or (allow_timeout and status == "TIMED-OUT"):
                 await tracker.update("wait_actor", 1.0)
                 return
             elif status in ["FAILED", "ABORTED", "TIMED-OUT"]:
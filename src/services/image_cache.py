@@ -0,0 +1,272 @@
+"""On-disk cache of report images: PDF rendering and thumbnail analysis.
+
+Files are kept by URL digest; the report cleaner deletes the ones not
+used for config.database.image_cache_retention_hours.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import tempfile
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import httpx
+import numpy as np
+
+from src.utils.config import config
+from src.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# 1x1 light grey PNG served for images that could not be prefetched
+PLACEHOLDER_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVQIHWN48OABAAVEAqG8RIKpAAAAAElFTkSuQmCC"
+)
+
+
+def image_cache_path(cache_dir: str, url: str) -> str:
+    """Get cache file path for image URL."""
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest)
+
+
+def sniff_mime_type(content: bytes) -> Optional[str]:
+    """Detect image MIME type from magic bytes."""
+    if content.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if content.startswith(b"\x89PNG"):
+        return "image/png"
+    if content.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def downscale_image(content: bytes, max_size: Tuple[int, int], jpeg_quality: int = 85) -> bytes:
+    """
+    Downscale image so it just covers max_size and recompress it.
+
+    Args:
+        content: Encoded image
+        max_size: (width, height) box the image is rendered into
+        jpeg_quality: JPEG quality for recompression
+
+    Returns:
+        Re-encoded image (original bytes if it can't be decoded or doesn't shrink)
+    """
+    image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        return content
+
+    height, width = image.shape[:2]
+    # Templates use object-fit: cover, so the image must cover the box, not fit into it
+    scale = min(1.0, max(max_size[0] / width, max_size[1] / height))
+    if scale < 1.0:
+        size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    if image.ndim == 3 and image.shape[2] == 4:
+        # Keep transparency
+        ok, buffer = cv2.imencode(".png", image)
+    else:
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+
+    if not ok or (scale == 1.0 and buffer.size >= len(content)):
+        return content
+    return buffer.tobytes()
+
+
+def cached_url_fetcher(
+    url: str,
+    cache_dir: str,
+    max_size: Optional[Tuple[int, int]] = None,
+    jpeg_quality: int = 85
+) -> Dict:
+    """
+    WeasyPrint url_fetcher that never touches the network for remote images.
+
+    Module-level so it can be passed to PDF render workers.
+
+    Args:
+        url: URL requested by WeasyPrint
+        cache_dir: Image cache directory
+        max_size: Downscale images to cover this (width, height) box
+        jpeg_quality: JPEG quality for downscaled images
+
+    Returns:
+        WeasyPrint resource dictionary
+    """
+    if not url.startswith(("http://", "https://")):
+        # data: and file: URLs are local already
+        from weasyprint import default_url_fetcher
+        return default_url_fetcher(url)
+
+    try:
+        with open(image_cache_path(cache_dir, url), "rb") as f:
+            content = f.read()
+    except OSError:
+        content = PLACEHOLDER_PNG
+
+    if max_size:
+        content = downscale_image(content, max_size, jpeg_quality)
+
+    return {
+        "string": content,
+        "mime_type": sniff_mime_type(content),
+        "redirected_url": url
+    }
+
+
+class ImageCache:
+    """Fetch report images concurrently and cache them by URL digest."""
+
+    def __init__(
+        self,
+        cache_dir: str = "data/cache/images",
+        max_concurrency: int = 8,
+        timeout: float = 10.0
+    ):
+        """
+        Initialize image cache.
+
+        Args:
+            cache_dir: Directory for cached images
+            max_concurrency: Maximum simultaneous downloads
+            timeout: Timeout for one image download in seconds
+        """
+        self.cache_dir = cache_dir
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def cache_path(self, url: str) -> str:
+        """Get cache file path for image URL."""
+        return image_cache_path(self.cache_dir, url)
+
+    def url_fetcher(
+        self,
+        max_size: Optional[Tuple[int, int]] = None,
+        jpeg_quality: int = 85
+    ) -> Callable[[str], Dict]:
+        """
+        Picklable WeasyPrint url_fetcher serving from this cache.
+
+        Args:
+            max_size: Downscale images to cover this (width, height) box
+            jpeg_quality: JPEG quality for downscaled images
+
+        Returns:
+            url_fetcher for WeasyPrint
+        """
+        return partial(cached_url_fetcher, cache_dir=self.cache_dir, max_size=max_size, jpeg_quality=jpeg_quality)
+
+    async def prefetch(self, urls: Iterable[Optional[str]]) -> int:
+        """
+        Download images that are not cached yet.
+
+        Args:
+            urls: Image URLs (empty values are skipped)
+
+        Returns:
+            Number of images available in cache
+        """
+        urls = [url for url in dict.fromkeys(urls) if url and url.startswith(("http://", "https://"))]
+        missing = [url for url in urls if not self._touch(url)]
+        await self._download(missing)
+
+        cached = sum(1 for url in urls if os.path.exists(self.cache_path(url)))
+        logger.info(f"Report images: {cached}/{len(urls)} available, {len(missing)} requested from network")
+        return cached
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """
+        Fetch one image (from cache if available).
+
+        Args:
+            url: Image URL
+
+        Returns:
+            Image bytes or None
+        """
+        images = await self.fetch_many([url])
+        return images.get(url)
+
+    async def fetch_many(self, urls: Iterable[Optional[str]]) -> Dict[str, bytes]:
+        """
+        Fetch images in parallel, serving cached ones from disk.
+
+        Args:
+            urls: Image URLs (empty values are skipped)
+
+        Returns:
+            Dictionary mapping URL to image bytes (failed URLs are omitted)
+        """
+        urls = list(urls)
+        await self.prefetch(urls)
+
+        images = {}
+        for url in dict.fromkeys(urls):
+            content = self._read(url) if url else None
+            if content is not None:
+                images[url] = content
+        return images
+
+    async def _download(self, urls: List[str]) -> None:
+        """Download images into the cache, logging failures."""
+        if not urls:
+            return
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with httpx.AsyncClient(follow_redirects=True, timeout=self.timeout) as client:
+            async def download(url: str) -> None:
+                async with semaphore:
+                    try:
+                        response = await client.get(url)
+                        response.raise_for_status()
+                        self._write(url, response.content)
+                    except Exception as e:
+                        logger.warning(f"Could not prefetch image {url[:80]}: {e}")
+
+            await asyncio.gather(*(download(url) for url in urls))
+
+    def _touch(self, url: str) -> bool:
+        """Mark cached image as used so the cleaner keeps it; False if not cached."""
+        try:
+            os.utime(self.cache_path(url))
+            return True
+        except OSError:
+            return False
+
+    def _read(self, url: str) -> Optional[bytes]:
+        """Read cached image if present."""
+        try:
+            with open(self.cache_path(url), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, url: str, content: bytes) -> None:
+        """Write image to cache atomically."""
+        # Unique temp name: the same URL may be written by two workers at once
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, self.cache_path(url))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+# Global image cache instance (shared by PDF rendering and thumbnail analysis)
+image_cache = ImageCache(
+    cache_dir=config.pdf.image_cache_dir,
+    max_concurrency=config.pdf.image_prefetch_concurrency,
+    timeout=config.pdf.image_timeout_seconds
+)
@@ -0,0 +1,60 @@
+"""Load monitor for choosing the analysis tier at peak load."""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from src.domain.models import AnalysisTier, get_analysis_tier
+from src.utils.config import config
+from src.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class LoadMonitor:
+    """Track in-flight analyses and downgrade the default tier at peak."""
+    
+    def __init__(self):
+        """Initialize load monitor."""
+        self.in_flight = 0
+        self.default_depth = config.analysis.default_depth
+        self.peak_depth = config.analysis.peak_depth
+        self.peak_threshold = config.analysis.peak_in_flight_threshold
+    
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        """Count an analysis as in flight for the duration of the block."""
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+    
+    def resolve_tier(self, requested_depth: Optional[str] = None) -> AnalysisTier:
+        """
+        Resolve tier for a new analysis.
+        
+        An explicitly requested depth is always honoured. Otherwise the
+        default depth is used, downgraded to the peak depth when too many
+        analyses are already running.
+        
+        Args:
+            requested_depth: Depth chosen by the user, if any
+            
+        Returns:
+            Tier settings for the analysis
+        """
+        if requested_depth:
+            return get_analysis_tier(requested_depth)
+        
+        if self.peak_threshold and self.in_flight >= self.peak_threshold:
+            logger.info(
+                f"Peak load ({self.in_flight} analyses in flight), "
+                f"default tier downgraded to {self.peak_depth}"
+            )
+            return get_analysis_tier(self.peak_depth)
+        
+        return get_analysis_tier(self.default_depth)
+
+
+# Global load monitor instance
+load_monitor = LoadMonitor()
@@ -1,32 +1,82 @@
 """PDF generation service."""
 
+import hashlib
+import json
 import os
+import time
+import uuid
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
-import asyncio
-from jinja2 import Template
-from weasyprint import HTML, CSS
-from src.domain.models import AnalysisResult, QueryPayload
+from typing import Optional, Tuple
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, TemplateNotFound
+from markupsafe import escape
+from src.domain.models import AnalysisResult, QueryPayload, PDFStatus
 from src.utils.logger import get_logger
 from src.utils.formatters import (
     format_number, format_currency, format_datetime, format_engagement_rate
 )
 from src.utils.config import config
+from src.services.image_cache import image_cache
+from src.services.pdf_workers import PDFQueueFullError, PDFRenderError, pdf_render_pool
+from src.storage.sqlite import db
 
 
 logger = get_logger(__name__)
 
+TEMPLATES_DIR = Path("templates")
+TEMPLATE_CACHE_DIR = Path("data/cache/jinja2")
+REPORT_TEMPLATE = "report_mobile.html"
+SCENARIO_TEMPLATE = "scenario_report.html"
+
+# Reel preview box in report_mobile.html (CSS px); images are embedded at 2x
+PREVIEW_SIZE = (160, 284)
+IMAGE_SCALE = 2.0
+IMAGE_JPEG_QUALITY = 85
+
+# WeasyPrint options: images recompressed
+PDF_OPTIONS = {"optimize_images": True}
+
+# Re-render steps for oversized PDFs: (image scale, JPEG quality, DPI cap)
+PDF_QUALITY_LADDER = (
+    (1.5, 70, 150),
+    (1.0, 50, 96),
+    (0.75, 35, 72),
+)
+
 
 class PDFService:
     """Service for generating PDF reports."""
     
     def __init__(self):
         """Initialize PDF service."""
-        self.template_path = Path("templates/report_mobile.html")
         self.reports_dir = Path("data/reports")
         self.reports_dir.mkdir(parents=True, exist_ok=True)
         self.max_size_mb = config.limits.pdf_max_size_mb
+        self.image_cache = image_cache
+        self.cache_enabled = config.pdf.cache_enabled
+        self.env = self._create_environment()
+        self._template_versions = {}
+        self._precompile_templates()
+    
+    @staticmethod
+    def _create_environment() -> Environment:
+        """Create shared Jinja2 environment with on-disk bytecode cache."""
+        TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        return Environment(
+            loader=FileSystemLoader(str(TEMPLATES_DIR)),
+            bytecode_cache=FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR)),
+            # Only check templates for changes while developing
+            auto_reload=config.environment == "development"
+        )
+    
+    def _precompile_templates(self) -> None:
+        """Compile report templates at startup so the first report doesn't pay for it."""
+        for name in (REPORT_TEMPLATE, SCENARIO_TEMPLATE):
+            try:
+                self.env.get_template(name)
+                self._template_version(name)
+            except TemplateNotFound:
+                logger.warning(f"Template not found: {TEMPLATES_DIR / name}")
     
     async def generate_report(
         self,
@@ -44,39 +94,164 @@ class PDFService:
             Path to generated PDF file
         """
         try:
-            # Load template
-            template_content = self._load_template()
-            
             # Prepare context data
             context = self._prepare_context(analysis_result)
             
+            # Reuse PDF rendered earlier from identical context (whichever user it was for)
+            content_hash = self._content_hash(REPORT_TEMPLATE, context)
+            cached_path = await self._get_cached_pdf(content_hash)
+            if cached_path:
+                return cached_path
+            
+            # Render date is added after hashing: it would make every day's PDF unique
+            context["header"]["metrics"]["reportDate"] = datetime.now().strftime("%d.%m.%Y")
+            
+            started = time.perf_counter()
+            
             # Render HTML
-            html_content = self._render_html(template_content, context)
+            html_content = self._render_html(REPORT_TEMPLATE, context)
+            
+            # Download thumbnails and avatars in parallel so rendering doesn't wait on the CDN
+            await self.image_cache.prefetch(
+                url
+                for reel in analysis_result.reels
+                for url in (reel.thumbnail_url, reel.author_avatar_url)
+            )
             
             # Generate PDF
-            pdf_path = await self._generate_pdf(html_content, user_id)
+            pdf_path, complete = await self._generate_pdf(html_content, content_hash)
+            if not complete:
+                # Text-only fallback: neither worth optimizing nor reusable from the cache
+                return str(pdf_path)
             
             # Check file size
             file_size_mb = pdf_path.stat().st_size / (1024 * 1024)
             if file_size_mb > self.max_size_mb:
                 logger.warning(f"PDF size {file_size_mb:.1f}MB exceeds limit")
                 # Try to optimize
-                pdf_path = await self._optimize_pdf(pdf_path)
+                pdf_path = await self._optimize_pdf(pdf_path, html_content)
             
-            logger.info(f"Generated PDF report: {pdf_path}")
+            render_ms = int((time.perf_counter() - started) * 1000)
+            await self._save_cached_pdf(content_hash, pdf_path, render_ms)
+            
+            logger.info(f"Generated PDF report for user {user_id}: {pdf_path} in {render_ms} ms")
             return str(pdf_path)
             
         except Exception as e:
             logger.error(f"Error generating PDF: {e}")
             raise
     
-    def _load_template(self) -> str:
-        """Load HTML template."""
-        if not self.template_path.exists():
-            raise FileNotFoundError(f"Template not found: {self.template_path}")
+    async def render_report_pdf(
+        self,
+        report_id: int,
+        analysis_result: AnalysisResult,
+        user_id: int
+    ) -> Optional[str]:
+        """
+        Render PDF of a stored report and persist its render state.
+        
+        Args:
+            report_id: Report ID
+            analysis_result: Analysis data of the report
+            user_id: Telegram user ID
+            
+        Returns:
+            Path to the PDF, or None if another task is already rendering it
+        """
+        if not await db.claim_pdf_render(report_id):
+            return None
+        
+        try:
+            pdf_path = await self.generate_report(analysis_result, user_id)
+        except PDFQueueFullError:
+            # Not a render failure: can be requested again once the queue drains
+            await db.update_report(report_id=report_id, pdf_status=PDFStatus.PENDING)
+            raise
+        except Exception:
+            await db.update_report(report_id=report_id, pdf_status=PDFStatus.FAILED)
+            raise
+        
+        await db.update_report(report_id=report_id, pdf_path=pdf_path, pdf_status=PDFStatus.READY)
+        return pdf_path
+    
+    def _template_version(self, name: str) -> str:
+        """Digest of template source (recomputed on every call when templates auto-reload)."""
+        if name not in self._template_versions or self.env.auto_reload:
+            source, _, _ = self.env.loader.get_source(self.env, name)
+            self._template_versions[name] = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        return self._template_versions[name]
+    
+    def _content_hash(self, template_name: str, context: dict) -> str:
+        """Hash of template context plus template version identifying a rendered PDF."""
+        payload = json.dumps(context, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256()
+        digest.update(f"{template_name}:{self._template_version(template_name)}\n".encode("utf-8"))
+        digest.update(payload.encode("utf-8"))
+        return digest.hexdigest()
+    
+    async def _get_cached_pdf(self, content_hash: str) -> Optional[str]:
+        """Get path of an already rendered PDF for this content, if it still exists."""
+        if not self.cache_enabled:
+            return None
+        
+        try:
+            entry = await db.get_pdf_cache(content_hash)
+            if not entry or not Path(entry.pdf_path).exists():
+                return None
+            
+            await db.record_pdf_cache_hit(content_hash)
+            logger.info(f"PDF cache hit: {entry.pdf_path} (saved {entry.render_ms} ms render)")
+            return entry.pdf_path
+        except Exception as e:
+            logger.warning(f"PDF cache lookup failed: {e}")
+            return None
+    
+    async def _save_cached_pdf(self, content_hash: str, pdf_path: Path, render_ms: int) -> None:
+        """Remember rendered PDF for its content hash."""
+        if not self.cache_enabled:
+            return
+        
+        try:
+            await db.save_pdf_cache(
+                content_hash=content_hash,
+                pdf_path=str(pdf_path),
+                render_ms=render_ms,
+                size_bytes=pdf_path.stat().st_size
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache PDF {pdf_path}: {e}")
+    
+    async def get_telegram_file_id(self, pdf_path: str) -> Optional[str]:
+        """Get Telegram file_id of a cached PDF that was already uploaded."""
+        if not self.cache_enabled:
+            return None
+        
+        try:
+            return await db.get_pdf_file_id(pdf_path)
+        except Exception as e:
+            logger.warning(f"PDF file_id lookup failed: {e}")
+            return None
+    
+    async def remember_telegram_file_id(self, pdf_path: str, file_id: Optional[str]) -> None:
+        """Store Telegram file_id of an uploaded cached PDF (None forgets an expired one)."""
+        if not self.cache_enabled:
+            return
         
-        with open(self.template_path, "r", encoding="utf-8") as f:
-            return f.read()
+        try:
+            await db.set_pdf_file_id(pdf_path, file_id)
+        except Exception as e:
+            logger.warning(f"Could not store PDF file_id: {e}")
+    
+    async def get_cache_stats(self) -> dict:
+        """Get PDF cache hits and render time saved."""
+        return await db.get_pdf_cache_stats()
+    
+    def _get_template(self, name: str) -> Template:
+        """Get compiled template from the shared environment."""
+        try:
+            return self.env.get_template(name)
+        except TemplateNotFound:
+            raise FileNotFoundError(f"Template not found: {TEMPLATES_DIR / name}")
     
     def _prepare_context(self, analysis_result: AnalysisResult) -> dict:
         """Prepare context data for template."""
@@ -99,6 +274,7 @@ class PDFService:
                 "reelUrl": reel.url,
                 "video_url": reel.video_url, # Pass video url for the handler
                 "is_top_reel": is_top,
+                # Placeholder URL is never prefetched: the url_fetcher serves a local image for it
                 "previewImage": reel.thumbnail_url or "https://via.placeholder.com/200x355",
                 "author": {
                     "username": reel.author_username,
@@ -111,6 +287,9 @@ class PDFService:
                     "er": f"{reel.engagement_rate:.2f}%"
                 },
                 "caption": reel.title or "Без описания",
+                "vision_analysis": self._format_vision_analysis(
+                    analysis_result.vision_analyses.get(reel.id)
+                ),
                 "ctaButton": {"label": "Сценарий"}
             })
         
@@ -136,7 +315,6 @@ class PDFService:
                     "totalComments": total_comments,
                     "selectionSize": len(analysis_result.reels),
                     "period": f"{query.period} дней" if query.period else "Все время",
-                    "reportDate": datetime.now().strftime("%d.%m.%Y"),
                     "averageER": f"{analysis_result.average_er:.1f}%"
                 },
                 "buttons": [
@@ -150,81 +328,55 @@ class PDFService:
         
         return context
     
-    def _render_html(self, template_content: str, context: dict) -> str:
-        """Render HTML from template."""
-        template = Template(template_content)
-        return template.render(**context)
+    @staticmethod
+    def _format_vision_analysis(analysis: Optional[dict]) -> Optional[dict]:
+        """Prepare stored Vision analysis of a reel for the template."""
+        if not analysis or not analysis.get("visual_analysis"):
+            return None
+        
+        return {
+            "visual_analysis": str(escape(analysis["visual_analysis"])).replace("\n", "<br>"),
+            "audio_transcript": analysis.get("audio_analysis")
+        }
+    
+    def _render_html(self, template_name: str, context: dict) -> str:
+        """Render HTML from a compiled template."""
+        return self._get_template(template_name).render(**context)
     
-    async def _generate_pdf(self, html_content: str, user_id: int) -> Path:
-        """Generate PDF file from HTML."""
-        # Generate filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"report_{user_id}_{timestamp}.pdf"
-        pdf_path = self.reports_dir / filename
+    async def _generate_pdf(self, html_content: str, content_hash: str) -> Tuple[Path, bool]:
+        """Generate PDF file from HTML; the flag is False if only the text-only fallback rendered."""
+        # Named by content, not user: the cached file is served to every user with the same report
+        pdf_path = self._pdf_path("report", content_hash[:16])
         
-        # Run WeasyPrint in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None,
-            self._write_pdf,
+        # Render in the dedicated WeasyPrint worker pool, images served from cache only
+        complete = await self._render_pdf(
             html_content,
-            str(pdf_path)
+            pdf_path,
+            url_fetcher=self._image_fetcher(IMAGE_SCALE, IMAGE_JPEG_QUALITY),
+            options=PDF_OPTIONS
         )
         
-        return pdf_path
+        return pdf_path, complete
     
-    def _write_pdf(self, html_content: str, output_path: str) -> None:
-        """Write PDF file (blocking operation)."""
-        try:
-            # Generate PDF with minimal parameters to avoid library conflicts
-            html_doc = HTML(string=html_content)
-            
-            # Try direct write without additional parameters
-            with open(output_path, 'wb') as pdf_file:
-                html_doc.write_pdf(pdf_file)
-                
-        except Exception as e:
-            logger.error(f"WeasyPrint error: {e}")
-            # Fallback: create a simple text-based PDF alternative
-            self._create_fallback_pdf(html_content, output_path)
+    def _pdf_path(self, kind: str, key: str) -> Path:
+        """Unique PDF path: renders started within the same second must not overwrite each other."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return self.reports_dir / f"{kind}_{key}_{timestamp}_{uuid.uuid4().hex[:8]}.pdf"
     
-    def _create_fallback_pdf(self, html_content: str, output_path: str) -> None:
-        """Create a simple fallback when WeasyPrint fails."""
+    async def _render_pdf(self, html_content: str, pdf_path: Path, **render_options) -> bool:
+        """
+        Render PDF in the worker pool, falling back to a text-only version if WeasyPrint fails.
+        
+        Returns:
+            False if the text-only fallback was rendered instead
+        """
         try:
-            # Simple HTML to text conversion and basic PDF creation
-            from html import unescape
-            import re
-            
-            # Strip HTML tags and convert to plain text
-            text = re.sub(r'<[^>]+>', '', html_content)
-            text = unescape(text)
-            
-            # Create a minimal HTML for PDF
-            simple_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <style>
-                    body {{ font-family: Arial; margin: 20px; }}
-                    h1 {{ color: #333; }}
-                </style>
-            </head>
-            <body>
-                <h1>Vision Analysis Report</h1>
-                <pre>{text}</pre>
-            </body>
-            </html>
-            """
-            
-            # Try WeasyPrint again with simplified content
-            simple_doc = HTML(string=simple_html)
-            with open(output_path, 'wb') as pdf_file:
-                simple_doc.write_pdf(pdf_file)
-                
-        except Exception as fallback_error:
-            logger.error(f"Fallback PDF creation also failed: {fallback_error}")
-            raise
+            await pdf_render_pool.render(html_content, str(pdf_path), **render_options)
+            return True
+        except PDFRenderError as e:
+            logger.warning(f"Rendering {pdf_path.name} failed, using text-only version: {e}")
+            await pdf_render_pool.render_fallback(html_content, str(pdf_path))
+            return False
     
     def _get_print_styles(self) -> str:
         """Get additional print styles."""
@@ -249,10 +401,57 @@ class PDFService:
         }
         """
     
-    async def _optimize_pdf(self, pdf_path: Path) -> Path:
-        """Optimize PDF size if needed."""
-        # For now, just return the original
-        # In production, could use tools like ghostscript
+    def _image_fetcher(self, scale: float, jpeg_quality: int):
+        """url_fetcher embedding images downscaled to the rendered preview size."""
+        max_size = (int(PREVIEW_SIZE[0] * scale), int(PREVIEW_SIZE[1] * scale))
+        return self.image_cache.url_fetcher(max_size=max_size, jpeg_quality=jpeg_quality)
+    
+    async def _optimize_pdf(self, pdf_path: Path, html_content: str) -> Path:
+        """
+        Re-render PDF with progressively lower image quality until it fits the size limit.
+        
+        Args:
+            pdf_path: Oversized PDF (replaced in place by smaller versions)
+            html_content: Rendered HTML of the report
+            
+        Returns:
+            Path to the smallest PDF produced
+        """
+        best_size = pdf_path.stat().st_size
+        limit = self.max_size_mb * 1024 * 1024
+        attempt_path = pdf_path.with_suffix(".optimizing.pdf")
+        
+        try:
+            for scale, jpeg_quality, dpi in PDF_QUALITY_LADDER:
+                size = await pdf_render_pool.render(
+                    html_content,
+                    str(attempt_path),
+                    url_fetcher=self._image_fetcher(scale, jpeg_quality),
+                    options={**PDF_OPTIONS, "jpeg_quality": jpeg_quality, "dpi": dpi}
+                )
+                logger.info(
+                    f"PDF re-rendered at quality {jpeg_quality}, {dpi} dpi: "
+                    f"{size / (1024 * 1024):.1f}MB"
+                )
+                
+                if size < best_size:
+                    os.replace(attempt_path, pdf_path)
+                    best_size = size
+                
+                if best_size <= limit:
+                    break
+            else:
+                logger.warning(
+                    f"PDF still {best_size / (1024 * 1024):.1f}MB after optimization "
+                    f"(limit {self.max_size_mb}MB)"
+                )
+        except Exception as e:
+            # Keep the original PDF if re-rendering fails
+            logger.error(f"PDF optimization failed: {e}")
+        finally:
+            if attempt_path.exists():
+                attempt_path.unlink()
+        
         return pdf_path
     
     def cleanup_old_reports(self, days: int = 30) -> int:
@@ -299,13 +498,6 @@ class PDFService:
             Path to the generated PDF file.
         """
         try:
-            # Load scenario template
-            template_path = Path("templates/scenario_report.html")
-            if not template_path.exists():
-                raise FileNotFoundError(f"Template not found: {template_path}")
-            with open(template_path, "r", encoding="utf-8") as f:
-                template_content = f.read()
-
             # Prepare context
             context = {
                 "vision_analysis": vision_analysis,
@@ -313,21 +505,13 @@ class PDFService:
                 "scenario": scenario.replace("\n", "<br>")
             }
             
-            # Render HTML
-            html_content = self._render_html(template_content, context)
+            # Render HTML 
+            html_content = self._render_html(SCENARIO_TEMPLATE, context)
             
             # Generate PDF
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"scenario_{user_id}_{timestamp}.pdf"
-            pdf_path = self.reports_dir / filename
+            pdf_path = self._pdf_path("scenario", str(user_id))
             
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                self._write_pdf,
-                html_content,
-                str(pdf_path)
-            )
+            await self._render_pdf(html_content, pdf_path)
             
             logger.info(f"Generated scenario report: {pdf_path}")
             return str(pdf_path)
@@ -360,13 +544,6 @@ class PDFService:
             Path to the generated PDF file.
         """
         try:
-            # Load vision analysis template (reuse scenario template for now)
-            template_path = Path("templates/scenario_report.html")
-            if not template_path.exists():
-                raise FileNotFoundError(f"Template not found: {template_path}")
-            with open(template_path, "r", encoding="utf-8") as f:
-                template_content = f.read()
-
             # Prepare context with reel information
             context = {
                 "title": f"AI Vision Анализ: {reel_data.title[:50]}..." if reel_data.title else "Vision Analysis",
@@ -378,21 +555,13 @@ class PDFService:
                 "scenario": scenario.replace("\n", "<br>") if scenario else "Сценарий не сгенерирован"
             }
             
-            # Render HTML
-            html_content = self._render_html(template_content, context)
+            # Render HTML (vision analysis reuses the scenario template for now)
+            html_content = self._render_html(SCENARIO_TEMPLATE, context)
             
             # Generate PDF
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"vision_analysis_{user_id}_{timestamp}.pdf"
-            pdf_path = self.reports_dir / filename
+            pdf_path = self._pdf_path("vision_analysis", str(user_id))
             
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                self._write_pdf,
-                html_content,
-                str(pdf_path)
-            )
+            await self._render_pdf(html_content, pdf_path)
             
             logger.info(f"Generated vision analysis report: {pdf_path}")
             return str(pdf_path)
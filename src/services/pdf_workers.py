@@ -0,0 +1,339 @@
+"""Dedicated worker processes for WeasyPrint PDF rendering."""
+
+import asyncio
+import multiprocessing
+import os
+import re
+from html import escape, unescape
+from multiprocessing.connection import Connection
+from multiprocessing.context import BaseContext
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from src.utils.config import config
+from src.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class PDFQueueFullError(Exception):
+    """Raised when too many PDF renders are already waiting for a worker."""
+
+
+class PDFRenderError(Exception):
+    """Raised when WeasyPrint fails to render a document."""
+
+
+class PDFWorkerDiedError(Exception):
+    """Raised when a render worker exits in the middle of a render (e.g. out of memory)."""
+
+
+def render_pdf(
+    html_content: str,
+    output_path: str,
+    url_fetcher: Optional[Callable] = None,
+    options: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Render HTML to a PDF file (runs in a render worker).
+
+    Args:
+        html_content: Rendered HTML
+        output_path: Where to write the PDF
+        url_fetcher: Picklable WeasyPrint url_fetcher (WeasyPrint default if None)
+        options: Extra write_pdf options (optimize_images, jpeg_quality, dpi, ...)
+
+    Returns:
+        Size of the written file in bytes
+
+    Raises:
+        PDFRenderError: If WeasyPrint fails (the caller decides whether to fall back)
+    """
+    from weasyprint import HTML, default_url_fetcher
+
+    try:
+        with open(output_path, "wb") as pdf_file:
+            html = HTML(string=html_content, url_fetcher=url_fetcher or default_url_fetcher)
+            html.write_pdf(pdf_file, **(options or {}))
+    except Exception as e:
+        logger.error(f"WeasyPrint error: {e}")
+        # WeasyPrint exceptions are not always picklable
+        raise PDFRenderError(f"{type(e).__name__}: {e}") from None
+
+    return os.path.getsize(output_path)
+
+
+def render_fallback_pdf(html_content: str, output_path: str) -> int:
+    """Create a simple text-only PDF when the full render fails; returns file size in bytes."""
+    from weasyprint import HTML
+
+    # Strip HTML tags and convert to plain text
+    text = unescape(re.sub(r"<[^>]+>", "", html_content))
+
+    simple_html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <style>
+            body {{ font-family: Arial; margin: 20px; }}
+            h1 {{ color: #333; }}
+        </style>
+    </head>
+    <body>
+        <h1>Vision Analysis Report</h1>
+        <pre>{escape(text)}</pre>
+    </body>
+    </html>
+    """
+
+    try:
+        with open(output_path, "wb") as pdf_file:
+            HTML(string=simple_html).write_pdf(pdf_file)
+    except Exception as e:
+        logger.error(f"Fallback PDF creation also failed: {e}")
+        raise PDFRenderError(f"{type(e).__name__}: {e}") from None
+
+    return os.path.getsize(output_path)
+
+
+def _worker_main(connection: Connection) -> None:
+    """Render worker loop: run (func, args, kwargs) jobs from the parent until it sends None."""
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+
+        func, args, kwargs = job
+        try:
+            reply = (True, func(*args, **kwargs))
+        except Exception as e:
+            reply = (False, e)
+
+        try:
+            connection.send(reply)
+        except Exception as e:
+            # Unpicklable result or exception
+            connection.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _RenderWorker:
+    """One render process and the pipe the pool hands it jobs through."""
+
+    def __init__(self, context: BaseContext, generation: int):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.generation = generation
+        self.renders = 0
+
+    def call(self, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        """Run a job in the worker and wait for its result (blocking, runs in a thread)."""
+        try:
+            self.connection.send((func, args, kwargs))
+            ok, value = self.connection.recv()
+        except (EOFError, OSError) as e:
+            raise PDFWorkerDiedError(f"PDF render worker {self.process.pid} died") from e
+
+        if not ok:
+            raise value
+        return value
+
+    def stop(self, kill: bool = False) -> None:
+        """Ask the worker to exit, or terminate it right away (e.g. when it hangs)."""
+        if kill:
+            # The pipe is left to the thread waiting on it: it gets EOF once the process is gone
+            self.process.terminate()
+            return
+
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.connection.close()
+
+
+class PDFRenderPool:
+    """Render worker processes with a bounded wait queue."""
+
+    def __init__(self, workers: int = 2, max_queue: int = 20, max_renders_per_worker: int = 20):
+        """
+        Initialize render pool.
+
+        Args:
+            workers: Number of render processes
+            max_queue: Renders allowed to wait for a free worker
+            max_renders_per_worker: Renders before a worker is replaced (caps memory growth)
+        """
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self.max_renders_per_worker = max_renders_per_worker
+        # WeasyPrint state must not be inherited from the bot process
+        self._context = multiprocessing.get_context("spawn")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle: List[_RenderWorker] = []
+        self._busy: Set[_RenderWorker] = set()
+        # Bumped on shutdown: busy workers of an older generation exit once their render is done
+        self._generation = 0
+
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.renders_completed = 0
+        self.renders_failed = 0
+        self.renders_fallback = 0
+        self.renders_rejected = 0
+        self.workers_killed = 0
+
+    def _checkout(self) -> _RenderWorker:
+        """Take an idle worker, starting a new one if none is idle."""
+        if self._idle:
+            return self._idle.pop()
+
+        worker = _RenderWorker(self._context, self._generation)
+        logger.info(
+            f"PDF render worker {worker.process.pid} started, "
+            f"recycled after {self.max_renders_per_worker} renders"
+        )
+        return worker
+
+    def _checkin(self, worker: _RenderWorker) -> None:
+        """Return a worker after a render, replacing it if it is due for recycling."""
+        worker.renders += 1
+        if worker.generation != self._generation or (
+            self.max_renders_per_worker and worker.renders >= self.max_renders_per_worker
+        ):
+            worker.stop()
+        else:
+            self._idle.append(worker)
+
+    def _kill(self, worker: _RenderWorker) -> None:
+        """Terminate one worker; renders in other workers carry on."""
+        self.workers_killed += 1
+        worker.stop(kill=True)
+
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Run a picklable render function in a worker.
+
+        Args:
+            func: Module-level function to run
+            *args: Positional arguments
+            timeout: Seconds for the render once started (config.timeouts.pdf_generation by default)
+            **kwargs: Keyword arguments
+
+        Returns:
+            Function result
+
+        Raises:
+            PDFQueueFullError: If max_queue renders are already waiting
+            PDFWorkerDiedError: If the worker exited during the render
+            asyncio.TimeoutError: If the render takes longer than timeout (its
+                worker is killed, other renders are not affected)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        if self._semaphore.locked() and self.queue_depth >= self.max_queue:
+            self.renders_rejected += 1
+            raise PDFQueueFullError(f"PDF render queue is full ({self.queue_depth} waiting)")
+
+        self.queue_depth += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        self.in_flight += 1
+        worker = self._checkout()
+        self._busy.add(worker)
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, worker.call, func, args, kwargs)
+            result = await asyncio.wait_for(future, timeout=timeout or config.timeouts.pdf_generation)
+            self.renders_completed += 1
+            self._checkin(worker)
+            return result
+        except PDFWorkerDiedError:
+            self.renders_failed += 1
+            logger.error(f"PDF render worker {worker.process.pid} died, replacing it")
+            self._kill(worker)
+            raise
+        except asyncio.TimeoutError:
+            # The worker keeps rendering after wait_for gives up: kill it so the freed slot is real
+            self.renders_failed += 1
+            logger.error(f"PDF render timed out, killing worker {worker.process.pid}")
+            self._kill(worker)
+            raise
+        except asyncio.CancelledError:
+            self._kill(worker)
+            raise
+        except Exception:
+            # The render raised in the worker: the worker itself is fine
+            self.renders_failed += 1
+            self._checkin(worker)
+            raise
+        finally:
+            self._busy.discard(worker)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def render(
+        self,
+        html_content: str,
+        output_path: str,
+        url_fetcher: Optional[Callable] = None,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> int:
+        """Render HTML to a PDF file in a worker; returns file size in bytes."""
+        return await self.run(render_pdf, html_content, output_path, url_fetcher, options, timeout=timeout)
+
+    async def render_fallback(self, html_content: str, output_path: str, timeout: Optional[float] = None) -> int:
+        """Render the text-only version of a document whose full render failed."""
+        size = await self.run(render_fallback_pdf, html_content, output_path, timeout=timeout)
+        self.renders_fallback += 1
+        return size
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get render pool metrics."""
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "completed": self.renders_completed,
+            "failed": self.renders_failed,
+            "fallback": self.renders_fallback,
+            "rejected": self.renders_rejected,
+            "killed": self.workers_killed
+        }
+
+    def shutdown(self, kill: bool = False) -> None:
+        """
+        Stop render processes.
+
+        Args:
+            kill: Terminate busy workers instead of letting running renders finish
+        """
+        if not (self._idle or self._busy):
+            return
+
+        self._generation += 1
+        for worker in self._idle:
+            worker.stop()
+        self._idle.clear()
+        if kill:
+            for worker in self._busy:
+                worker.stop(kill=True)
+        logger.info(f"PDF render pool stopped: {self.get_metrics()}")
+
+
+# Global PDF render pool instance
+pdf_render_pool = PDFRenderPool(
+    workers=config.pdf.workers,
+    max_queue=config.pdf.max_queue,
+    max_renders_per_worker=config.pdf.max_renders_per_worker
+)
@@ -0,0 +1,131 @@
+"""In-process LRU cache for hot database lookups."""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class AsyncLRUCache:
+    """Bounded LRU cache with per-key load locks and hit rate counters.
+
+    Entries never expire on their own: the owner invalidates them when the
+    underlying rows change.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, name: str, max_size: int = 1024):
+        """
+        Initialize cache.
+
+        Args:
+            name: Cache name for metrics
+            max_size: Maximum number of entries (0 disables caching)
+        """
+        self.name = name
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        # Load lock of a key and number of callers using it
+        self._locks: Dict[Hashable, Tuple[asyncio.Lock, int]] = {}
+        # Bumped on invalidation so loads started before it aren't stored
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get cached value and mark it as recently used."""
+        value = self._entries.get(key, self._MISSING)
+        if value is self._MISSING:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    @property
+    def generation(self) -> int:
+        """Invalidation counter to read before loading a value passed to set()."""
+        return self._generation
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Store value, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            generation: generation read before value was loaded; the value is
+                dropped if the cache was invalidated since (it may be stale)
+        """
+        if self.max_size <= 0 or (generation is not None and generation != self._generation):
+            return
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get cached value or load it once for all concurrent callers.
+
+        Args:
+            key: Cache key
+            loader: Coroutine function producing the value (None is cached too)
+
+        Returns:
+            Cached or loaded value
+        """
+        if key in self._entries:
+            return self.get(key)
+
+        lock, waiters = self._locks.get(key, (asyncio.Lock(), 0))
+        self._locks[key] = (lock, waiters + 1)
+        try:
+            async with lock:
+                # Another caller may have loaded it while we waited
+                if key in self._entries:
+                    return self.get(key)
+
+                self.misses += 1
+                generation = self._generation
+                value = await loader()
+                self.set(key, value, generation)
+                return value
+        finally:
+            lock, waiters = self._locks[key]
+            if waiters > 1:
+                self._locks[key] = (lock, waiters - 1)
+            else:
+                del self._locks[key]
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop cached value for key."""
+        self._entries.pop(key, None)
+        self._generation += 1
+
+    def clear(self) -> None:
+        """Drop all cached values."""
+        self._entries.clear()
+        self._generation += 1
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups served from cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get cache metrics."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3)
+        }
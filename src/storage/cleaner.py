@@ -2,8 +2,10 @@
 
 import asyncio
 import os
+import tempfile
 from pathlib import Path
 from datetime import datetime, timedelta
+from typing import Tuple
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from src.storage.sqlite import db
 from src.utils.logger import get_logger
@@ -12,6 +14,9 @@ from src.utils.config import config
 
 logger = get_logger(__name__)
 
+# Files VideoProcessor leaves in the temp directory
+VIDEO_TEMP_PATTERNS = ("reel_*.mp4", "frame_*.jpg", "keyframe_*.jpg", "thumb_*.jpg")
+
 
 class ReportCleaner:
     """Clean old reports from database and filesystem."""
@@ -20,30 +25,42 @@ class ReportCleaner:
         """Initialize cleaner."""
         self.scheduler = AsyncIOScheduler()
         self.retention_days = config.database.report_retention_days
-        self.reports_dir = Path("data/reports")
+        self.exports_dir = Path("exports")
+        self.video_temp_dir = Path(tempfile.gettempdir())
+        self.image_cache_dir = Path(config.pdf.image_cache_dir)
     
     async def cleanup_reports(self) -> None:
         """Clean up old reports."""
         try:
             logger.info("Starting report cleanup")
             
-            # Delete from database
-            deleted_count = await db.cleanup_old_reports(self.retention_days)
+            # Delete from database, then exactly the PDFs of deleted reports
+            deleted_count, pdf_paths = await db.cleanup_old_reports(
+                self.retention_days, batch_size=config.database.cleanup_batch_size
+            )
+            deleted_files = sum(self._unlink(Path(pdf_path)) for pdf_path in pdf_paths)
             
-            # Delete old PDF files
-            cutoff_date = datetime.now() - timedelta(days=self.retention_days)
-            deleted_files = 0
+            # Fingerprints keep their Vision analyses for reuse: same retention as reports
+            deleted_count += await db.cleanup_old_fingerprints(
+                self.retention_days, batch_size=config.database.cleanup_batch_size
+            )
             
-            if self.reports_dir.exists():
-                for pdf_file in self.reports_dir.glob("*.pdf"):
-                    try:
-                        # Check file modification time
-                        file_mtime = datetime.fromtimestamp(pdf_file.stat().st_mtime)
-                        if file_mtime < cutoff_date:
-                            pdf_file.unlink()
-                            deleted_files += 1
-                    except Exception as e:
-                        logger.error(f"Error deleting file {pdf_file}: {e}")
+            # Return freed pages to the filesystem
+            await db.incremental_vacuum()
+            
+            # Export files, downloaded videos and cached images are not referenced by rows
+            now = datetime.now()
+            deleted_files += self._delete_older_than(
+                self.exports_dir, ("*",), now - timedelta(hours=config.database.export_retention_hours)
+            )
+            deleted_files += self._delete_older_than(
+                self.video_temp_dir, VIDEO_TEMP_PATTERNS,
+                now - timedelta(hours=config.database.video_temp_retention_hours)
+            )
+            deleted_files += self._delete_older_than(
+                self.image_cache_dir, ("*",),
+                now - timedelta(hours=config.database.image_cache_retention_hours)
+            )
             
             logger.info(
                 f"Cleanup completed: {deleted_count} records, "
@@ -53,6 +70,43 @@ class ReportCleaner:
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
     
+    @staticmethod
+    def _unlink(path: Path) -> bool:
+        """Delete file; False if it is already gone or can't be deleted."""
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Error deleting file {path}: {e}")
+            return False
+    
+    def _delete_older_than(self, directory: Path, patterns: Tuple[str, ...], cutoff_date: datetime) -> int:
+        """Delete files matching patterns modified before cutoff_date."""
+        if not directory.exists():
+            return 0
+        
+        deleted_files = 0
+        for pattern in patterns:
+            for path in directory.glob(pattern):
+                try:
+                    if not path.is_file() or datetime.fromtimestamp(path.stat().st_mtime) >= cutoff_date:
+                        continue
+                except FileNotFoundError:
+                    continue
+                deleted_files += self._unlink(path)
+        
+        return deleted_files
+    
+    async def optimize_database(self) -> None:
+        """Refresh SQLite query planner statistics."""
+        try:
+            await db.optimize()
+            logger.info(f"Database optimized, lookup caches: {db.get_cache_stats()}")
+        except Exception as e:
+            logger.error(f"Error optimizing database: {e}")
+    
     def start(self) -> None:
         """Start scheduled cleanup."""
         # Run cleanup daily at 3 AM
@@ -72,6 +126,15 @@ class ReportCleaner:
             replace_existing=True
         )
         
+        # Keep query planner statistics fresh
+        self.scheduler.add_job(
+            self.optimize_database,
+            trigger="interval",
+            hours=config.database.optimize_interval_hours,
+            id="optimize_database",
+            replace_existing=True
+        )
+        
         self.scheduler.start()
         logger.info("Report cleaner started")
     
@@ -2,11 +2,11 @@
 
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, Text, 
-    Boolean, JSON, Enum as SQLEnum, Index
+    Column, Integer, BigInteger, String, Float, DateTime, Text, 
+    Boolean, JSON, Enum as SQLEnum, Index, UniqueConstraint
 )
 from sqlalchemy.ext.declarative import declarative_base
-from src.domain.models import ReportStatus
+from src.domain.models import ReportStatus, PDFStatus
 
 
 Base = declarative_base()
@@ -17,7 +17,7 @@ class UserModel(Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True)
-    telegram_id = Column(Integer, unique=True, nullable=False, index=True)
+    telegram_id = Column(BigInteger, unique=True, nullable=False, index=True)
     username = Column(String(255), nullable=True)
     first_name = Column(String(255), nullable=True)
     last_name = Column(String(255), nullable=True)
@@ -43,7 +43,9 @@ class ReportModel(Base):
     payload_json = Column(Text, nullable=False)  # JSON serialized QueryPayload
     result_json = Column(Text, nullable=True)    # JSON serialized AnalysisResult
     pdf_path = Column(String(500), nullable=True)
+    pdf_status = Column(SQLEnum(PDFStatus), nullable=True)
     price_rub = Column(Float, nullable=False)
+    analysis_depth = Column(String(16), nullable=True)  # AnalysisDepth the report was produced with
     usage_stats_json = Column(Text, nullable=True)  # Apify usage statistics
     status = Column(SQLEnum(ReportStatus), default=ReportStatus.PENDING)
     error_message = Column(Text, nullable=True)
@@ -55,6 +57,35 @@ class ReportModel(Base):
     )
 
 
+class ReportReelModel(Base):
+    """Reel of a report (one row per reel, replaces the reels list in result_json)."""
+    __tablename__ = "report_reels"
+    
+    id = Column(Integer, primary_key=True)
+    report_id = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)  # order in the report
+    reel_id = Column(String(100), nullable=False)
+    shortcode = Column(String(100), nullable=True)
+    author_username = Column(String(255), nullable=True)
+    views = Column(Integer, default=0)
+    likes = Column(Integer, default=0)
+    comments = Column(Integer, default=0)
+    engagement_rate = Column(Float, default=0.0)
+    date = Column(DateTime, nullable=True)
+    data_json = Column(Text, nullable=False)  # JSON serialized ReelData
+    vision_json = Column(Text, nullable=True)  # JSON serialized Vision analysis of the reel
+    
+    __table_args__ = (
+        Index("idx_report_reel_report", "report_id", "position"),
+        Index("idx_report_reel_reel_id", "report_id", "reel_id"),
+        Index("idx_report_reel_shortcode", "report_id", "shortcode"),
+        Index("idx_report_reel_author", "author_username"),
+        Index("idx_report_reel_views", "views"),
+        Index("idx_report_reel_engagement", "engagement_rate"),
+        Index("idx_report_reel_date", "date"),
+    )
+
+
 class RequestLogModel(Base):
     """Request log model."""
     __tablename__ = "request_logs"
@@ -88,4 +119,69 @@ class UserContextModel(Base):
     __table_args__ = (
         Index("idx_context_user_id", "user_id"),
         Index("idx_context_user_name", "user_id", "name"),
-    )
\ No newline at end of file
+    )
+
+class VideoFingerprintModel(Base):
+    """Temporal video fingerprint with the Vision analysis it produced."""
+    __tablename__ = "video_fingerprints"
+    
+    id = Column(Integer, primary_key=True)
+    reel_id = Column(String(100), unique=True, nullable=False)
+    reel_url = Column(String(500), nullable=True)
+    author_username = Column(String(255), nullable=True)
+    frame_hashes = Column(Text, nullable=False)  # space separated 64-bit dHashes (hex)
+    analysis_json = Column(Text, nullable=True)  # JSON serialized Vision analysis
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("idx_fingerprint_reel_id", "reel_id"),
+    )
+
+
+class FingerprintBandModel(Base):
+    """Multi-index hashing key: one 16-bit band of a frame dHash."""
+    __tablename__ = "fingerprint_bands"
+    
+    id = Column(Integer, primary_key=True)
+    fingerprint_id = Column(Integer, nullable=False)
+    band_key = Column(Integer, nullable=False)  # band index << 16 | band value
+    
+    __table_args__ = (
+        Index("idx_fingerprint_band_key", "band_key"),
+        Index("idx_fingerprint_band_fingerprint", "fingerprint_id"),
+    )
+
+
+class PDFCacheModel(Base):
+    """Rendered PDF keyed by hash of its template context and template version."""
+    __tablename__ = "pdf_cache"
+    
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), unique=True, nullable=False)
+    pdf_path = Column(String(500), nullable=False)
+    telegram_file_id = Column(String(255), nullable=True)
+    size_bytes = Column(Integer, nullable=True)
+    render_ms = Column(Integer, nullable=False, default=0)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_hit_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("idx_pdf_cache_content_hash", "content_hash"),
+        Index("idx_pdf_cache_pdf_path", "pdf_path"),
+    )
+
+
+class TelegramFileModel(Base):
+    """Telegram file_id of a report file already uploaded to Telegram."""
+    __tablename__ = "telegram_files"
+    
+    id = Column(Integer, primary_key=True)
+    report_id = Column(Integer, nullable=False)
+    format = Column(String(20), nullable=False)  # pdf, json
+    file_id = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("report_id", "format", name="uq_telegram_file_report_format"),
+    )
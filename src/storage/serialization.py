@@ -0,0 +1,231 @@
+"""Versioned serialization of stored report data.
+
+Values are encoded with orjson (stdlib json if it isn't installed) and,
+above a size threshold, compressed with zlib or zstd. Stored text is
+prefixed with a header "<version>:<compression>:"; compressed payloads
+are base64 so they fit TEXT columns. Rows written before this module
+are plain JSON and are recognised by their leading "{" or "[".
+
+Dataclasses are converted with per-class converters generated from their
+fields, so new fields are stored without touching this module.
+"""
+
+import base64
+import dataclasses
+import json
+import typing
+import zlib
+from datetime import date, datetime, time
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:  # orjson is optional: stdlib json is slower but compatible
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional: zlib is used instead
+    zstandard = None
+
+from src.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 1
+COMPRESSIONS = ("none", "zlib", "zstd")
+# Smaller payloads are stored uncompressed: base64 would eat the savings
+COMPRESSION_MIN_BYTES = 1024
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+T = TypeVar("T")
+
+
+# Codec
+
+def _json_default(value: Any) -> Any:
+    """Encode values stdlib json doesn't know the way orjson does natively."""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode value as UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        value, ensure_ascii=False, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """Decode UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Stored value is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def resolve_compression(compression: Optional[str]) -> str:
+    """Validate compression name, falling back to zlib if zstandard is missing."""
+    compression = compression or "none"
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed, using zlib compression")
+        return "zlib"
+    return compression
+
+
+def encode(value: Any, compression: Optional[str] = None, min_size: int = COMPRESSION_MIN_BYTES) -> str:
+    """
+    Encode a JSON-compatible value for a TEXT column.
+
+    Args:
+        value: Value to store (dataclasses must be converted with to_dict first)
+        compression: "none", "zlib" or "zstd"
+        min_size: Payloads smaller than this many bytes are not compressed
+
+    Returns:
+        Versioned text
+    """
+    data = dumps(value)
+    compression = resolve_compression(compression)
+
+    if compression == "none" or len(data) < min_size:
+        return f"{FORMAT_VERSION}:none:{data.decode('utf-8')}"
+
+    payload = base64.b64encode(_compress(data, compression)).decode("ascii")
+    return f"{FORMAT_VERSION}:{compression}:{payload}"
+
+
+def decode(text: Optional[str]) -> Any:
+    """
+    Decode text written by encode() or a legacy json.dumps() value.
+
+    Raises:
+        ValueError: If the text has an unknown version or compression
+    """
+    if not text:
+        return None
+    if text[0] in "{[":
+        # Legacy row
+        return json.loads(text)
+
+    version, compression, payload = text.split(":", 2)
+    if int(version) > FORMAT_VERSION:
+        raise ValueError(f"Stored value has format version {version}, newer than {FORMAT_VERSION}")
+    if compression == "none":
+        return loads(payload.encode("utf-8"))
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    return loads(_decompress(base64.b64decode(payload), compression))
+
+
+# Dataclass conversion
+
+def _encoder_for(field_type: Any) -> Optional[Callable[[Any], Any]]:
+    """Converter of a field value to JSON (None when the value is stored as is)."""
+    origin = typing.get_origin(field_type)
+    args = typing.get_args(field_type)
+
+    if origin is typing.Union:
+        inner = [arg for arg in args if arg is not type(None)]
+        encoder = _encoder_for(inner[0]) if len(inner) == 1 else None
+        return (lambda value: None if value is None else encoder(value)) if encoder else None
+    if origin in (list, List) and args:
+        encoder = _encoder_for(args[0])
+        return (lambda value: None if value is None else [encoder(item) for item in value]) if encoder else None
+    if field_type is datetime:
+        return datetime.isoformat
+    if dataclasses.is_dataclass(field_type):
+        return to_dict
+    return None
+
+
+def _decoder_for(field_type: Any) -> Optional[Callable[[Any], Any]]:
+    """Converter of a stored value back to the field type (None when stored as is)."""
+    origin = typing.get_origin(field_type)
+    args = typing.get_args(field_type)
+
+    if origin is typing.Union:
+        inner = [arg for arg in args if arg is not type(None)]
+        decoder = _decoder_for(inner[0]) if len(inner) == 1 else None
+        return (lambda value: None if value is None else decoder(value)) if decoder else None
+    if origin in (list, List) and args:
+        decoder = _decoder_for(args[0])
+        return (lambda value: None if value is None else [decoder(item) for item in value]) if decoder else None
+    if field_type is datetime:
+        return datetime.fromisoformat
+    if dataclasses.is_dataclass(field_type):
+        return lambda value: from_dict(field_type, value)
+    return None
+
+
+def _missing_value(field: dataclasses.Field, field_type: Any) -> Any:
+    """Value for a field absent from stored data (rows written by older code)."""
+    if field.default is not dataclasses.MISSING:
+        return field.default
+    if field.default_factory is not dataclasses.MISSING:
+        return field.default_factory()
+    if typing.get_origin(field_type) is typing.Union:
+        return None
+    if field_type is datetime:
+        return datetime.now()
+    if field_type in (str, int, float, bool, list, dict):
+        return field_type()
+    return None
+
+
+@lru_cache(maxsize=None)
+def _converters(cls: type) -> Tuple[Tuple[str, Any, Optional[Callable], Optional[Callable], dataclasses.Field], ...]:
+    """Generate (name, type, encoder, decoder, field) for every dataclass field."""
+    hints = typing.get_type_hints(cls)
+    return tuple(
+        (field.name, hints[field.name], _encoder_for(hints[field.name]), _decoder_for(hints[field.name]), field)
+        for field in dataclasses.fields(cls)
+    )
+
+
+def to_dict(obj: Any) -> Dict[str, Any]:
+    """Convert a dataclass instance to a JSON-compatible dict."""
+    result = {}
+    for name, _, encoder, _, _ in _converters(type(obj)):
+        value = getattr(obj, name)
+        result[name] = encoder(value) if encoder and value is not None else value
+    return result
+
+
+def from_dict(cls: Type[T], data: Dict[str, Any]) -> T:
+    """Build a dataclass instance from to_dict() output; unknown keys are ignored."""
+    values = {}
+    for name, field_type, _, decoder, field in _converters(cls):
+        if name not in data:
+            values[name] = _missing_value(field, field_type)
+            continue
+        value = data[name]
+        values[name] = decoder(value) if decoder and value is not None else value
+    return cls(**values)
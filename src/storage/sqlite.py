@@ -1,49 +1,291 @@
-"""SQLite storage implementation."""
+"""Database storage implementation (SQLite by default, PostgreSQL via asyncpg)."""
 
-import json
-from datetime import datetime, timedelta
-from typing import Optional, List
+import copy
+import re
+from datetime import datetime, timedelta, timezone
+from collections import Counter
+from typing import Any, Dict, Optional, List, Tuple
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import select, update, delete, and_, func
-from src.storage.models import Base, UserModel, ReportModel, RequestLogModel
-from src.domain.models import QueryPayload, AnalysisResult, Report, ReportStatus
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from sqlalchemy.types import SchemaType
+from sqlalchemy import select, update, delete, and_, or_, func, inspect, text, event
+from sqlalchemy.dialects import postgresql, sqlite
+from src.storage.models import (
+    Base, UserModel, ReportModel, ReportReelModel, RequestLogModel,
+    VideoFingerprintModel, FingerprintBandModel, PDFCacheModel, TelegramFileModel
+)
+from src.domain.models import QueryPayload, AnalysisResult, Report, ReportStatus, PDFStatus, ReelData
+from src.storage.cache import AsyncLRUCache
+from src.storage.serialization import encode, decode, to_dict, from_dict, resolve_compression
+from src.storage.write_behind import WriteBehindBuffer
 from src.utils.logger import get_logger
 from src.utils.config import config
 
 
 logger = get_logger(__name__)
 
+# Reels migrated from result_json blobs per transaction
+REEL_MIGRATION_BATCH = 100
+
+SHORTCODE_PATTERN = re.compile(r"/(?:reels?|p)/([^/?#]+)")
+
+
+def _report_reel_rows(
+    report_id: int,
+    reels_data: List[Dict[str, Any]],
+    vision_analyses: Dict[str, Any],
+    compression: Optional[str] = None
+) -> List[ReportReelModel]:
+    """Build report_reels rows from serialized reels."""
+    rows = []
+    for position, reel_data in enumerate(reels_data):
+        reel_id = str(reel_data.get("id", ""))
+        shortcode = SHORTCODE_PATTERN.search(reel_data.get("url") or "")
+        vision = vision_analyses.get(reel_id)
+        date = datetime.fromisoformat(reel_data["date"]) if reel_data.get("date") else None
+        if date and date.tzinfo:
+            # Column is naive UTC (PostgreSQL rejects aware values for it)
+            date = date.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append(ReportReelModel(
+            report_id=report_id,
+            position=position,
+            reel_id=reel_id,
+            shortcode=shortcode.group(1) if shortcode else None,
+            author_username=reel_data.get("author_username"),
+            views=reel_data.get("views", 0),
+            likes=reel_data.get("likes", 0),
+            comments=reel_data.get("comments", 0),
+            engagement_rate=reel_data.get("engagement_rate", 0.0),
+            date=date,
+            data_json=encode(reel_data, compression),
+            vision_json=encode(vision, compression) if vision else None
+        ))
+    return rows
+
 
 class Database:
     """Database manager."""
     
-    def __init__(self, database_url: Optional[str] = None):
-        """Initialize database."""
+    def __init__(self, database_url: Optional[str] = None, tuned: bool = True):
+        """Initialize database (tuned: apply the SQLite performance profile)."""
         self.database_url = database_url or config.database.url
+        self.is_sqlite = self.database_url.startswith("sqlite")
+        self.is_postgres = self.database_url.startswith("postgresql")
+        if not (self.is_sqlite or self.is_postgres):
+            raise ValueError(f"Unsupported database URL: {self.database_url.split(':', 1)[0]}")
+        
+        self.tuned = tuned and self.is_sqlite
+        if self.is_postgres:
+            engine_options = self._postgres_engine_options()
+        else:
+            engine_options = self._sqlite_engine_options() if self.tuned else {}
         self.engine = create_async_engine(
             self.database_url,
             echo=config.debug,
-            future=True
+            future=True,
+            **engine_options
         )
+        # INSERT ... ON CONFLICT of the backend
+        self._insert = postgresql.insert if self.is_postgres else sqlite.insert
+        if self.tuned:
+            event.listen(self.engine.sync_engine, "connect", self._apply_sqlite_pragmas)
         self.async_session = sessionmaker(
             self.engine,
             class_=AsyncSession,
             expire_on_commit=False
         )
+        # telegram_id -> UserModel, user_id -> last completed ReportModel (or None).
+        # The caches are per process, so they are off on PostgreSQL, which replicas share
+        self.user_cache = AsyncLRUCache("users", 0 if self.is_postgres else config.database.user_cache_size)
+        self.report_cache = AsyncLRUCache("reports", 0 if self.is_postgres else config.database.report_cache_size)
+        self.compression = resolve_compression(config.database.result_compression)
+        # Request logs and usage counters are written in batches (0 ms: write immediately)
+        self.write_buffer = None
+        if config.database.write_behind_flush_ms > 0:
+            self.write_buffer = WriteBehindBuffer(
+                self._write_request_batch,
+                flush_interval_ms=config.database.write_behind_flush_ms,
+                max_items=config.database.write_behind_max_items
+            )
+    
+    def _sqlite_engine_options(self) -> dict:
+        """Pool settings for aiosqlite: one shared connection in memory, a small pool for files."""
+        if ":memory:" in self.database_url or "mode=memory" in self.database_url:
+            return {"poolclass": StaticPool}
+        
+        # WAL lets pooled connections read while another one writes
+        return {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": config.database.pool_size,
+            "max_overflow": 0
+        }
+    
+    @staticmethod
+    def _postgres_engine_options() -> dict:
+        """Pool settings for asyncpg: connections shared by replicas, statements prepared per connection."""
+        settings = config.database
+        return {
+            "pool_size": settings.pool_size,
+            "max_overflow": settings.max_overflow,
+            "pool_recycle": settings.pool_recycle_seconds,
+            "pool_pre_ping": True,
+            "connect_args": {
+                # Server-side prepared statements cached per connection (0 behind pgbouncer in transaction mode)
+                "prepared_statement_cache_size": settings.prepared_statement_cache_size
+            }
+        }
+    
+    @staticmethod
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        """Set SQLite performance pragmas on every new connection."""
+        settings = config.database
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}")
+            # Negative cache_size is in KiB
+            cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_mb * 1024}")
+            cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        finally:
+            cursor.close()
     
     async def init_db(self) -> None:
         """Initialize database tables."""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(self._add_missing_columns)
+            
+            # Renders interrupted by a restart can be started again
+            await conn.execute(
+                update(ReportModel)
+                .where(ReportModel.pdf_status == PDFStatus.RENDERING)
+                .values(pdf_status=PDFStatus.PENDING)
+            )
+        
+        await self._migrate_report_reels()
+        if self.is_sqlite:
+            await self._enable_incremental_vacuum()
         logger.info("Database initialized")
     
+    @staticmethod
+    def _add_missing_columns(connection) -> None:
+        """Add nullable columns introduced after a table was created (create_all doesn't alter tables)."""
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                # Enums are named types on PostgreSQL: the type must exist before the column
+                if isinstance(column.type, SchemaType):
+                    column.type.create(connection, checkfirst=True)
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Migrated {table.name}: added column {column.name} {column_type}")
+    
+    async def _enable_incremental_vacuum(self) -> None:
+        """Switch the database file to auto_vacuum=INCREMENTAL (rebuilds existing files once)."""
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            result = await conn.execute(text("PRAGMA auto_vacuum"))
+            if result.scalar() == 2:
+                return
+            
+            await conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            # Existing files only pick the mode up on VACUUM, which rewrites the whole file
+            logger.warning("Rebuilding database file with VACUUM to enable incremental vacuum (one-time)")
+            started = datetime.now()
+            await conn.execute(text("VACUUM"))
+            logger.info(f"Enabled incremental vacuum, file rebuilt in {(datetime.now() - started).total_seconds():.1f}s")
+    
+    async def _migrate_report_reels(self) -> None:
+        """Move reels of reports saved before report_reels existed out of result_json."""
+        migrated = 0
+        while True:
+            async with self.async_session() as session:
+                result = await session.execute(
+                    select(ReportModel.id, ReportModel.result_json)
+                    .where(ReportModel.result_json.like('%"reels": [%'))
+                    .limit(REEL_MIGRATION_BATCH)
+                )
+                batch = result.all()
+                if not batch:
+                    break
+                
+                for report_id, result_json in batch:
+                    result_data = decode(result_json)
+                    vision_analyses = result_data.pop("vision_analyses", None) or {}
+                    reels_data = result_data.pop("reels", None) or []
+                    
+                    await session.execute(
+                        delete(ReportReelModel).where(ReportReelModel.report_id == report_id)
+                    )
+                    session.add_all(_report_reel_rows(report_id, reels_data, vision_analyses, self.compression))
+                    await session.execute(
+                        update(ReportModel)
+                        .where(ReportModel.id == report_id)
+                        .values(result_json=encode(result_data, self.compression))
+                    )
+                
+                await session.commit()
+                migrated += len(batch)
+        
+        if migrated:
+            logger.info(f"Migrated reels of {migrated} reports to report_reels")
+    
+    async def optimize(self) -> None:
+        """Let SQLite refresh query planner statistics (PRAGMA optimize)."""
+        if not self.is_sqlite:
+            return
+        async with self.engine.connect() as conn:
+            await conn.execute(text("PRAGMA optimize"))
+    
+    def get_cache_stats(self) -> dict:
+        """Get hit rates of in-process lookup caches."""
+        return {
+            "users": self.user_cache.get_metrics(),
+            "reports": self.report_cache.get_metrics()
+        }
+    
     async def close(self) -> None:
         """Close database connection."""
+        if self.write_buffer is not None:
+            await self.write_buffer.close()
+            logger.info(f"Write-behind buffer: {self.write_buffer.get_metrics()}")
+        logger.info(f"Database caches: {self.get_cache_stats()}")
+        try:
+            await self.optimize()
+        except Exception as e:
+            logger.warning(f"PRAGMA optimize failed: {e}")
         await self.engine.dispose()
     
     # User methods
     
+    def _insert_user_statement(
+        self,
+        telegram_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ):
+        """INSERT ... ON CONFLICT DO NOTHING RETURNING of a user for the backend dialect."""
+        return (
+            self._insert(UserModel)
+            .values(
+                telegram_id=telegram_id,
+                username=username,
+                first_name=first_name,
+                last_name=last_name
+            )
+            .on_conflict_do_nothing(index_elements=[UserModel.telegram_id])
+            .returning(UserModel)
+        )
+    
     async def get_or_create_user(
         self,
         telegram_id: int,
@@ -52,6 +294,12 @@ class Database:
         last_name: Optional[str] = None
     ) -> UserModel:
         """Get or create user."""
+        cached = self.user_cache.get(telegram_id)
+        if cached is not None and username == cached.username and first_name == cached.first_name:
+            return cached
+        
+        # A request count flushed while we load invalidates the user: don't cache the stale row
+        generation = self.user_cache.generation
         async with self.async_session() as session:
             # Try to get existing user
             result = await session.execute(
@@ -68,17 +316,22 @@ class Database:
                     user.updated_at = datetime.utcnow()
                     await session.commit()
             else:
-                # Create new user
-                user = UserModel(
-                    telegram_id=telegram_id,
-                    username=username,
-                    first_name=first_name,
-                    last_name=last_name
+                # Create new user; ON CONFLICT: another handler or replica may be creating it too
+                result = await session.execute(
+                    self._insert_user_statement(telegram_id, username, first_name, last_name)
                 )
-                session.add(user)
+                user = result.scalar_one_or_none()
                 await session.commit()
-                logger.info(f"Created new user: {telegram_id}")
+                
+                if user:
+                    logger.info(f"Created new user: {telegram_id}")
+                else:
+                    result = await session.execute(
+                        select(UserModel).where(UserModel.telegram_id == telegram_id)
+                    )
+                    user = result.scalar_one()
             
+            self.user_cache.set(telegram_id, user, generation)
             return user
     
     async def get_user_requests_count(self, telegram_id: int) -> int:
@@ -93,13 +346,10 @@ class Database:
     
     async def increment_user_requests(self, telegram_id: int) -> None:
         """Increment user requests count."""
-        async with self.async_session() as session:
-            await session.execute(
-                update(UserModel)
-                .where(UserModel.telegram_id == telegram_id)
-                .values(requests_count=UserModel.requests_count + 1)
-            )
-            await session.commit()
+        if self.write_buffer is not None and not self.write_buffer.closed:
+            self.write_buffer.add_request_increment(telegram_id)
+            return
+        await self._write_request_batch([], Counter({telegram_id: 1}))
     
     # Report methods
     
@@ -107,24 +357,28 @@ class Database:
         self,
         user_id: int,
         query_payload: QueryPayload,
-        price_rub: float
+        price_rub: float,
+        analysis_depth: Optional[str] = None
     ) -> ReportModel:
-        """Create new report."""
+        """Create new report (analysis_depth: AnalysisDepth value of its tier)."""
         async with self.async_session() as session:
             report = ReportModel(
                 user_id=user_id,
                 topic=query_payload.topic,
                 period=query_payload.period,
                 geo=query_payload.geo,
-                payload_json=json.dumps(query_payload.to_dict()),
+                payload_json=encode(query_payload.to_dict(), self.compression),
                 price_rub=price_rub,
+                analysis_depth=analysis_depth,
                 status=ReportStatus.PENDING
             )
             session.add(report)
             await session.commit()
             await session.refresh(report)
             logger.info(f"Created report {report.id} for user {user_id}")
-            return report
+        
+        self.report_cache.invalidate(user_id)
+        return report
     
     async def update_report(
         self,
@@ -133,46 +387,34 @@ class Database:
         pdf_path: Optional[str] = None,
         status: Optional[ReportStatus] = None,
         error_message: Optional[str] = None,
-        usage_stats: Optional[dict] = None
+        usage_stats: Optional[dict] = None,
+        pdf_status: Optional[PDFStatus] = None
     ) -> None:
         """Update report."""
         async with self.async_session() as session:
             values = {}
             
             if analysis_result:
-                # Serialize reels data
-                reels_data = []
-                for reel in analysis_result.reels:
-                    reel_dict = {
-                        "id": reel.id,
-                        "title": reel.title,
-                        "author": reel.author,
-                        "author_username": reel.author_username,
-                        "url": reel.url,
-                        "views": reel.views,
-                        "likes": reel.likes,
-                        "comments": reel.comments,
-                        "shares": reel.shares,
-                        "engagement_rate": reel.engagement_rate,
-                        "date": reel.date.isoformat(),
-                        "transcript": reel.transcript,
-                        "hashtags": reel.hashtags,
-                        "thumbnail_url": reel.thumbnail_url,
-                        "duration": reel.duration,
-                        "author_avatar_url": reel.author_avatar_url
-                    }
-                    reels_data.append(reel_dict)
-                
-                values["result_json"] = json.dumps({
+                # Reels are stored as rows of report_reels, the rest as JSON
+                values["result_json"] = encode({
                     "total_views": analysis_result.total_views,
                     "average_er": analysis_result.average_er,
                     "reels_count": len(analysis_result.reels),
-                    "reels": reels_data,  # Include actual reels data
                     "popular_hashtags": analysis_result.popular_hashtags,
                     "insights": analysis_result.insights,
                     "recommendations": analysis_result.recommendations,
                     "usage_cost_usd": analysis_result.usage_cost_usd
-                })
+                }, self.compression)
+                
+                await session.execute(
+                    delete(ReportReelModel).where(ReportReelModel.report_id == report_id)
+                )
+                session.add_all(_report_reel_rows(
+                    report_id,
+                    [to_dict(reel) for reel in analysis_result.reels],
+                    analysis_result.vision_analyses,
+                    self.compression
+                ))
             
             if pdf_path:
                 values["pdf_path"] = pdf_path
@@ -180,21 +422,48 @@ class Database:
             if status:
                 values["status"] = status
             
+            if pdf_status:
+                values["pdf_status"] = pdf_status
+            
             if error_message:
                 values["error_message"] = error_message
             
             if usage_stats:
-                values["usage_stats_json"] = json.dumps(usage_stats)
+                values["usage_stats_json"] = encode(usage_stats, self.compression)
             
             if values:
-                await session.execute(
+                result = await session.execute(
                     update(ReportModel)
                     .where(ReportModel.id == report_id)
                     .values(**values)
+                    .returning(ReportModel.user_id)
                 )
+                user_id = result.scalar_one_or_none()
                 await session.commit()
+                self.report_cache.invalidate(user_id)
                 logger.info(f"Updated report {report_id}")
     
+    async def claim_pdf_render(self, report_id: int) -> bool:
+        """Mark report PDF as rendering; False if it is rendering already or not offered."""
+        async with self.async_session() as session:
+            result = await session.execute(
+                update(ReportModel)
+                .where(ReportModel.id == report_id)
+                .where(or_(
+                    ReportModel.pdf_status.is_(None),
+                    ReportModel.pdf_status.notin_([PDFStatus.RENDERING, PDFStatus.SKIPPED])
+                ))
+                .values(pdf_status=PDFStatus.RENDERING)
+                .returning(ReportModel.user_id)
+            )
+            user_id = result.scalar_one_or_none()
+            await session.commit()
+        
+        if user_id is None:
+            return False
+        self.report_cache.invalidate(user_id)
+        return True
+    
     async def get_report(self, report_id: int) -> Optional[ReportModel]:
         """Get report by ID."""
         async with self.async_session() as session:
@@ -222,7 +491,11 @@ class Database:
             return result.scalars().all()
     
     async def get_last_user_report(self, user_id: int) -> Optional[ReportModel]:
-        """Get last user report."""
+        """Get last completed user report (cached until the user's reports change)."""
+        return await self.report_cache.get_or_load(user_id, lambda: self._load_last_user_report(user_id))
+    
+    async def _load_last_user_report(self, user_id: int) -> Optional[ReportModel]:
+        """Load last completed user report with its analysis result."""
         async with self.async_session() as session:
             result = await session.execute(
                 select(ReportModel)
@@ -233,36 +506,20 @@ class Database:
             )
             report = result.scalar_one_or_none()
             if report and report.result_json:
-                # Deserialize the analysis result
-                import json
-                from src.domain.models import AnalysisResult, ReelData
-                from datetime import datetime
-                
-                result_data = json.loads(report.result_json)
+                result_data = decode(report.result_json)
                 
-                # Create ReelData objects from stored data
+                reel_rows = await session.execute(
+                    select(ReportReelModel.data_json, ReportReelModel.vision_json)
+                    .where(ReportReelModel.report_id == report.id)
+                    .order_by(ReportReelModel.position)
+                )
                 reels = []
-                if 'reels' in result_data:
-                    for reel_data in result_data['reels']:
-                        reel = ReelData(
-                            id=reel_data.get('id', ''),
-                            title=reel_data.get('title', ''),
-                            author=reel_data.get('author', ''),
-                            author_username=reel_data.get('author_username', ''),
-                            url=reel_data.get('url', ''),
-                            views=reel_data.get('views', 0),
-                            likes=reel_data.get('likes', 0),
-                            comments=reel_data.get('comments', 0),
-                            shares=reel_data.get('shares', 0),
-                            engagement_rate=reel_data.get('engagement_rate', 0.0),
-                            date=datetime.fromisoformat(reel_data.get('date', datetime.now().isoformat())),
-                            transcript=reel_data.get('transcript'),
-                            hashtags=reel_data.get('hashtags', []),
-                            thumbnail_url=reel_data.get('thumbnail_url'),
-                            duration=reel_data.get('duration'),
-                            author_avatar_url=reel_data.get('author_avatar_url')
-                        )
-                        reels.append(reel)
+                vision_analyses = {}
+                for data_json, vision_json in reel_rows:
+                    reel = from_dict(ReelData, decode(data_json))
+                    reels.append(reel)
+                    if vision_json:
+                        vision_analyses[reel.id] = decode(vision_json)
                 
                 # Create AnalysisResult
                 analysis_result = AnalysisResult(
@@ -279,7 +536,8 @@ class Database:
                     insights=result_data.get('insights', []),
                     recommendations=result_data.get('recommendations', []),
                     usage_cost_usd=result_data.get('usage_cost_usd', 0.0),
-                    created_at=report.created_at
+                    created_at=report.created_at,
+                    vision_analyses=vision_analyses
                 )
                 
                 # Store analysis result in report object for easier access
@@ -287,31 +545,153 @@ class Database:
                 
             return report
     
-    async def cleanup_old_reports(self, days: int = 30) -> int:
-        """Delete reports older than specified days."""
+    async def get_last_report_reel(
+        self,
+        user_id: int,
+        reel_id: str
+    ) -> Optional[Tuple[ReelData, Dict[str, Any], Optional[str]]]:
+        """
+        Get one reel (by ID or shortcode) of the last completed user report.
+        
+        Returns:
+            (reel, its stored Vision analysis, analysis depth of the report) or None
+        """
+        if user_id in self.report_cache:
+            # Last report is loaded already: no database round trip
+            report = self.report_cache.get(user_id)
+            if report is None or not hasattr(report, "analysis_result"):
+                return None
+            for reel in report.analysis_result.reels:
+                shortcode = SHORTCODE_PATTERN.search(reel.url or "")
+                if reel.id == reel_id or (shortcode and shortcode.group(1) == reel_id):
+                    # Copies: callers must not modify the cached report
+                    vision = report.analysis_result.vision_analyses.get(reel.id) or {}
+                    return copy.deepcopy(reel), copy.deepcopy(vision), report.analysis_depth
+            return None
+        
         async with self.async_session() as session:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
-            # Get reports to delete
+            last_report_id = (
+                select(ReportModel.id)
+                .where(ReportModel.user_id == user_id)
+                .where(ReportModel.status == ReportStatus.COMPLETED)
+                .order_by(ReportModel.created_at.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
             result = await session.execute(
-                select(ReportModel)
-                .where(ReportModel.created_at < cutoff_date)
+                select(ReportReelModel.data_json, ReportReelModel.vision_json, ReportModel.analysis_depth)
+                .join(ReportModel, ReportModel.id == ReportReelModel.report_id)
+                .where(ReportReelModel.report_id == last_report_id)
+                .where(or_(ReportReelModel.reel_id == reel_id, ReportReelModel.shortcode == reel_id))
+                .order_by(ReportReelModel.position)
+                .limit(1)
             )
-            reports_to_delete = result.scalars().all()
+            row = result.first()
+            if not row:
+                return None
             
-            # Delete reports
-            if reports_to_delete:
-                await session.execute(
-                    delete(ReportModel)
+            data_json, vision_json, analysis_depth = row
+            return from_dict(ReelData, decode(data_json)), decode(vision_json) if vision_json else {}, analysis_depth
+    
+    async def cleanup_old_reports(self, days: int = 30, batch_size: int = 500) -> Tuple[int, List[str]]:
+        """
+        Delete reports older than specified days in chunks of batch_size.
+        
+        Returns:
+            Number of deleted reports and PDF paths no remaining report refers to
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        deleted_count = 0
+        pdf_paths: List[str] = []
+        
+        while True:
+            async with self.async_session() as session:
+                result = await session.execute(
+                    select(ReportModel.id, ReportModel.pdf_path)
                     .where(ReportModel.created_at < cutoff_date)
+                    .order_by(ReportModel.id)
+                    .limit(batch_size)
                 )
+                batch = result.all()
+                if not batch:
+                    break
+                
+                report_ids = [report_id for report_id, _ in batch]
+                await session.execute(delete(ReportReelModel).where(ReportReelModel.report_id.in_(report_ids)))
+                await session.execute(delete(TelegramFileModel).where(TelegramFileModel.report_id.in_(report_ids)))
+                await session.execute(delete(ReportModel).where(ReportModel.id.in_(report_ids)))
+                
+                # PDFs reused from the PDF cache may still belong to newer reports
+                batch_paths = {pdf_path for _, pdf_path in batch if pdf_path}
+                if batch_paths:
+                    result = await session.execute(
+                        select(ReportModel.pdf_path).where(ReportModel.pdf_path.in_(batch_paths)).distinct()
+                    )
+                    batch_paths -= set(result.scalars().all())
+                    await session.execute(delete(PDFCacheModel).where(PDFCacheModel.pdf_path.in_(batch_paths)))
+                
                 await session.commit()
+            
+            deleted_count += len(batch)
+            pdf_paths.extend(batch_paths)
+            if len(batch) < batch_size:
+                break
+        
+        if deleted_count:
+            self.report_cache.clear()
+            logger.info(f"Deleted {deleted_count} old reports, {len(pdf_paths)} PDFs unreferenced")
+        
+        return deleted_count, pdf_paths
+    
+    async def cleanup_old_fingerprints(self, days: int = 30, batch_size: int = 500) -> int:
+        """
+        Delete video fingerprints (with their band keys) older than specified days.
+        
+        Returns:
+            Number of deleted fingerprints
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        deleted_count = 0
+        
+        while True:
+            async with self.async_session() as session:
+                result = await session.execute(
+                    select(VideoFingerprintModel.id)
+                    .where(VideoFingerprintModel.created_at < cutoff_date)
+                    .order_by(VideoFingerprintModel.id)
+                    .limit(batch_size)
+                )
+                fingerprint_ids = result.scalars().all()
+                if not fingerprint_ids:
+                    break
                 
-                deleted_count = len(reports_to_delete)
-                logger.info(f"Deleted {deleted_count} old reports")
-                return deleted_count
+                await session.execute(
+                    delete(FingerprintBandModel).where(FingerprintBandModel.fingerprint_id.in_(fingerprint_ids))
+                )
+                await session.execute(
+                    delete(VideoFingerprintModel).where(VideoFingerprintModel.id.in_(fingerprint_ids))
+                )
+                await session.commit()
             
-            return 0
+            deleted_count += len(fingerprint_ids)
+            if len(fingerprint_ids) < batch_size:
+                break
+        
+        if deleted_count:
+            logger.info(f"Deleted {deleted_count} old video fingerprints")
+        
+        return deleted_count
+    
+    async def incremental_vacuum(self, pages: int = 0) -> None:
+        """Return free pages to the filesystem (all of them if pages is 0)."""
+        if not self.is_sqlite:
+            return
+        async with self.engine.connect() as conn:
+            raw_connection = await conn.get_raw_connection()
+            # The pragma frees one page per step; execute() steps once, executescript() to completion
+            await raw_connection.driver_connection.executescript(
+                f"PRAGMA incremental_vacuum({pages});" if pages else "PRAGMA incremental_vacuum;"
+            )
     
     # Request log methods
     
@@ -324,15 +704,224 @@ class Database:
         processing_time_ms: Optional[int] = None
     ) -> None:
         """Log user request."""
+        values = {
+            "user_id": user_id,
+            "request_type": request_type,
+            "request_text": request_text,
+            "is_voice": is_voice,
+            "processing_time_ms": processing_time_ms
+        }
+        if self.write_buffer is not None and not self.write_buffer.closed:
+            self.write_buffer.add_request_log(**values)
+            return
+        await self._write_request_batch([values], Counter())
+    
+    async def _write_request_batch(self, request_logs: List[dict], request_increments: Counter) -> None:
+        """Write request logs and requests_count increments in one transaction."""
         async with self.async_session() as session:
-            log = RequestLogModel(
-                user_id=user_id,
-                request_type=request_type,
-                request_text=request_text,
-                is_voice=is_voice,
-                processing_time_ms=processing_time_ms
+            session.add_all([RequestLogModel(**values) for values in request_logs])
+            for telegram_id, count in request_increments.items():
+                await session.execute(
+                    update(UserModel)
+                    .where(UserModel.telegram_id == telegram_id)
+                    .values(requests_count=UserModel.requests_count + count)
+                )
+            await session.commit()
+        
+        for telegram_id in request_increments:
+            self.user_cache.invalidate(telegram_id)
+
+    
+    # Video fingerprint methods
+    
+    async def save_fingerprint(
+        self,
+        reel_id: str,
+        frame_hashes: List[int],
+        band_keys: List[int],
+        analysis: Optional[dict] = None,
+        reel_url: Optional[str] = None,
+        author_username: Optional[str] = None
+    ) -> VideoFingerprintModel:
+        """Save (or replace) fingerprint of a reel with its band keys."""
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(VideoFingerprintModel).where(VideoFingerprintModel.reel_id == reel_id)
+            )
+            fingerprint = result.scalar_one_or_none()
+            
+            if fingerprint:
+                await session.execute(
+                    delete(FingerprintBandModel)
+                    .where(FingerprintBandModel.fingerprint_id == fingerprint.id)
+                )
+            else:
+                fingerprint = VideoFingerprintModel(reel_id=reel_id)
+                session.add(fingerprint)
+            
+            fingerprint.reel_url = reel_url
+            fingerprint.author_username = author_username
+            # Retention counts from the latest analysis
+            fingerprint.created_at = datetime.utcnow()
+            fingerprint.frame_hashes = " ".join(f"{h:016x}" for h in frame_hashes)
+            fingerprint.analysis_json = encode(analysis, self.compression) if analysis else None
+            await session.flush()
+            
+            session.add_all([
+                FingerprintBandModel(fingerprint_id=fingerprint.id, band_key=key)
+                for key in set(band_keys)
+            ])
+            await session.commit()
+            return fingerprint
+    
+    async def find_fingerprint_candidates(
+        self,
+        band_keys: List[int],
+        min_matches: int = 1,
+        limit: int = 20
+    ) -> List[VideoFingerprintModel]:
+        """Find fingerprints sharing at least min_matches band keys, best first."""
+        async with self.async_session() as session:
+            matches = func.count(FingerprintBandModel.id).label("matches")
+            candidates = (
+                select(FingerprintBandModel.fingerprint_id, matches)
+                .where(FingerprintBandModel.band_key.in_(set(band_keys)))
+                .group_by(FingerprintBandModel.fingerprint_id)
+                .having(matches >= min_matches)
+                .order_by(matches.desc())
+                .limit(limit)
+                .subquery()
+            )
+            result = await session.execute(
+                select(VideoFingerprintModel)
+                .join(candidates, candidates.c.fingerprint_id == VideoFingerprintModel.id)
+                .order_by(candidates.c.matches.desc())
+            )
+            return list(result.scalars().all())
+
+    
+    # PDF cache methods
+    
+    async def get_pdf_cache(self, content_hash: str) -> Optional[PDFCacheModel]:
+        """Get cached PDF entry by content hash."""
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(PDFCacheModel).where(PDFCacheModel.content_hash == content_hash)
+            )
+            return result.scalar_one_or_none()
+    
+    async def record_pdf_cache_hit(self, content_hash: str) -> None:
+        """Count a reuse of a cached PDF."""
+        async with self.async_session() as session:
+            await session.execute(
+                update(PDFCacheModel)
+                .where(PDFCacheModel.content_hash == content_hash)
+                .values(hits=PDFCacheModel.hits + 1, last_hit_at=datetime.utcnow())
+            )
+            await session.commit()
+    
+    async def save_pdf_cache(
+        self,
+        content_hash: str,
+        pdf_path: str,
+        render_ms: int,
+        size_bytes: Optional[int] = None
+    ) -> None:
+        """Save (or replace) cached PDF for a content hash."""
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(PDFCacheModel).where(PDFCacheModel.content_hash == content_hash)
+            )
+            entry = result.scalar_one_or_none()
+            
+            if entry is None:
+                entry = PDFCacheModel(content_hash=content_hash, hits=0)
+                session.add(entry)
+            
+            # A re-rendered file gets a new path, so any uploaded file_id is stale
+            entry.pdf_path = pdf_path
+            entry.telegram_file_id = None
+            entry.render_ms = render_ms
+            entry.size_bytes = size_bytes
+            await session.commit()
+    
+    async def get_pdf_file_id(self, pdf_path: str) -> Optional[str]:
+        """Get Telegram file_id of an uploaded cached PDF."""
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(PDFCacheModel.telegram_file_id)
+                .where(PDFCacheModel.pdf_path == pdf_path)
+                .where(PDFCacheModel.telegram_file_id.is_not(None))
+                .limit(1)
+            )
+            return result.scalar_one_or_none()
+    
+    async def set_pdf_file_id(self, pdf_path: str, file_id: Optional[str]) -> None:
+        """Remember (or forget, with None) Telegram file_id of an uploaded cached PDF."""
+        async with self.async_session() as session:
+            await session.execute(
+                update(PDFCacheModel)
+                .where(PDFCacheModel.pdf_path == pdf_path)
+                .values(telegram_file_id=file_id)
+            )
+            await session.commit()
+    
+    async def get_pdf_cache_stats(self) -> dict:
+        """Get PDF cache statistics (entries, hits, render time saved)."""
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(
+                    func.count(PDFCacheModel.id),
+                    func.coalesce(func.sum(PDFCacheModel.hits), 0),
+                    func.coalesce(func.sum(PDFCacheModel.hits * PDFCacheModel.render_ms), 0)
+                )
+            )
+            entries, hits, saved_ms = result.one()
+            return {
+                "entries": entries,
+                "hits": hits,
+                "render_seconds_saved": round(saved_ms / 1000, 1)
+            }
+
+    
+    # Telegram file methods
+    
+    async def get_telegram_file_id(self, report_id: int, format: str) -> Optional[str]:
+        """Get Telegram file_id of an uploaded report file."""
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(TelegramFileModel.file_id)
+                .where(TelegramFileModel.report_id == report_id)
+                .where(TelegramFileModel.format == format)
+            )
+            return result.scalar_one_or_none()
+    
+    async def save_telegram_file_id(self, report_id: int, format: str, file_id: str) -> None:
+        """Save (or replace) Telegram file_id of an uploaded report file."""
+        async with self.async_session() as session:
+            result = await session.execute(
+                select(TelegramFileModel)
+                .where(TelegramFileModel.report_id == report_id)
+                .where(TelegramFileModel.format == format)
+            )
+            telegram_file = result.scalar_one_or_none()
+            
+            if telegram_file is None:
+                telegram_file = TelegramFileModel(report_id=report_id, format=format)
+                session.add(telegram_file)
+            
+            telegram_file.file_id = file_id
+            telegram_file.created_at = datetime.utcnow()
+            await session.commit()
+    
+    async def delete_telegram_file_id(self, report_id: int, format: str) -> None:
+        """Forget Telegram file_id that Telegram no longer accepts."""
+        async with self.async_session() as session:
+            await session.execute(
+                delete(TelegramFileModel)
+                .where(TelegramFileModel.report_id == report_id)
+                .where(TelegramFileModel.format == format)
             )
-            session.add(log)
             await session.commit()
 
 
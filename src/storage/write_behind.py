@@ -0,0 +1,164 @@
+"""Write-behind buffer for small, high-frequency database writes."""
+
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# Writer receives buffered request logs and per-telegram_id request increments
+BatchWriter = Callable[[List[Dict[str, Any]], Counter], Awaitable[None]]
+
+
+class WriteBehindBuffer:
+    """Collect request logs and usage counters and write them in one transaction.
+
+    Buffered writes are flushed every flush_interval_ms or as soon as
+    max_items are pending, so at most that window is lost on a crash.
+    A failed batch is retried with the next flushes; after max_retries
+    failures in a row it is written one write at a time and the writes
+    that still fail are logged and dropped, so a bad row cannot block the
+    buffer forever.
+    """
+
+    def __init__(
+        self,
+        writer: BatchWriter,
+        flush_interval_ms: int = 500,
+        max_items: int = 200,
+        max_retries: int = 3
+    ):
+        """
+        Initialize buffer.
+
+        Args:
+            writer: Coroutine function writing one batch in a single transaction
+            flush_interval_ms: Maximum time a write stays buffered
+            max_items: Pending writes that trigger an immediate flush
+            max_retries: Failed flushes in a row before writes are isolated
+        """
+        self.writer = writer
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_items = max(max_items, 1)
+        self.max_retries = max(max_retries, 0)
+
+        self._request_logs: List[Dict[str, Any]] = []
+        self._request_increments: Counter = Counter()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._closing = False
+        # Failed flushes in a row
+        self._retries = 0
+
+        self.batches_written = 0
+        self.items_written = 0
+        self.batches_failed = 0
+        self.items_dropped = 0
+
+    @property
+    def closed(self) -> bool:
+        """Whether the buffer no longer accepts writes."""
+        return self._closing
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered writes."""
+        return len(self._request_logs) + sum(self._request_increments.values())
+
+    def add_request_log(self, **values: Any) -> None:
+        """Buffer a request_logs row."""
+        self._request_logs.append(values)
+        self._schedule()
+
+    def add_request_increment(self, telegram_id: int) -> None:
+        """Buffer a requests_count increment of a user."""
+        self._request_increments[telegram_id] += 1
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """Start the flush loop and wake it when the buffer is full."""
+        if self._closing:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._full = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if self.pending >= self.max_items:
+            self._full.set()
+
+    async def _flush_loop(self) -> None:
+        """Flush on interval or when full, until the buffer stays empty."""
+        while self.pending and not self._closing:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write all buffered writes in one transaction."""
+        async with self._lock:
+            if not self.pending:
+                return
+
+            request_logs, self._request_logs = self._request_logs, []
+            request_increments, self._request_increments = self._request_increments, Counter()
+            items = len(request_logs) + sum(request_increments.values())
+
+            try:
+                await self.writer(request_logs, request_increments)
+                self.batches_written += 1
+                self.items_written += items
+                self._retries = 0
+                return
+            except Exception as e:
+                self.batches_failed += 1
+                logger.error(f"Write-behind flush of {items} writes failed: {e}")
+
+            if self._retries < self.max_retries and not self._closing:
+                # Keep the batch for the next flush instead of dropping it
+                self._retries += 1
+                self._request_logs[:0] = request_logs
+                self._request_increments.update(request_increments)
+                return
+
+            self._retries = 0
+            await self._write_separately(request_logs, request_increments)
+
+    async def _write_separately(self, request_logs: List[Dict[str, Any]], request_increments: Counter) -> None:
+        """Write a batch that keeps failing one write at a time, dropping the writes that fail."""
+        batches = [([values], Counter()) for values in request_logs]
+        batches += [([], Counter({telegram_id: count})) for telegram_id, count in request_increments.items()]
+
+        for logs, increments in batches:
+            items = len(logs) + sum(increments.values())
+            try:
+                await self.writer(logs, increments)
+                self.items_written += items
+            except Exception as e:
+                self.items_dropped += items
+                logger.error(f"Dropped write-behind write {logs or dict(increments)}: {e}")
+
+    async def close(self) -> None:
+        """Stop the flush loop and write what is left."""
+        self._closing = True
+        if self._flush_task is not None:
+            # Let a flush in progress finish rather than cancelling it
+            self._full.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get buffer metrics."""
+        return {
+            "pending": self.pending,
+            "batches_written": self.batches_written,
+            "items_written": self.items_written,
+            "batches_failed": self.batches_failed,
+            "items_dropped": self.items_dropped
+        }
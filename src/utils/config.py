@@ -52,6 +52,23 @@ class DatabaseConfig(BaseModel):
     """Database configuration."""
     url: str
     report_retention_days: int = 30
+    cleanup_batch_size: int = 500
+    export_retention_hours: int = 24
+    video_temp_retention_hours: int = 6
+    image_cache_retention_hours: int = 72
+    pool_size: int = 5
+    max_overflow: int = 10  # PostgreSQL only
+    pool_recycle_seconds: int = 1800  # PostgreSQL only
+    prepared_statement_cache_size: int = 500  # PostgreSQL only
+    sqlite_mmap_size_mb: int = 64
+    sqlite_cache_size_mb: int = 16
+    sqlite_busy_timeout_ms: int = 5000
+    optimize_interval_hours: int = 6
+    user_cache_size: int = 10000
+    report_cache_size: int = 1000
+    write_behind_flush_ms: int = 500
+    write_behind_max_items: int = 200
+    result_compression: str = "zlib"  # none, zlib, zstd
 
 
 class PricingConfig(BaseModel):
@@ -67,6 +84,61 @@ class TimeoutsConfig(BaseModel):
     pdf_generation: int = 60
 
 
+class StreamingConfig(BaseModel):
+    """Streaming of LLM output into Telegram messages."""
+    enabled: bool = True
+    edit_interval_seconds: float = 1.5
+
+
+class ScenarioConfig(BaseModel):
+    """Scenario generation configuration."""
+    pipelined: bool = True
+    prompt_budget_tokens: int = 6000
+
+
+class AudioConfig(BaseModel):
+    """Local audio feature extraction configuration."""
+    enabled: bool = True
+    sample_rate: int = 16000
+    max_duration_seconds: float = 60.0
+    timeout_seconds: float = 20.0
+
+
+class VisionConfig(BaseModel):
+    """Vision analysis of reels in multi-reel reports."""
+    top_n: int = 3
+    max_concurrency: int = 3
+    max_cost_usd: float = 0.15
+    thumbnails_enabled: bool = True
+    thumbnail_concurrency: int = 5
+    frame_tiles_wide: int = 1
+    frame_tiles_high: int = 2
+    frame_crop_letterbox: bool = True
+    frame_center_crop: bool = False
+    fingerprint_enabled: bool = True
+    fingerprint_max_distance: float = 6.0
+    decode_workers: int = 0  # 0 = CPU count
+    decode_threads_per_worker: int = 1
+
+
+class AnalysisConfig(BaseModel):
+    """Analysis depth tiers configuration."""
+    default_depth: str = "standard"
+    peak_depth: str = "fast"
+    peak_in_flight_threshold: int = 8
+
+
+class PDFConfig(BaseModel):
+    """PDF rendering worker pool configuration."""
+    workers: int = 2
+    max_queue: int = 20
+    max_renders_per_worker: int = 20
+    image_cache_dir: str = "data/cache/images"
+    image_prefetch_concurrency: int = 8
+    image_timeout_seconds: float = 10.0
+    cache_enabled: bool = True
+
+
 class MCPServerConfig(BaseModel):
     """MCP Server configuration."""
     command: str
@@ -90,6 +162,12 @@ class Config(BaseSettings):
     pricing: PricingConfig
     timeouts: TimeoutsConfig
     mcp: MCPConfig
+    streaming: StreamingConfig = Field(default_factory=StreamingConfig)
+    scenario: ScenarioConfig = Field(default_factory=ScenarioConfig)
+    vision: VisionConfig = Field(default_factory=VisionConfig)
+    audio: AudioConfig = Field(default_factory=AudioConfig)
+    analysis: AnalysisConfig = Field(default_factory=AnalysisConfig)
+    pdf: PDFConfig = Field(default_factory=PDFConfig)
     environment: str = Field(default="development")
     debug: bool = Field(default=True)
     
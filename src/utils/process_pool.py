@@ -0,0 +1,66 @@
+"""Shared process pool for CPU-bound work (audio and video processing)."""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from src.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Get shared process pool, creating it on first use.
+
+    Args:
+        max_workers: Number of worker processes (CPU count by default);
+            only used when the pool is created
+
+    Returns:
+        Shared ProcessPoolExecutor
+    """
+    global _process_pool
+
+    if _process_pool is None:
+        workers = max_workers or os.cpu_count() or 1
+        _process_pool = ProcessPoolExecutor(max_workers=workers)
+        logger.info(f"Process pool started with {workers} workers")
+
+    return _process_pool
+
+
+async def run_in_process(func: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """
+    Run picklable function in the shared process pool.
+
+    Args:
+        func: Module-level function to run
+        *args: Positional arguments
+        timeout: Seconds to wait for the result (no limit if None)
+        **kwargs: Keyword arguments
+
+    Returns:
+        Function result
+
+    Raises:
+        asyncio.TimeoutError: If the result is not ready within timeout
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_process_pool(), partial(func, *args, **kwargs))
+    return await asyncio.wait_for(future, timeout=timeout)
+
+
+def shutdown_process_pool() -> None:
+    """Shut down shared process pool."""
+    global _process_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+        logger.info("Process pool stopped")
@@ -23,8 +23,7 @@ class ProgressTracker:
             "send_request": (5, 10, "📤 Отправка запроса к API"),
             "wait_actor": (10, 70, "⏳ Анализ данных Instagram"),
             "fetch_results": (70, 80, "📥 Получение результатов"),
-            "process_data": (80, 85, "🔍 Обработка данных"),
-            "generate_pdf": (85, 95, "📄 Генерация PDF отчета"),
+            "process_data": (80, 95, "🔍 Обработка данных"),
             "save_db": (95, 100, "💾 Сохранение результатов")
         }
         
@@ -143,4 +142,85 @@ class ApifyProgressTracker(ProgressTracker):
             
             await asyncio.sleep(2)
         
-        raise Exception("Actor run timed out")
\ No newline at end of file
+        raise Exception("Actor run timed out")
+
+
+class StreamingMessageUpdater:
+    """Progressively edit a Telegram message with streamed LLM output.
+    
+    Telegram limits how often a single chat can be edited, so intermediate
+    updates are throttled to one edit per ``min_interval`` seconds. Text that
+    arrives in between is kept and sent with the next allowed edit or with
+    ``finalize``. Edits are serialized, so concurrent streams sharing one
+    updater never run two edits at once.
+    """
+    
+    def __init__(
+        self,
+        message_updater: Callable,
+        min_interval: float = 1.5,
+        max_length: int = 4096
+    ):
+        """Initialize streaming updater.
+        
+        Args:
+            message_updater: Async function to update message with new text
+            min_interval: Minimum seconds between two edits
+            max_length: Maximum message length accepted by Telegram
+        """
+        self.message_updater = message_updater
+        self.min_interval = min_interval
+        self.max_length = max_length
+        self._last_edit = 0.0
+        self._last_text: Optional[str] = None
+        self._pending_text: Optional[str] = None
+        self._lock = asyncio.Lock()
+        
+    async def update(self, text: str) -> None:
+        """Schedule new message text, editing only if the interval allows."""
+        self._pending_text = text
+        
+        # An edit is in flight: this text goes out with the next one
+        if self._lock.locked():
+            return
+        
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            if loop.time() - self._last_edit < self.min_interval:
+                return
+            
+            await self._flush()
+    
+    async def finalize(self, text: Optional[str] = None) -> None:
+        """Commit the final text, waiting out the remaining interval if needed."""
+        if text is not None:
+            self._pending_text = text
+        
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            wait = self.min_interval - (loop.time() - self._last_edit)
+            if wait > 0 and self._pending_text != self._last_text:
+                await asyncio.sleep(wait)
+            
+            await self._flush()
+    
+    async def _flush(self) -> None:
+        """Send pending text if it differs from what is already shown (caller holds the lock)."""
+        text = self._pending_text
+        if text is None or text == self._last_text:
+            return
+        
+        try:
+            await self.message_updater(self._fit(text))
+        except Exception:
+            # Ignore update errors (e.g., message not modified)
+            pass
+        
+        self._last_text = text
+        self._last_edit = asyncio.get_running_loop().time()
+    
+    def _fit(self, text: str) -> str:
+        """Trim text to Telegram limit, keeping the most recent output."""
+        if len(text) <= self.max_length:
+            return text
+        return "…" + text[-(self.max_length - 1):]
@@ -0,0 +1,110 @@
+"""AsyncLRUCache eviction, single-flight loads and invalidation generations."""
+
+import asyncio
+
+from src.storage.cache import AsyncLRUCache
+
+
+async def test_lru_eviction():
+    cache = AsyncLRUCache("test", max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+
+async def test_zero_size_disables_caching():
+    cache = AsyncLRUCache("test", max_size=0)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return "value"
+
+    assert await cache.get_or_load("key", loader) == "value"
+    assert await cache.get_or_load("key", loader) == "value"
+    assert len(calls) == 2
+
+
+async def test_concurrent_loads_run_once():
+    cache = AsyncLRUCache("test")
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.get_metrics()["misses"] == 1
+    assert not cache._locks
+
+
+async def test_none_is_cached():
+    cache = AsyncLRUCache("test")
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return None
+
+    await cache.get_or_load("key", loader)
+    await cache.get_or_load("key", loader)
+
+    assert len(calls) == 1
+
+
+async def test_load_started_before_invalidation_is_not_stored():
+    cache = AsyncLRUCache("test")
+    loading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def stale_loader():
+        loading.set()
+        await release.wait()
+        return "stale"
+
+    load = asyncio.create_task(cache.get_or_load("key", stale_loader))
+    await loading.wait()
+    cache.invalidate("key")
+    release.set()
+
+    # The caller still gets its value, but it isn't cached
+    assert await load == "stale"
+    assert "key" not in cache
+
+
+async def test_set_checks_generation():
+    cache = AsyncLRUCache("test")
+
+    generation = cache.generation
+    cache.invalidate("other")
+    cache.set("key", "stale", generation)
+    assert "key" not in cache
+
+    cache.set("key", "fresh", cache.generation)
+    assert cache.get("key") == "fresh"
+
+    generation = cache.generation
+    cache.clear()
+    cache.set("key", "stale", generation)
+    assert "key" not in cache
+
+
+async def test_hit_rate():
+    cache = AsyncLRUCache("test")
+    cache.set("key", 1)
+
+    cache.get("key")
+    cache.get("key")
+    cache.get("missing")
+
+    metrics = cache.get_metrics()
+    assert (metrics["hits"], metrics["misses"]) == (2, 1)
+    assert metrics["hit_rate"] == 0.667
@@ -0,0 +1,115 @@
+"""Temporal dHash fingerprints: distance, band keys and index lookup."""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.features.vision_analysis.fingerprint import (
+    BAND_BITS, FingerprintIndex, band_keys, dhash, fingerprint_distance, is_informative
+)
+from src.storage.sqlite import Database
+
+
+def flip_bits(value: int, bits) -> int:
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+@pytest.fixture
+def hashes():
+    rng = random.Random(42)
+    return [rng.getrandbits(64) for _ in range(8)]
+
+
+@pytest.fixture
+async def database(tmp_path):
+    database = Database(f"sqlite+aiosqlite:///{tmp_path / 'fingerprints.db'}")
+    try:
+        await database.init_db()
+        yield database
+    finally:
+        await database.close()
+
+
+def test_distance_of_identical_fingerprints(hashes):
+    assert fingerprint_distance(hashes, list(hashes)) == 0.0
+
+
+def test_distance_is_mean_hamming_distance(hashes):
+    noisy = [flip_bits(value, (0, 17, 40)) for value in hashes]
+
+    assert fingerprint_distance(hashes, noisy) == 3.0
+
+
+def test_distance_tolerates_one_frame_shift(hashes):
+    # Re-upload with a trimmed intro: frames move by one position
+    shifted = hashes[1:] + [hashes[-1]]
+
+    # Only the trimmed first frame has no counterpart
+    distance = fingerprint_distance(hashes, shifted)
+    assert distance == pytest.approx(fingerprint_distance(hashes[:1], hashes[1:3]) / len(hashes))
+    assert distance < 6.0
+
+
+def test_distance_of_unrelated_fingerprints(hashes):
+    rng = random.Random(7)
+    other = [rng.getrandbits(64) for _ in hashes]
+
+    assert fingerprint_distance(hashes, other) > 20
+
+
+def test_distance_of_empty_fingerprint(hashes):
+    assert fingerprint_distance(hashes, []) == 64.0
+
+
+def test_band_keys_encode_band_index():
+    keys = band_keys([0x0004_0003_0002_0001])
+
+    assert keys == [(band << BAND_BITS) | (band + 1) for band in range(4)]
+
+
+def test_close_hashes_share_a_band_key(hashes):
+    # Three flipped bits touch at most three of the four bands
+    rng = random.Random(1)
+    for value in hashes:
+        noisy = flip_bits(value, rng.sample(range(64), 3))
+        assert set(band_keys([value])) & set(band_keys([noisy]))
+
+
+def test_dhash_is_stable_under_brightness_change():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 200, size=(90, 160, 3), dtype=np.uint8)
+    brighter = frame + 40
+
+    assert dhash(frame) == dhash(brighter)
+
+
+def test_flat_frames_are_not_informative(hashes):
+    assert is_informative(hashes)
+    assert not is_informative([0] * 8)
+    assert not is_informative([0] * 5 + hashes[:3])
+
+
+async def test_index_finds_near_duplicate(database, hashes):
+    index = FingerprintIndex(database=database, max_distance=6.0)
+    await index.add("original", hashes, analysis={"visual_analysis": "text"}, reel_url="https://x/reel/1/")
+
+    noisy = [flip_bits(value, (3, 50)) for value in hashes]
+    match = await index.find(noisy)
+
+    assert match.reel_id == "original"
+    assert match.distance == 2.0
+    assert match.analysis == {"visual_analysis": "text"}
+    assert match.reel_url == "https://x/reel/1/"
+
+
+async def test_index_ignores_distant_fingerprints(database, hashes):
+    index = FingerprintIndex(database=database, max_distance=6.0)
+    await index.add("original", hashes)
+
+    # Every frame differs by 12 bits: shares bands but is too far
+    distant = [flip_bits(value, range(0, 48, 4)) for value in hashes]
+
+    assert await index.find(distant) is None
@@ -0,0 +1,60 @@
+"""OpenAI image tile billing and the frame resize policy."""
+
+import numpy as np
+import pytest
+
+from src.features.vision_analysis.frame_policy import (
+    FramePolicy, billed_size, billed_tiles, billed_tokens, remove_letterbox
+)
+
+
+@pytest.mark.parametrize("width, height, tiles", [
+    (1080, 1920, 6),   # full reel frame: scaled to 768x1365
+    (512, 910, 2),     # resized to the 1x2 tile grid
+    (512, 512, 1),
+    (100, 100, 1),     # small images are not upscaled
+    (513, 513, 4),     # one pixel over a tile starts new ones
+    (4096, 4096, 4),   # fit into 2048, then short side 768
+    (1920, 1080, 6),
+])
+def test_billed_tiles(width, height, tiles):
+    assert billed_tiles(width, height) == tiles
+
+
+def test_billed_size_of_reel_frame():
+    assert billed_size(1080, 1920) == (768, 1365)
+
+
+def test_low_detail_is_not_tiled():
+    assert billed_tiles(1080, 1920, detail="low") == 0
+    assert billed_tokens(1080, 1920, detail="low") == 85
+
+
+def test_billed_tokens():
+    assert billed_tokens(1080, 1920) == 85 + 170 * 6
+    assert billed_tokens(512, 910) == 425
+
+
+def test_target_size_fits_tile_grid():
+    policy = FramePolicy(tiles_wide=1, tiles_high=2)
+
+    width, height = policy.target_size(1080, 1920)
+
+    assert (width, height) == (512, 910)
+    assert billed_tiles(width, height) == 2
+    assert policy.target_size(320, 568) == (320, 568)
+
+
+def test_low_detail_policy_is_one_tile():
+    policy = FramePolicy.for_detail("low", tiles_wide=2, tiles_high=3)
+
+    assert (policy.tiles_wide, policy.tiles_high) == (1, 1)
+    assert billed_tiles(*policy.target_size(1080, 1920)) == 1
+
+
+def test_apply_removes_letterbox_before_resizing():
+    frame = np.zeros((1920, 1080, 3), dtype=np.uint8)
+    frame[420:1500] = 200  # 1080x1080 picture between black bars
+
+    assert remove_letterbox(frame).shape[:2] == (1080, 1080)
+    assert FramePolicy(tiles_wide=1, tiles_high=2).apply(frame).shape[:2] == (512, 512)
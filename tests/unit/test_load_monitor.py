@@ -0,0 +1,62 @@
+"""Tier resolution of LoadMonitor under load."""
+
+import pytest
+
+from src.domain.models import AnalysisDepth
+from src.services.load_monitor import LoadMonitor
+
+
+@pytest.fixture
+def monitor():
+    monitor = LoadMonitor()
+    monitor.default_depth = "standard"
+    monitor.peak_depth = "fast"
+    monitor.peak_threshold = 2
+    return monitor
+
+
+def test_default_tier_below_threshold(monitor):
+    monitor.in_flight = 1
+
+    assert monitor.resolve_tier().depth == AnalysisDepth.STANDARD
+
+
+def test_default_tier_downgraded_at_peak(monitor):
+    monitor.in_flight = 2
+
+    assert monitor.resolve_tier().depth == AnalysisDepth.FAST
+
+
+def test_requested_depth_is_honoured_at_peak(monitor):
+    monitor.in_flight = 10
+
+    assert monitor.resolve_tier("deep").depth == AnalysisDepth.DEEP
+
+
+def test_zero_threshold_disables_downgrade(monitor):
+    monitor.peak_threshold = 0
+    monitor.in_flight = 100
+
+    assert monitor.resolve_tier().depth == AnalysisDepth.STANDARD
+
+
+def test_unknown_depth_falls_back_to_standard(monitor):
+    assert monitor.resolve_tier("turbo").depth == AnalysisDepth.STANDARD
+
+
+async def test_track_counts_in_flight_analyses(monitor):
+    async with monitor.track():
+        async with monitor.track():
+            assert monitor.in_flight == 2
+            assert monitor.resolve_tier().depth == AnalysisDepth.FAST
+
+    assert monitor.in_flight == 0
+    assert monitor.resolve_tier().depth == AnalysisDepth.STANDARD
+
+
+async def test_track_releases_on_error(monitor):
+    with pytest.raises(RuntimeError):
+        async with monitor.track():
+            raise RuntimeError("analysis failed")
+
+    assert monitor.in_flight == 0
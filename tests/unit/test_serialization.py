@@ -0,0 +1,145 @@
+"""Versioned, compressed serialization of stored report data."""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from src.domain.models import QueryPayload, ReelData
+from src.storage import serialization
+from src.storage.serialization import (
+    FORMAT_VERSION, decode, dumps, encode, from_dict, loads, resolve_compression, to_dict
+)
+
+
+VALUE = {
+    "topic": "кофе ☕",
+    "reels": [{"id": str(i), "views": i * 1000, "er": 1.5} for i in range(100)],
+    "empty": None,
+}
+
+
+@pytest.fixture
+def stdlib_json(monkeypatch):
+    """Encode with the stdlib json fallback."""
+    monkeypatch.setattr(serialization, "orjson", None)
+
+
+def make_reel() -> ReelData:
+    return ReelData(
+        id="r1",
+        title="Reel",
+        author="Author",
+        author_username="author",
+        url="https://www.instagram.com/reel/ABC123/",
+        video_url=None,
+        views=1000,
+        likes=100,
+        comments=10,
+        shares=1,
+        engagement_rate=11.1,
+        date=datetime(2024, 1, 15, 12, 30, 5, 123),
+        hashtags=["coffee"]
+    )
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_round_trip(compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+
+    text = encode(VALUE, compression)
+
+    assert text.startswith(f"{FORMAT_VERSION}:{compression}:")
+    assert decode(text) == VALUE
+
+
+def test_small_payloads_are_not_compressed():
+    text = encode({"a": 1}, "zlib")
+
+    assert text == f'{FORMAT_VERSION}:none:{{"a":1}}'
+
+
+def test_compression_shrinks_large_payloads():
+    assert len(encode(VALUE, "zlib")) < len(encode(VALUE, "none"))
+
+
+def test_legacy_json_rows_are_decoded():
+    assert decode(json.dumps(VALUE)) == VALUE
+    assert decode(json.dumps([1, 2])) == [1, 2]
+    assert decode(None) is None
+    assert decode("") is None
+
+
+def test_newer_version_is_rejected():
+    with pytest.raises(ValueError, match="newer"):
+        decode(f"{FORMAT_VERSION + 1}:none:{{}}")
+
+
+def test_unknown_compression_is_rejected():
+    with pytest.raises(ValueError, match="Unknown compression"):
+        decode(f"{FORMAT_VERSION}:lz4:AAAA")
+    with pytest.raises(ValueError, match="Unknown compression"):
+        resolve_compression("lz4")
+
+
+def test_zstd_falls_back_to_zlib_without_zstandard(monkeypatch):
+    monkeypatch.setattr(serialization, "zstandard", None)
+
+    assert resolve_compression("zstd") == "zlib"
+    assert resolve_compression(None) == "none"
+    with pytest.raises(ValueError, match="zstandard is not installed"):
+        decode(f"{FORMAT_VERSION}:zstd:AAAA")
+
+
+def test_orjson_and_json_produce_the_same_bytes(monkeypatch):
+    pytest.importorskip("orjson")
+    value = {
+        **VALUE,
+        "naive": datetime(2024, 1, 15, 12, 30, 5, 123),
+        "aware": datetime(2024, 1, 15, tzinfo=timezone.utc),
+        1: "non-string key",
+    }
+
+    with_orjson = dumps(value)
+    monkeypatch.setattr(serialization, "orjson", None)
+
+    assert dumps(value) == with_orjson
+    assert loads(with_orjson) == loads(dumps(value))
+
+
+def test_stdlib_json_round_trip(stdlib_json):
+    text = encode(VALUE, "zlib")
+
+    assert decode(text) == VALUE
+
+
+def test_stdlib_json_rejects_unknown_types(stdlib_json):
+    with pytest.raises(TypeError, match="object"):
+        dumps({"value": object()})
+
+
+def test_dataclass_round_trip():
+    reel = make_reel()
+
+    data = to_dict(reel)
+
+    assert data["date"] == "2024-01-15T12:30:05.000123"
+    assert from_dict(ReelData, decode(encode(data))) == reel
+
+
+def test_from_dict_fills_fields_missing_in_old_rows():
+    data = to_dict(make_reel())
+    del data["author_avatar_url"]
+    del data["hashtags"]
+
+    reel = from_dict(ReelData, {**data, "removed_field": 1})
+
+    assert reel.author_avatar_url is None
+    assert reel.hashtags == []
+
+
+def test_query_payload_round_trip():
+    payload = QueryPayload(topic="coffee", period=7, geo="RU", user_id=42)
+
+    assert from_dict(QueryPayload, decode(encode(to_dict(payload)))) == payload
@@ -0,0 +1,89 @@
+"""Throttling of StreamingMessageUpdater edits."""
+
+import asyncio
+
+from src.utils.progress import StreamingMessageUpdater
+
+
+class FakeMessage:
+    """Records edits; each edit takes `delay` seconds."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.edits = []
+
+    async def edit(self, text: str) -> None:
+        await asyncio.sleep(self.delay)
+        self.edits.append(text)
+
+
+async def test_updates_within_interval_are_coalesced():
+    message = FakeMessage()
+    streamer = StreamingMessageUpdater(message.edit, min_interval=0.2)
+
+    await streamer.update("a")
+    await streamer.update("ab")
+    await streamer.update("abc")
+    assert message.edits == ["a"]
+
+    await streamer.finalize()
+    assert message.edits == ["a", "abc"]
+
+
+async def test_finalize_waits_out_the_interval():
+    message = FakeMessage()
+    streamer = StreamingMessageUpdater(message.edit, min_interval=0.2)
+    loop = asyncio.get_running_loop()
+
+    await streamer.update("draft")
+    started = loop.time()
+    await streamer.finalize("final")
+
+    assert loop.time() - started >= 0.15
+    assert message.edits == ["draft", "final"]
+
+
+async def test_unchanged_text_is_not_edited_again():
+    message = FakeMessage()
+    streamer = StreamingMessageUpdater(message.edit, min_interval=0.0)
+
+    await streamer.update("same")
+    await streamer.update("same")
+    await streamer.finalize("same")
+
+    assert message.edits == ["same"]
+
+
+async def test_update_during_edit_goes_out_with_next_edit():
+    message = FakeMessage(delay=0.05)
+    streamer = StreamingMessageUpdater(message.edit, min_interval=0.0)
+
+    first = asyncio.create_task(streamer.update("first"))
+    await asyncio.sleep(0.01)
+    # Edit in flight: returns immediately without a second concurrent edit
+    await streamer.update("second")
+    await first
+    assert message.edits == ["first"]
+
+    await streamer.finalize()
+    assert message.edits == ["first", "second"]
+
+
+async def test_edit_errors_are_ignored():
+    async def failing_edit(text: str) -> None:
+        raise RuntimeError("message is not modified")
+
+    streamer = StreamingMessageUpdater(failing_edit, min_interval=0.0)
+
+    await streamer.update("text")
+    await streamer.finalize("text 2")
+
+
+async def test_long_text_keeps_latest_output():
+    message = FakeMessage()
+    streamer = StreamingMessageUpdater(message.edit, min_interval=0.0, max_length=10)
+
+    await streamer.finalize("0123456789abcdef")
+
+    assert message.edits == ["…789abcdef"]
+    assert len(message.edits[0]) == 10
@@ -0,0 +1,121 @@
+"""WriteBehindBuffer flushing, retries and isolation of failing writes."""
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+from src.storage.write_behind import WriteBehindBuffer
+
+
+class FakeWriter:
+    """Records written batches; fails the first `failures` calls or any batch with a bad row."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+        self.batches = []
+
+    async def __call__(self, request_logs, request_increments) -> None:
+        self.calls += 1
+        if self.calls <= self.failures or any(values.get("bad") for values in request_logs):
+            raise RuntimeError("database is locked")
+        self.batches.append((list(request_logs), Counter(request_increments)))
+
+
+@pytest.fixture
+def writer():
+    return FakeWriter()
+
+
+async def test_flushes_after_interval(writer):
+    buffer = WriteBehindBuffer(writer, flush_interval_ms=20)
+    buffer.add_request_log(query="a")
+    buffer.add_request_increment(1)
+    buffer.add_request_increment(1)
+    assert buffer.pending == 3
+    assert not writer.batches
+
+    await asyncio.sleep(0.1)
+
+    assert writer.batches == [([{"query": "a"}], Counter({1: 2}))]
+    assert buffer.pending == 0
+    await buffer.close()
+
+
+async def test_flushes_when_full(writer):
+    buffer = WriteBehindBuffer(writer, flush_interval_ms=10_000, max_items=3)
+    for query in ("a", "b", "c"):
+        buffer.add_request_log(query=query)
+
+    await asyncio.sleep(0.01)
+
+    assert len(writer.batches) == 1
+    assert len(writer.batches[0][0]) == 3
+    await buffer.close()
+
+
+async def test_close_writes_what_is_left(writer):
+    buffer = WriteBehindBuffer(writer, flush_interval_ms=10_000)
+    buffer.add_request_increment(7)
+
+    await buffer.close()
+
+    assert writer.batches == [([], Counter({7: 1}))]
+    assert buffer.closed
+
+
+async def test_failed_flush_is_retried():
+    writer = FakeWriter(failures=2)
+    buffer = WriteBehindBuffer(writer, flush_interval_ms=10_000, max_retries=3)
+    buffer.add_request_log(query="a")
+
+    await buffer.flush()
+    await buffer.flush()
+    assert buffer.pending == 1
+    assert buffer.batches_failed == 2
+
+    await buffer.flush()
+    assert writer.batches == [([{"query": "a"}], Counter())]
+    assert buffer.pending == 0
+    assert buffer._retries == 0
+
+
+async def test_retried_batch_merges_with_new_writes():
+    writer = FakeWriter(failures=1)
+    buffer = WriteBehindBuffer(writer, flush_interval_ms=10_000)
+    buffer.add_request_increment(1)
+    await buffer.flush()
+
+    buffer.add_request_increment(1)
+    await buffer.flush()
+
+    assert writer.batches == [([], Counter({1: 2}))]
+
+
+async def test_bad_write_is_dropped_after_retries(writer):
+    buffer = WriteBehindBuffer(writer, flush_interval_ms=10_000, max_retries=1)
+    buffer.add_request_log(query="good")
+    buffer.add_request_log(query="bad", bad=True)
+    buffer.add_request_increment(3)
+
+    await buffer.flush()  # fails, kept for retry
+    await buffer.flush()  # fails again, written one by one
+
+    assert buffer.pending == 0
+    assert buffer.items_dropped == 1
+    assert ([{"query": "good"}], Counter()) in writer.batches
+    assert ([], Counter({3: 1})) in writer.batches
+    assert buffer.get_metrics()["items_written"] == 2
+
+
+async def test_failed_flush_on_close_is_not_kept():
+    writer = FakeWriter(failures=1)
+    buffer = WriteBehindBuffer(writer, flush_interval_ms=10_000, max_retries=3)
+    buffer.add_request_log(query="a")
+
+    # No later flush will come: writes are isolated right away
+    await buffer.close()
+
+    assert writer.batches == [([{"query": "a"}], Counter())]
+    assert buffer.pending == 0